@@ -1,5 +1,15 @@
 # Initialize app module
-from flask_socketio import SocketIO
+# The SocketIO instance is created on first access so that workers which
+# don't serve WebSockets (see FEATURES in app.config) never import it.
+_socketio = None
 
-# Initialize SocketIO
-socketio = SocketIO(cors_allowed_origins="*")
\ No newline at end of file
+def __getattr__(name):
+    global _socketio
+    if name == 'socketio':
+        if _socketio is None:
+            from flask_socketio import SocketIO
+            
+            # Initialize SocketIO
+            _socketio = SocketIO(cors_allowed_origins="*")
+        return _socketio
+    raise AttributeError(f"module 'app' has no attribute '{name}'")
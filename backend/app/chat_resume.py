@@ -0,0 +1,56 @@
+"""
+Chat Resume Module
+Short-lived signed tokens that let a chat client reattach after a dropped
+connection without going through matchmaking again
+
+A token binds a user_session_id to its group and the last message ID the
+client was sent. On reconnect the client emits `resume_chat` with it and
+is put back in the group's room and sent only the messages after that ID;
+if the token expired or the user is no longer in the group, the client
+falls back to `join_chat`. Tokens are signed with SECRET_KEY, so they only
+survive a server restart when SECRET_KEY is set.
+"""
+
+import logging
+import os
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class ResumeTokens:
+    def __init__(self, ttl=300):
+        self.ttl = ttl  # seconds a token stays valid
+        self._serializer = None
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CHAT_RESUME_TTL', self.ttl)
+        secret = app.config.get('SECRET_KEY')
+        if not secret:
+            # Keep one key per process so every app the factory creates agrees
+            if self._serializer is not None:
+                return
+            logger.warning("SECRET_KEY is not set; chat resume tokens will not survive a restart")
+            secret = os.urandom(32)
+        self._serializer = URLSafeTimedSerializer(secret, salt='chat-resume')
+
+    def issue(self, user_session_id, group_id, last_message_id):
+        return self._serializer.dumps({'u': user_session_id, 'g': group_id, 'm': last_message_id})
+
+    def verify(self, token):
+        """
+        Returns:
+            tuple or None: (user_session_id, group_id, last_message_id), or None if invalid or expired
+        """
+        if not isinstance(token, str) or self._serializer is None:
+            return None
+        try:
+            claims = self._serializer.loads(token, max_age=self.ttl)
+        except BadSignature:  # includes SignatureExpired
+            return None
+        return claims['u'], claims['g'], claims['m']
+
+
+# Create a global instance for use throughout the application
+resume_tokens = ResumeTokens()
@@ -0,0 +1,185 @@
+"""
+Chat Snapshot Module
+Warm restarts for the in-memory chat matchmaking state
+
+ChatService keeps groups, memberships, the waiting list and usernames in
+process memory, so a deploy or crash used to drop every chat while the
+groups stayed active in the database. The state is now written to a local
+file every CHAT_SNAPSHOT_INTERVAL seconds (when it changed) and at exit:
+zlib-compressed JSON behind a short header, written to a temporary file,
+fsynced and renamed over the previous snapshot so a crash never leaves a
+torn file.
+
+When the first client joins after a start, the snapshot is restored and
+reconciled with the database (ChatService.restore), and any other group
+still marked active is deactivated in one bulk UPDATE. Clients rejoin with
+their user_session_id on reconnect and land back in their group; restored
+users who do not come back within CHAT_RECONNECT_GRACE seconds are removed.
+"""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import time
+import zlib
+
+from app import socketio
+from app.instrumentation import register_collector
+from app.runtime import get_app, native_lock, offload
+from app.services.chat_service import chat_service
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CLCHAT'
+FORMAT = 1
+
+
+def encode_snapshot(state, taken_at=None):
+    payload = {'taken_at': time.time() if taken_at is None else taken_at, 'state': state}
+    return MAGIC + bytes([FORMAT]) + zlib.compress(json.dumps(payload, separators=(',', ':')).encode())
+
+
+def decode_snapshot(data):
+    """
+    Returns:
+        tuple: (state, taken_at as a Unix timestamp)
+    """
+    if data[:len(MAGIC)] != MAGIC or data[len(MAGIC):len(MAGIC) + 1] != bytes([FORMAT]):
+        raise ValueError("Not a chat snapshot (or an unsupported format)")
+    payload = json.loads(zlib.decompress(data[len(MAGIC) + 1:]))
+    return payload['state'], payload['taken_at']
+
+
+def write_atomic(path, data):
+    """Replace `path` with `data` so that readers see either the old or the new file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.chat_snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    # Persist the rename itself (not possible on Windows)
+    try:
+        directory_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
+
+
+class ChatSnapshots:
+    def __init__(self, interval=10.0, max_age=600.0, grace=120.0):
+        self.path = None  # None disables snapshots
+        self.interval = interval  # seconds between snapshots
+        self.max_age = max_age  # older snapshots are not restored
+        self.grace = grace  # seconds restored users have to rejoin
+        self.saves = 0
+        self.restored_users = 0
+        self.deactivated_groups = 0
+        self._last_saved = None
+        self._started = False
+        self._lock = native_lock()
+
+    def init_app(self, app):
+        self.path = app.config.get('CHAT_SNAPSHOT_PATH') if app.config.get('CHAT_SNAPSHOT_ENABLED', True) else None
+        self.interval = app.config.get('CHAT_SNAPSHOT_INTERVAL', self.interval)
+        self.max_age = app.config.get('CHAT_SNAPSHOT_MAX_AGE', self.max_age)
+        self.grace = app.config.get('CHAT_RECONNECT_GRACE', self.grace)
+
+    def start(self):
+        """Restore the last snapshot and start snapshotting (once per process; called on join_chat)"""
+        if self._started or not self.path:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        try:
+            self.restore()
+        except Exception as e:
+            logger.exception("Could not restore the chat snapshot: %s", e)
+        atexit.register(self._save_at_exit)
+        socketio.start_background_task(self._run)
+
+    def load(self):
+        """
+        Returns:
+            dict or None: The snapshot state, or None if missing, unreadable or too old
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                state, taken_at = decode_snapshot(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, zlib.error) as e:
+            logger.warning("Ignoring unreadable chat snapshot %s: %s", self.path, e)
+            return None
+        age = time.time() - taken_at
+        if age > self.max_age:
+            logger.info("Ignoring chat snapshot taken %.0f s ago", age)
+            return None
+        return state
+
+    def restore(self):
+        """Restore and reconcile (with an empty state if there is no usable snapshot)"""
+        result = chat_service.restore(self.load() or {}, grace=self.grace)
+        self.restored_users = result['users']
+        self.deactivated_groups = result['deactivated']
+        logger.info("Restored %d chat groups (%d users); deactivated %d stale groups",
+                    result['groups'], result['users'], result['deactivated'])
+        return result
+
+    def save(self):
+        """Write the snapshot if the state changed since the last one; returns True if written"""
+        state = chat_service.snapshot()
+        if state == self._last_saved:
+            return False
+        write_atomic(self.path, encode_snapshot(state))
+        self._last_saved = state
+        self.saves += 1
+        return True
+
+    def _save_at_exit(self):
+        try:
+            self.save()
+        except Exception as e:
+            logger.warning("Could not write the chat snapshot at exit: %s", e)
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.interval)
+            try:
+                with get_app().app_context():
+                    chat_service.evict_unclaimed()
+                # Writing and fsyncing the file blocks, so it runs in the pool
+                offload(self.save)
+            except Exception as e:
+                logger.exception("Error writing the chat snapshot: %s", e)
+
+    def metrics_lines(self):
+        return [
+            '# TYPE chat_snapshot_saves_total counter',
+            f'chat_snapshot_saves_total {self.saves}',
+            '# TYPE chat_snapshot_restored_users gauge',
+            f'chat_snapshot_restored_users {self.restored_users}',
+            '# TYPE chat_snapshot_deactivated_groups gauge',
+            f'chat_snapshot_deactivated_groups {self.deactivated_groups}',
+        ]
+
+
+# Create a global instance for use throughout the application
+chat_snapshots = ChatSnapshots()
+register_collector(chat_snapshots.metrics_lines)
@@ -0,0 +1,326 @@
+import logging
+from flask import request
+from flask_socketio import emit, join_room
+from app import socketio
+from app.chat_resume import resume_tokens
+from app.chat_snapshot import chat_snapshots
+from app.instrumentation import instrumented_event
+from app.moderation_pipeline import moderation_pipeline
+from app.outbound import outbound_queues, room_sids
+from app.rate_limit import rate_limiter
+from app.services.chat_service import chat_service
+from app.services.message_dedup import valid_client_message_id
+from app.socket_events import disconnect_hooks
+from app.typing_indicator import typing_indicators
+from app.wire_format import wire_formats
+
+logger = logging.getLogger(__name__)
+
+# sid -> user_session_id of connections whose user is on the waiting list,
+# so a user who closes the page before being matched is not kept waiting
+waiting_connections = {}
+
+
+def _forget_waiting_connection(sid):
+    user_session_id = waiting_connections.pop(sid, None)
+    if user_session_id and user_session_id not in waiting_connections.values():
+        chat_service.leave_waiting_list(user_session_id)
+
+
+disconnect_hooks.append(_forget_waiting_connection)
+
+# Database work below runs on the calling greenlet (psycogreen makes
+# psycopg2 yield to the hub); only moderation goes to the offload pool.
+# Each helper bundles the database calls of one handler.
+
+def _join_chat(user_session_id):
+    if chat_service.is_user_banned(user_session_id):
+        return {'banned': True}
+    result = chat_service.create_or_join_group(user_session_id)
+    group = result.get('group')
+    if group:
+        result['messages'] = chat_service.get_group_messages(group['id'])
+    return result
+
+def _last_message_id(messages, default=0):
+    return messages[-1]['id'] if messages else default
+
+def _emit_to_group(event, payload, group_id, encode, ephemeral=False):
+    """
+    Emit to a group's room, re-encoding the payload for compact-format clients.
+    Ephemeral events are held back for connections with a send backlog, and
+    other events disconnect connections that fell too far behind (see
+    app/outbound.py). Works outside handlers too (the typing flush loop).
+    """
+    room = str(group_id)
+    sids = room_sids(room)
+    backlogged = outbound_queues.backlogged(sids) if ephemeral else set()
+    compact = [sid for sid in wire_formats.compact_sids(sids) if sid not in backlogged]
+    skip = compact + list(backlogged)
+    if not skip:
+        socketio.emit(event, payload, to=room)
+    else:
+        socketio.emit(event, payload, to=room, skip_sid=skip)
+    for sid in compact:
+        socketio.emit(event, encode(sid, payload), to=sid)
+    for sid in backlogged:
+        outbound_queues.hold(sid, event, payload, encode)
+    if not ephemeral:
+        outbound_queues.evict_lagging(sids)
+
+def _emit_to_sender(event, payload):
+    """Emit a new_message style payload to the current connection only, in its format"""
+    if wire_formats.is_compact(request.sid):
+        payload = wire_formats.encode_message(request.sid, payload)
+    emit(event, payload)
+
+def _flush_typing():
+    """Send coalesced typing updates until nobody in any group is typing"""
+    while True:
+        socketio.sleep(typing_indicators.interval)
+        try:
+            for group_id, typing in typing_indicators.flush():
+                _emit_to_group('typing_users', {'group_id': group_id, 'typing': typing},
+                               group_id, wire_formats.encode_typing, ephemeral=True)
+        except Exception as e:
+            logger.exception("Error sending typing updates: %s", e)
+        if typing_indicators.stop_if_idle():
+            return
+
+def _save_chat_message(user_session_id, moderation, client_message_id):
+    if chat_service.is_user_banned(user_session_id):
+        return {'success': False, 'banned': True}
+    return chat_service.save_message(user_session_id, moderation, client_message_id)
+
+def _message_data(message):
+    """The new_message payload for a stored message"""
+    message_data = {
+        'id': message['id'],
+        'user_session_id': message['user_session_id'],
+        'username': message['username'],
+        'content': message['content'],
+        'created_at': message['created_at'],
+        'flagged': message.get('flagged', False)
+    }
+    if message.get('client_message_id'):
+        message_data['client_message_id'] = message['client_message_id']
+    return message_data
+
+@socketio.on('join_chat')
+@instrumented_event('join_chat')
+def handle_join_chat(data):
+    """Handle user joining a chat group."""
+    user_session_id = data.get('user_session_id')
+    
+    if not user_session_id:
+        emit('error', {'message': 'User session ID is required'})
+        return
+    
+    # The first join after a restart restores the previous process's groups
+    chat_snapshots.start()
+    
+    # Clients may ask for the compact wire format (see app/wire_format.py)
+    wire = wire_formats.negotiate(request.sid, data.get('wire'), user_session_id)
+    
+    # Check if user is banned, then join or create group
+    result = _join_chat(user_session_id)
+    if result.get('banned'):
+        emit('banned', {'message': 'You are banned from chat'})
+        return
+    
+    if result.get('waiting'):
+        waiting_connections[request.sid] = user_session_id
+        emit('waiting_for_group', {
+            'message': 'Waiting for more users to join...',
+            'username': result.get('username'),
+            'wire': wire
+        })
+        return
+    
+    waiting_connections.pop(request.sid, None)
+    group = result.get('group')
+    if group:
+        # Join the SocketIO room
+        join_room(str(group['id']))
+        
+        # Emit group info to the user, with a token for resuming after a dropped connection
+        messages = result.get('messages', [])
+        emit('joined_group', {
+            'group': group,
+            'username': result.get('username'),
+            'is_new_group': result.get('is_new_group'),
+            'wire': wire,
+            'resume_token': resume_tokens.issue(user_session_id, group['id'], _last_message_id(messages))
+        })
+        
+        # Notify others in the group about the new user
+        # Always notify when a user joins (whether new group or existing group)
+        emit('user_joined', {
+            'username': result.get('username'),
+            'user_session_id': user_session_id,
+            'message': f"{result.get('username')} joined the chat"
+        }, to=str(group['id']))
+        
+        # Send recent messages to the user
+        emit('previous_messages', wire_formats.encode_messages(request.sid, messages))
+    else:
+        emit('error', {'message': 'Failed to join or create group'})
+
+@socketio.on('resume_chat')
+@instrumented_event('resume_chat')
+def handle_resume_chat(data):
+    """
+    Reattach a reconnecting client to its group using the resume token from
+    joined_group, sending only the messages it missed. Clients fall back to
+    join_chat when they get resume_failed.
+    """
+    claims = resume_tokens.verify(data.get('resume_token'))
+    if claims is None:
+        emit('resume_failed', {'reason': 'invalid_token'})
+        return
+    user_session_id, group_id, last_message_id = claims
+    
+    # The client may have been sent messages after the token was issued
+    client_last_id = data.get('last_message_id')
+    if isinstance(client_last_id, int) and client_last_id > last_message_id:
+        last_message_id = client_last_id
+    
+    chat_snapshots.start()
+    username = chat_service.resume(user_session_id, group_id)
+    if username is None:
+        emit('resume_failed', {'reason': 'not_in_group'})
+        return
+    
+    wire = wire_formats.negotiate(request.sid, data.get('wire'), user_session_id)
+    join_room(str(group_id))
+    missed = chat_service.get_messages_since(group_id, last_message_id)
+    
+    emit('chat_resumed', {
+        'group_id': group_id,
+        'username': username,
+        'wire': wire,
+        'resume_token': resume_tokens.issue(user_session_id, group_id, _last_message_id(missed, last_message_id))
+    })
+    emit('missed_messages', wire_formats.encode_messages(request.sid, missed))
+
+@socketio.on('refresh_resume_token')
+@instrumented_event('refresh_resume_token')
+def handle_refresh_resume_token(data):
+    """Exchange a still-valid resume token for a fresh one (clients refresh well before it expires)"""
+    claims = resume_tokens.verify(data.get('resume_token'))
+    if claims is None:
+        return
+    user_session_id, group_id, last_message_id = claims
+    if chat_service.user_sessions.get(user_session_id) != group_id:
+        return
+    client_last_id = data.get('last_message_id')
+    if isinstance(client_last_id, int) and client_last_id > last_message_id:
+        last_message_id = client_last_id
+    emit('resume_token', {'resume_token': resume_tokens.issue(user_session_id, group_id, last_message_id)})
+
+@socketio.on('leave_chat')
+@instrumented_event('leave_chat')
+def handle_leave_chat(data):
+    """Handle user leaving a chat group."""
+    user_session_id = data.get('user_session_id')
+    
+    if not user_session_id:
+        emit('error', {'message': 'User session ID is required'})
+        return
+    
+    # Leave the group in our service
+    waiting_connections.pop(request.sid, None)
+    typing_indicators.discard(user_session_id)
+    success = chat_service.leave_group(user_session_id)
+    
+    if success:
+        # Get the group ID before removing the user
+        # Note: This is a simplification. In a real implementation, you'd want to track this better
+        emit('left_chat', {'message': 'You have left the chat'})
+    else:
+        emit('error', {'message': 'Not in a group'})
+
+@socketio.on('send_message')
+@instrumented_event('send_message')
+@rate_limiter.limit_event('send_message', rate=1, burst=5)
+def handle_send_message(data):
+    """Handle sending a chat message."""
+    user_session_id = data.get('user_session_id')
+    content = data.get('content')
+    client_message_id = data.get('client_message_id')
+    
+    if not user_session_id or not content:
+        emit('error', {'message': 'User session ID and content are required'})
+        return
+    if not valid_client_message_id(client_message_id):
+        emit('error', {'message': 'client_message_id must be a string of at most 64 characters'})
+        return
+    
+    # Check if user is in a group
+    if user_session_id not in chat_service.user_sessions:
+        emit('error', {'message': 'You are not in a chat group'})
+        return
+    
+    group_id = chat_service.user_sessions[user_session_id]
+    
+    # A retry of a message that was already stored and broadcast: answer only
+    # the sender, without moderating, storing or broadcasting it again
+    message = chat_service.recent_message(user_session_id, client_message_id)
+    if message is not None:
+        _emit_to_sender('new_message', _message_data(message))
+        return
+    
+    # Save message to database first
+    try:
+        # Moderation runs in the offload pool within its latency budget;
+        # flagging happens after the broadcast (see app/moderation_pipeline.py)
+        moderation = moderation_pipeline.moderate(content)
+        if moderation is None:
+            emit('error', {'message': 'Message could not be checked in time, please try again'})
+            return
+        
+        result = _save_chat_message(user_session_id, moderation, client_message_id)
+        if result.get('banned'):
+            emit('banned', {'message': 'You are banned from chat'})
+            return
+        if not result['success']:
+            emit('error', {'message': result.get('error', 'Failed to send message')})
+            return
+            
+        # Create message object for broadcasting (using the saved message data)
+        message_data = _message_data(result['message'])
+        if result['duplicate']:
+            # The unique index caught a retry the recent-ID window no longer held
+            _emit_to_sender('new_message', message_data)
+            return
+        
+        # Broadcast message to the group
+        _emit_to_group('new_message', message_data, group_id, wire_formats.encode_message)
+        
+        if moderation['flagged']:
+            moderation_pipeline.report_violation(user_session_id, moderation['violations'], request.sid)
+        
+    except Exception as e:
+        logger.exception("Error processing message: %s", e)
+        emit('error', {'message': 'Failed to process message'})
+
+@socketio.on('typing')
+@instrumented_event('typing')
+@rate_limiter.limit_event('typing', rate=2, burst=4, notify=False)
+def handle_typing(data):
+    """Handle typing indicator."""
+    user_session_id = data.get('user_session_id')
+    is_typing = data.get('is_typing', False)
+    
+    if not user_session_id:
+        return
+    
+    # Check if user is in a group
+    group_id = chat_service.user_sessions.get(user_session_id)
+    if group_id is None:
+        return
+    
+    # Only record the state; _flush_typing broadcasts the group's typing set
+    username = chat_service.get_username(user_session_id)
+    if typing_indicators.update(group_id, user_session_id, username, bool(is_typing)):
+        socketio.start_background_task(_flush_typing)
@@ -0,0 +1,96 @@
+"""
+Compression Module
+Compresses REST responses (JSON and text) above a size threshold with
+brotli when the client accepts it and the package is installed, otherwise
+gzip. Socket.IO traffic bypasses Flask and is not affected.
+"""
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/plain',
+    'text/html',
+    'text/css',
+    'text/csv',
+}
+
+
+def _accepted_encodings(header):
+    """Encodings from an Accept-Encoding header, dropping those with q=0"""
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if name and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(name.lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """Pick the best supported encoding for an Accept-Encoding header, or None"""
+    if not accept_encoding:
+        return None
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    # mtime=0 keeps the output (and therefore caching) deterministic
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def init_app(app):
+    """
+    Register the compression hook. Register it before other after_request
+    hooks that may replace the response: Flask runs them in reverse order.
+    """
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+    gzip_level = app.config.get('COMPRESS_LEVEL', 6)
+    brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 4)
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.direct_passthrough
+                or response.is_streamed
+                or response.status_code < 200
+                or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(compress(data, encoding, gzip_level, brotli_quality))
+        response.headers['Content-Encoding'] = encoding
+        # Byte-for-byte the entity now differs, so only a weak ETag is still
+        # valid (conditional GETs compare weakly, so 304s keep working)
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
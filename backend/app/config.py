@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from app.db_pool import build_engine_options, env_flag
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,4 +22,110 @@ class Config:
         # SQLAlchemy configuration
         SQLALCHEMY_DATABASE_URI = f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
     
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Connection pool tuning (ignored for SQLite)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '10'))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING = env_flag(os.getenv('DB_POOL_PRE_PING'), default=True)
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000'))  # 0 disables
+    # Set when connecting through PgBouncer/Supavisor in transaction pooling mode (port 6543 on Supabase)
+    DB_PGBOUNCER_TRANSACTION_MODE = env_flag(os.getenv('DB_PGBOUNCER_TRANSACTION_MODE'))
+    
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(
+        SQLALCHEMY_DATABASE_URI,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS,
+        pgbouncer_transaction_mode=DB_PGBOUNCER_TRANSACTION_MODE
+    )
+    
+    # Seconds before the in-memory quote pool is reloaded from the database
+    QUOTE_POOL_TTL = int(os.getenv('QUOTE_POOL_TTL', '300'))
+    # Largest JSON array accepted by /api/quotes/bulk; it is parsed in one piece,
+    # so bigger packs must be sent as NDJSON or CSV, which are streamed
+    QUOTE_IMPORT_MAX_JSON_BYTES = int(os.getenv('QUOTE_IMPORT_MAX_JSON_BYTES', str(5 * 1024 * 1024)))
+    
+    # Socket.IO async mode: threading (development), eventlet or gevent (production, see wsgi.py)
+    SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'threading')
+    # Native threads for blocking work that does not use the database (moderation) under eventlet/gevent
+    OFFLOAD_THREADS = int(os.getenv('OFFLOAD_THREADS', str(DB_POOL_SIZE)))
+    
+    # Subsystems served by this process: any of chat, therapy, diary, quotes
+    FEATURES = os.getenv('FEATURES', 'chat,therapy,diary,quotes')
+    
+    # Compress REST responses at least COMPRESS_MIN_SIZE bytes (brotli if installed, else gzip)
+    COMPRESS_ENABLED = env_flag(os.getenv('COMPRESS_ENABLED'), default=True)
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))  # gzip level 1-9
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '4'))  # brotli quality 0-11
+    
+    # Typing indicators: seconds between coalesced updates per group, and before a stale flag expires
+    TYPING_FLUSH_INTERVAL = float(os.getenv('TYPING_FLUSH_INTERVAL', '0.3'))
+    TYPING_TIMEOUT = float(os.getenv('TYPING_TIMEOUT', '6'))
+    
+    # Socket.IO send backlog (packets per connection): above OUTBOUND_EPHEMERAL_DEPTH typing
+    # updates are held back (at most OUTBOUND_HELD_EVENTS, oldest dropped); above
+    # OUTBOUND_MAX_LAG the connection is closed and the client resumes
+    OUTBOUND_EPHEMERAL_DEPTH = int(os.getenv('OUTBOUND_EPHEMERAL_DEPTH', '8'))
+    OUTBOUND_HELD_EVENTS = int(os.getenv('OUTBOUND_HELD_EVENTS', '4'))
+    OUTBOUND_MAX_LAG = int(os.getenv('OUTBOUND_MAX_LAG', '256'))
+    
+    # Signs chat resume tokens; without it tokens are only valid until the process restarts
+    SECRET_KEY = os.getenv('SECRET_KEY')
+    # Seconds a chat resume token stays valid (clients refresh it while connected)
+    CHAT_RESUME_TTL = int(os.getenv('CHAT_RESUME_TTL', '300'))
+    
+    # Chat matchmaking state is snapshotted to this file and restored after a restart
+    CHAT_SNAPSHOT_ENABLED = env_flag(os.getenv('CHAT_SNAPSHOT_ENABLED'), default=True)
+    CHAT_SNAPSHOT_PATH = os.getenv(
+        'CHAT_SNAPSHOT_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'chat_snapshot.bin'))
+    CHAT_SNAPSHOT_INTERVAL = float(os.getenv('CHAT_SNAPSHOT_INTERVAL', '10'))  # seconds between snapshots
+    CHAT_SNAPSHOT_MAX_AGE = float(os.getenv('CHAT_SNAPSHOT_MAX_AGE', '600'))  # older snapshots are ignored
+    CHAT_RECONNECT_GRACE = float(os.getenv('CHAT_RECONNECT_GRACE', '120'))  # seconds restored users have to rejoin
+    
+    # Milliseconds a live chat message may spend in moderation before it is rejected
+    MODERATION_TIMEOUT_MS = int(os.getenv('MODERATION_TIMEOUT_MS', '250'))
+    
+    # Optional toxicity model run after the word-list checks: "hashed_ngram" (weights
+    # trained with train_toxicity_model.py) or "module:factory"; empty disables it
+    TOXICITY_SCORER = os.getenv('TOXICITY_SCORER', '')
+    TOXICITY_MODEL_PATH = os.getenv(
+        'TOXICITY_MODEL_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'toxicity_model.npz'))
+    # Micro-batching: most messages scored together, and how long to wait for a batch to fill
+    TOXICITY_BATCH_SIZE = int(os.getenv('TOXICITY_BATCH_SIZE', '32'))
+    TOXICITY_BATCH_WAIT_MS = float(os.getenv('TOXICITY_BATCH_WAIT_MS', '5'))
+    # Milliseconds to wait for a score before accepting the message on the word lists alone
+    TOXICITY_TIMEOUT_MS = float(os.getenv('TOXICITY_TIMEOUT_MS', '100'))
+    
+    # Token-bucket rate limits for chat events and the moderation endpoint
+    RATE_LIMIT_ENABLED = env_flag(os.getenv('RATE_LIMIT_ENABLED'), default=True)
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # memory (per process) or redis (shared)
+    RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    RATE_LIMIT_IP_FACTOR = float(os.getenv('RATE_LIMIT_IP_FACTOR', '10'))  # per-IP limit relative to per-user
+    # Reverse proxies in front of the app; the client IP is then read from X-Forwarded-For
+    RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '0'))
+    RATE_LIMITS = os.getenv('RATE_LIMITS', '')  # overrides, e.g. "send_message=2:5,typing=4:8" (per second:burst)
+    
+    # Message retention (archive_messages.py): messages of inactive chat groups and finished
+    # therapy sessions older than this many days are moved to gzip NDJSON files
+    MESSAGE_RETENTION_DAYS = int(os.getenv('MESSAGE_RETENTION_DAYS', '30'))
+    MESSAGE_ARCHIVE_DIR = os.getenv(
+        'MESSAGE_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'archive'))
+    MESSAGE_ARCHIVE_BATCH_SIZE = int(os.getenv('MESSAGE_ARCHIVE_BATCH_SIZE', '1000'))  # rows per transaction
+    MESSAGE_PARTITIONS_AHEAD = int(os.getenv('MESSAGE_PARTITIONS_AHEAD', '2'))  # months (PostgreSQL only)
+    
+    # Encode JSON responses with orjson when it is installed
+    FAST_JSON = env_flag(os.getenv('FAST_JSON'), default=True)
+    
+    # Prometheus-format latency/query metrics at /metrics
+    METRICS_ENABLED = env_flag(os.getenv('METRICS_ENABLED'), default=True)
+    # Allow ?profile=1 to return a cProfile (or pyinstrument) report instead of the response
+    PROFILING_ENABLED = env_flag(os.getenv('PROFILING_ENABLED'))
+    # Log level for the application loggers (therapy, chat, socket events)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -0,0 +1,146 @@
+"""
+Database Pool Module
+Builds SQLAlchemy engine options from the environment and records
+connection-pool checkout wait times so the pool can be sized from data
+"""
+
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+from app.runtime import native_lock
+
+# Upper bounds (seconds) of the checkout wait-time histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolMetrics:
+    def __init__(self):
+        # Checkouts happen on hub greenlets and native threads alike
+        self._lock = native_lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.buckets = [0] * (len(WAIT_BUCKETS) + 1)  # last bucket is +Inf
+            self.pool = None
+
+    def track(self, pool):
+        """Remember the pool whose live status should be reported"""
+        self.pool = pool
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.buckets[bisect_left(WAIT_BUCKETS, seconds)] += 1
+
+    def snapshot(self):
+        """Current counters plus live pool status"""
+        with self._lock:
+            data = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.wait_total, 6),
+                'wait_seconds_max': round(self.wait_max, 6),
+                'wait_seconds_avg': round(self.wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+                'wait_histogram': {
+                    **{str(bound): count for bound, count in zip(WAIT_BUCKETS, self.buckets)},
+                    '+Inf': self.buckets[-1]
+                }
+            }
+        pool = self.pool
+        if isinstance(pool, QueuePool):
+            data.update({
+                'pool_size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow()
+            })
+        return data
+
+
+# Create a global instance for use throughout the application
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_metrics.track(self)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            pool_metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def env_flag(value, default=False):
+    """Parse a boolean environment variable"""
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def build_engine_options(database_uri, pool_size, max_overflow, pool_timeout, pool_recycle,
+                         pool_pre_ping, statement_timeout_ms, pgbouncer_transaction_mode):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for the configured database
+
+    SQLite keeps Flask-SQLAlchemy's defaults. For Postgres the pool is sized
+    explicitly, connections are recycled before Supabase/PgBouncer drops
+    them and pre-pinged on checkout. In PgBouncer transaction mode the
+    statement timeout cannot be a connection startup option, so it is
+    applied per transaction instead (see init_app).
+    """
+    if database_uri.startswith('sqlite'):
+        return {}
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_timeout,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': pool_pre_ping,
+    }
+    if statement_timeout_ms and not pgbouncer_transaction_mode:
+        options['connect_args'] = {'options': f'-c statement_timeout={int(statement_timeout_ms)}'}
+    return options
+
+
+def init_app(app, db):
+    """Attach per-transaction settings that can't be set at connect time"""
+    config = app.config
+    if not config.get('DB_PGBOUNCER_TRANSACTION_MODE') or not config.get('DB_STATEMENT_TIMEOUT_MS'):
+        return
+
+    timeout_ms = int(config['DB_STATEMENT_TIMEOUT_MS'])
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name != 'postgresql':
+            return
+
+        @event.listens_for(engine, 'begin')
+        def set_statement_timeout(connection):
+            # SET LOCAL only lives for the current transaction, so it is safe
+            # when PgBouncer hands the server connection to another client
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
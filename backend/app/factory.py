@@ -0,0 +1,136 @@
+"""
+Application Factory Module
+Builds the Flask app with database, CORS and the subsystems enabled by
+feature flags (chat, therapy, diary, quotes). Subsystems that are not
+enabled are never imported, so specialized workers boot faster and use
+less memory.
+"""
+
+import logging
+
+from flask import Flask
+from flask_cors import CORS
+from app import compression, instrumentation, runtime, serialization
+from app.rate_limit import rate_limiter
+from app.config import Config
+from app.models import db
+from app import db_pool
+
+FEATURES = ('chat', 'therapy', 'diary', 'quotes')
+
+def parse_features(features):
+    """Normalize a comma-separated string or iterable of feature names"""
+    if isinstance(features, str):
+        features = features.split(',')
+    selected = {feature.strip().lower() for feature in features if feature and feature.strip()}
+    unknown = selected - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}. Expected any of: {', '.join(FEATURES)}")
+    return selected
+
+def create_app(async_mode=None, features=None):
+    """
+    Create the Flask application
+    
+    Args:
+        async_mode (str, optional): Socket.IO async mode (defaults to SOCKETIO_ASYNC_MODE)
+        features (str or iterable, optional): Subsystems to serve (defaults to FEATURES config)
+        
+    Returns:
+        Flask: The configured application
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    
+    enabled = parse_features(features if features is not None else app.config['FEATURES'])
+    app.config['ENABLED_FEATURES'] = enabled
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    logging.getLogger('app').setLevel(app.config['LOG_LEVEL'].upper())
+    
+    # orjson-backed JSON responses (stdlib fallback)
+    serialization.init_app(app)
+    
+    # Initialize database
+    db.init_app(app)
+    db_pool.init_app(app, db)
+    
+    # Initialize SocketIO with app (only chat and therapy use WebSockets)
+    if enabled & {'chat', 'therapy'}:
+        from app import socketio
+        
+        # Import socket events to register them. This must happen before
+        # init_app so the handlers are kept on the SocketIO object and
+        # re-attached to the server of every app the factory creates
+        from app import socket_events
+        from app.outbound import outbound_queues
+        outbound_queues.init_app(app)
+        if 'chat' in enabled:
+            from app import chat_socket_events
+            from app.chat_resume import resume_tokens
+            from app.chat_snapshot import chat_snapshots
+            from app.moderation_pipeline import moderation_pipeline
+            from app.typing_indicator import typing_indicators
+            from app.services.content_moderation_service import content_moderation_service
+            chat_snapshots.init_app(app)
+            resume_tokens.init_app(app)
+            moderation_pipeline.init_app(app)
+            content_moderation_service.init_app(app)
+            typing_indicators.init_app(app)
+        if 'therapy' in enabled:
+            from app import therapy_socket_events
+        
+        socketio.init_app(app, async_mode=async_mode or app.config['SOCKETIO_ASYNC_MODE'])
+        runtime.init_app(app, socketio.async_mode)
+    
+    # Enable CORS for all routes
+    CORS(app)
+    
+    # gzip/brotli for large responses; registered first so it runs last
+    compression.init_app(app)
+    
+    # Request latency, SQL query counts, /metrics and opt-in ?profile=1
+    instrumentation.init_app(app)
+    
+    # Token buckets for chat events and the moderation endpoint
+    rate_limiter.init_app(app)
+    
+    # Import and register blueprints here
+    from app.routes.main import main_bp
+    from app.routes.auth import auth_bp
+    app.register_blueprint(main_bp)
+    app.register_blueprint(auth_bp)
+    
+    if 'quotes' in enabled:
+        from app.routes.quote import quote_bp
+        app.register_blueprint(quote_bp)
+    
+    if 'diary' in enabled:
+        from app.routes.diary import diary_bp
+        from app.routes.calendar import calendar_bp
+        app.register_blueprint(diary_bp)
+        app.register_blueprint(calendar_bp)
+    
+    if 'chat' in enabled:
+        from app.routes.chat import chat_bp
+        app.register_blueprint(chat_bp)
+    
+    if 'therapy' in enabled:
+        from app.routes.therapy import therapy_bp
+        app.register_blueprint(therapy_bp)
+    
+    if enabled & {'quotes', 'diary'}:
+        # Warm the in-memory quote pool so random quotes never hit the database
+        from app.services.quote_pool import quote_pool
+        quote_pool.init_app(app)
+    
+    @app.route('/')
+    def hello():
+        return "Hello from Flask Backend!"
+    
+    @app.route('/health')
+    @app.route('/api/health')
+    def health_check():
+        return {"status": "healthy", "service": "flask-backend", "features": sorted(enabled)}
+    
+    return app
@@ -0,0 +1,265 @@
+"""
+Instrumentation Module
+Per-route and per-Socket.IO-event latency histograms, SQL query counts and
+time per request (via SQLAlchemy cursor events), moderation time, a
+Prometheus-format /metrics endpoint and opt-in per-request profiling
+"""
+
+import contextvars
+import functools
+import io
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.db_pool import WAIT_BUCKETS, pool_metrics
+from app.runtime import native_lock
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Query stats for the request/event currently being handled; database work
+# stays on the handler's thread or greenlet (see app.runtime.offload)
+current_stats = contextvars.ContextVar('current_stats', default=None)
+
+
+class QueryStats:
+    __slots__ = ('queries', 'seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        # Observed on hub greenlets and in offload pool threads (moderation)
+        self._lock = native_lock()
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labelvalues, values in sorted(series.items()):
+            labels = _format_labels(self.labelnames, labelvalues)
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_join_labels(labels, bound)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_join_labels(labels, '+Inf')} {values[-1]}")
+            lines.append(f"{self.name}_sum{_wrap(labels)} {values[-2]}")
+            lines.append(f"{self.name}_count{_wrap(labels)} {values[-1]}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _join_labels(labels, bound):
+    le = f'le="{bound}"'
+    return '{' + (f"{labels},{le}" if labels else le) + '}'
+
+
+def _wrap(labels):
+    return '{' + labels + '}' if labels else ''
+
+
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route', 'status'))
+http_request_queries = Histogram(
+    'http_request_db_queries', 'SQL queries issued per HTTP request', ('route',), QUERY_COUNT_BUCKETS)
+http_request_db_time = Histogram(
+    'http_request_db_seconds', 'Time spent in SQL per HTTP request', ('route',))
+socketio_event_duration = Histogram(
+    'socketio_event_duration_seconds', 'Socket.IO event handler latency', ('event',))
+socketio_event_queries = Histogram(
+    'socketio_event_db_queries', 'SQL queries issued per Socket.IO event', ('event',), QUERY_COUNT_BUCKETS)
+socketio_event_db_time = Histogram(
+    'socketio_event_db_seconds', 'Time spent in SQL per Socket.IO event', ('event',))
+moderation_duration = Histogram(
+    'moderation_duration_seconds', 'Content moderation time per call', ('operation',))
+
+HISTOGRAMS = [
+    http_request_duration, http_request_queries, http_request_db_time,
+    socketio_event_duration, socketio_event_queries, socketio_event_db_time,
+    moderation_duration,
+]
+
+# Extra exposition callbacks (returning lists of lines) registered by other modules
+_collectors = []
+
+
+def register_collector(collector):
+    """Add a callable returning extra Prometheus exposition lines"""
+    _collectors.append(collector)
+    return collector
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats.get()
+    if stats is None:
+        return
+    started = conn.info.get('query_started')
+    stats.queries += 1
+    if started:
+        stats.seconds += time.perf_counter() - started.pop()
+
+
+def instrumented_event(name):
+    """Decorator recording latency and SQL usage for a Socket.IO event handler"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            stats = QueryStats()
+            token = current_stats.set(stats)
+            started = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                socketio_event_duration.observe(time.perf_counter() - started, name)
+                socketio_event_queries.observe(stats.queries, name)
+                socketio_event_db_time.observe(stats.seconds, name)
+                current_stats.reset(token)
+        return wrapper
+    return decorator
+
+
+def _pool_metrics_lines():
+    snapshot = pool_metrics.snapshot()
+    lines = [
+        '# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled connection',
+        '# TYPE db_pool_checkout_wait_seconds histogram',
+    ]
+    cumulative = 0
+    for bound in WAIT_BUCKETS:
+        cumulative += snapshot['wait_histogram'][str(bound)]
+        lines.append(f'db_pool_checkout_wait_seconds_bucket{{le="{bound}"}} {cumulative}')
+    lines.append(f'db_pool_checkout_wait_seconds_bucket{{le="+Inf"}} {snapshot["checkouts"]}')
+    lines.append(f'db_pool_checkout_wait_seconds_sum {snapshot["wait_seconds_total"]}')
+    lines.append(f'db_pool_checkout_wait_seconds_count {snapshot["checkouts"]}')
+    lines.append('# TYPE db_pool_checkout_timeouts_total counter')
+    lines.append(f'db_pool_checkout_timeouts_total {snapshot["timeouts"]}')
+    for key in ('pool_size', 'checked_in', 'checked_out', 'overflow'):
+        if key in snapshot:
+            lines.append(f'# TYPE db_pool_{key} gauge')
+            lines.append(f'db_pool_{key} {snapshot[key]}')
+    return lines
+
+
+def render_metrics():
+    """Render all metrics in the Prometheus text exposition format"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+    lines.extend(_pool_metrics_lines())
+    for collector in _collectors:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
+
+
+def _start_profiler():
+    try:
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        return 'pyinstrument', profiler
+    except ImportError:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return 'cprofile', profiler
+
+
+def _profile_report(kind, profiler):
+    if kind == 'pyinstrument':
+        profiler.stop()
+        return profiler.output_text(unicode=True, color=False)
+    import pstats
+    profiler.disable()
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(40)
+    return output.getvalue()
+
+
+def init_app(app):
+    """Install request hooks and the /metrics endpoint"""
+
+    @app.before_request
+    def start_request_instrumentation():
+        g._request_started = time.perf_counter()
+        g._query_stats = QueryStats()
+        g._query_stats_token = current_stats.set(g._query_stats)
+        if app.config.get('PROFILING_ENABLED') and request.args.get('profile') == '1':
+            g._profiler = _start_profiler()
+
+    @app.after_request
+    def finish_request_instrumentation(response):
+        started = g.pop('_request_started', None)
+        stats = g.pop('_query_stats', None)
+        if started is None or stats is None:
+            return response
+
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_duration.observe(elapsed, request.method, route, response.status_code)
+        http_request_queries.observe(stats.queries, route)
+        http_request_db_time.observe(stats.seconds, route)
+
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            report = _profile_report(*profiler)
+            summary = (f"{request.method} {request.full_path} -> {response.status_code} in "
+                       f"{elapsed * 1000:.1f}ms, {stats.queries} SQL queries ({stats.seconds * 1000:.1f}ms)\n\n")
+            return Response(summary + report, mimetype='text/plain')
+        return response
+
+    @app.teardown_request
+    def reset_request_instrumentation(exc):
+        token = g.pop('_query_stats_token', None)
+        if token is not None:
+            current_stats.reset(token)
+
+    if app.config.get('METRICS_ENABLED', True):
+        @app.route('/metrics')
+        def metrics():
+            return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -3,9 +3,20 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+def dialect_insert():
+    """The current database's insert() construct, which supports ON CONFLICT upserts"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Upserts are not supported on {dialect}")
+    return insert
+
 # Import all models to ensure they are registered with SQLAlchemy
 from app.models.user import User
 from app.models.diary import Diary
 from app.models.quote import Quote
 from app.models.migration import Migration
-from app.models.chat import ChatGroup, Message, UserFlag, BannedUser, TherapySession, TherapyMessage
\ No newline at end of file
+from app.models.chat import ChatGroup, Message, UserFlag, BannedUser, TherapySession, TherapyMessage
@@ -25,7 +25,17 @@ class ChatGroup(db.Model):
         }
 
 class Message(db.Model):
+    # On PostgreSQL this table is partitioned by month on created_at (migration
+    # 010), so its primary key there is (id, created_at); ids stay unique
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('idx_messages_group_created', 'group_id', 'created_at'),
+        # Retried sends carry the same client_message_id (see ChatService.save_message);
+        # on PostgreSQL the partitions each have this index instead (migration 011)
+        db.Index('uq_messages_client_message_id', 'user_session_id', 'client_message_id', unique=True,
+                 sqlite_where=db.text('client_message_id IS NOT NULL'),
+                 postgresql_where=db.text('client_message_id IS NOT NULL')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey('chat_groups.id'), nullable=False)
@@ -34,6 +44,7 @@ class Message(db.Model):
     content = db.Column(db.Text, nullable=False)
     flagged = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    client_message_id = db.Column(db.String(64), nullable=True)  # optional, for idempotent retries
     
     # Relationship
     group = db.relationship('ChatGroup', backref=db.backref('messages', lazy=True))
@@ -46,7 +57,8 @@ class Message(db.Model):
             'username': self.username,
             'content': self.content,
             'flagged': self.flagged,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'client_message_id': self.client_message_id
         }
 
 class UserFlag(db.Model):
@@ -92,6 +104,11 @@ class BannedUser(db.Model):
 
 class TherapySession(db.Model):
     __tablename__ = 'therapy_sessions'
+    __table_args__ = (
+        db.Index('idx_therapy_sessions_status', 'status'),
+        db.Index('idx_therapy_sessions_user_session', 'user_session_id'),
+        db.Index('idx_therapy_sessions_therapist', 'therapist_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_session_id = db.Column(db.String(100), nullable=False)
@@ -123,6 +140,12 @@ class TherapySession(db.Model):
 
 class TherapyMessage(db.Model):
     __tablename__ = 'therapy_messages'
+    __table_args__ = (
+        db.Index('idx_therapy_messages_session_created', 'session_id', 'created_at'),
+        db.Index('uq_therapy_messages_client_message_id', 'sender_id', 'client_message_id', unique=True,
+                 sqlite_where=db.text('client_message_id IS NOT NULL'),
+                 postgresql_where=db.text('client_message_id IS NOT NULL')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('therapy_sessions.id'), nullable=False)
@@ -130,6 +153,7 @@ class TherapyMessage(db.Model):
     sender_type = db.Column(db.String(10), nullable=False)  # 'user' or 'therapist'
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    client_message_id = db.Column(db.String(64), nullable=True)  # optional, for idempotent retries
     
     # Relationship
     session = db.relationship('TherapySession', backref=db.backref('messages', lazy=True))
@@ -141,5 +165,6 @@ class TherapyMessage(db.Model):
             'sender_id': self.sender_id,
             'sender_type': self.sender_type,
             'content': self.content,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'client_message_id': self.client_message_id
         }
\ No newline at end of file
@@ -3,6 +3,10 @@ import datetime
 
 class Diary(db.Model):
     __tablename__ = 'diary'
+    __table_args__ = (
+        # One entry per user per day; also serves (user_id, date) lookups
+        db.UniqueConstraint('user_id', 'date', name='uq_diary_user_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False)
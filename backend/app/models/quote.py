@@ -1,5 +1,10 @@
 from app.models import db
 import datetime
+import hashlib
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
 
 class Quote(db.Model):
     __tablename__ = 'quotes'
@@ -9,6 +14,18 @@ class Quote(db.Model):
     author = db.Column(db.String(255), nullable=True)
     category = db.Column(db.String(100), nullable=True)  # e.g., motivation, anxiety, etc.
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    text_hash = db.Column(db.String(40), unique=True, nullable=True)  # Hash of normalized text for deduplication
+    
+    @staticmethod
+    def normalize_text(text):
+        """Normalize quote text so trivial differences (case, punctuation, spacing) compare equal"""
+        text = unicodedata.normalize('NFKC', text).casefold()
+        return ' '.join(_NON_WORD.sub(' ', text).split())
+    
+    @staticmethod
+    def hash_text(text):
+        """Hash of the normalized quote text"""
+        return hashlib.sha1(Quote.normalize_text(text).encode('utf-8')).hexdigest()
     
     def __repr__(self):
         return f'<Quote {self.id}: {self.text[:50]}...>'
@@ -0,0 +1,104 @@
+"""
+Moderation Pipeline Module
+Keeps content moderation and violation handling off the live chat path
+
+Moderation runs in the bounded offload pool (see app.runtime) with a
+latency budget; a message that cannot be checked in time is rejected
+rather than broadcast unchecked. Flagging, bans and removing banned users
+from their group run on a background queue after the message has been
+broadcast, and the sender is notified with 'flagged' or 'banned' events.
+"""
+
+import logging
+
+from app import socketio
+from app.instrumentation import register_collector
+from app.runtime import OffloadTimeout, get_app, native_lock, offload_with_timeout
+from app.services.chat_service import chat_service
+
+logger = logging.getLogger(__name__)
+
+
+class ModerationPipeline:
+    def __init__(self, timeout=0.25):
+        self.timeout = timeout  # latency budget for moderating one message, in seconds
+        self.timeouts = 0
+        self.processed = 0
+        self.pending = 0
+        self._queue = None
+        self._lock = native_lock()
+
+    def init_app(self, app):
+        self.timeout = app.config.get('MODERATION_TIMEOUT_MS', 250) / 1000
+
+    def moderate(self, content):
+        """
+        Moderate a message within the latency budget
+
+        Returns:
+            dict or None: ChatService.moderate_message() result, or None if the budget ran out
+        """
+        try:
+            return offload_with_timeout(self.timeout, chat_service.moderate_message, content)
+        except OffloadTimeout:
+            with self._lock:
+                self.timeouts += 1
+            logger.warning("Moderation took longer than %.0f ms; message rejected", self.timeout * 1000)
+            return None
+
+    def report_violation(self, user_session_id, violations, sid):
+        """Queue flagging for a user whose message was inappropriate"""
+        with self._lock:
+            if self._queue is None:
+                # The async mode's own queue type, so waiting never blocks the hub
+                self._queue = socketio.server.eio.create_queue()
+                socketio.start_background_task(self._work)
+            self.pending += 1
+        self._queue.put((user_session_id, ', '.join(violations), violations, sid))
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._handle(*item)
+            except Exception as e:
+                logger.exception("Error handling moderation violation: %s", e)
+            finally:
+                with self._lock:
+                    self.pending -= 1
+                    self.processed += 1
+
+    @staticmethod
+    def _handle(user_session_id, reason, violations, sid):
+        with get_app().app_context():
+            user_flag = chat_service.flag_user(user_session_id, reason)
+        if user_flag['is_banned']:
+            socketio.emit('banned', {'message': 'You are banned from chat'}, to=sid)
+        else:
+            socketio.emit('flagged', {
+                'violations': violations,
+                'flag_count': user_flag['flag_count']
+            }, to=sid)
+
+    def wait_idle(self, timeout=5.0, interval=0.01):
+        """Wait for queued violations to be handled; returns False on timeout"""
+        waited = 0.0
+        while self.pending and waited < timeout:
+            socketio.sleep(interval)
+            waited += interval
+        return not self.pending
+
+    def metrics_lines(self):
+        return [
+            '# TYPE moderation_timeouts_total counter',
+            f'moderation_timeouts_total {self.timeouts}',
+            '# TYPE moderation_violation_queue_depth gauge',
+            f'moderation_violation_queue_depth {self.pending}',
+            '# TYPE moderation_violations_processed_total counter',
+            f'moderation_violations_processed_total {self.processed}',
+        ]
+
+
+# Create a global instance for use throughout the application
+moderation_pipeline = ModerationPipeline()
+register_collector(moderation_pipeline.metrics_lines)
@@ -0,0 +1,180 @@
+"""
+Outbound Module
+Bounded per-connection send buffers for Socket.IO
+
+Engine.IO keeps every packet for a connection in an unbounded queue until
+the transport takes it (the websocket writer, or the client's next poll),
+so a client on a stalled network piles up frames in server memory. Room
+broadcasts check the depth of that queue per connection:
+
+- Ephemeral events (typing_users) are not queued behind a backlog. A
+  connection with `ephemeral_depth` or more packets pending gets them
+  through a small buffer of `held` events that drops the oldest, and the
+  buffer is delivered once the backlog drains.
+- A connection with more than `max_lag` packets pending is disconnected
+  and its backlog discarded. The client reconnects and resumes with its
+  resume token (app/chat_resume.py), getting the messages it missed.
+"""
+
+import logging
+from collections import deque
+
+from app import socketio
+from app.instrumentation import register_collector
+from app.runtime import native_lock
+
+logger = logging.getLogger(__name__)
+
+
+def room_sids(room, namespace='/'):
+    return [sid for sid, _ in socketio.server.manager.get_participants(namespace, room)]
+
+
+class OutboundQueues:
+    def __init__(self, ephemeral_depth=8, max_lag=256, held=4, interval=0.25):
+        self.ephemeral_depth = ephemeral_depth  # pending packets before ephemeral events are held back
+        self.max_lag = max_lag  # pending packets before a connection is disconnected
+        self.held = held  # ephemeral events kept per connection (the oldest are dropped)
+        self.interval = interval  # seconds between attempts to deliver held events
+        self._held = {}  # sid -> deque of (event, payload, encode)
+        self._running = False
+        self._lock = native_lock()
+        self.dropped = 0
+        self.evicted = 0
+        self.discarded = 0
+
+    def init_app(self, app):
+        self.ephemeral_depth = app.config.get('OUTBOUND_EPHEMERAL_DEPTH', self.ephemeral_depth)
+        self.max_lag = app.config.get('OUTBOUND_MAX_LAG', self.max_lag)
+        self.held = app.config.get('OUTBOUND_HELD_EVENTS', self.held)
+
+    def _socket(self, sid, namespace='/'):
+        """The Engine.IO socket of a Socket.IO connection, or None (test clients have none)"""
+        server = socketio.server
+        eio_sid = server.manager.eio_sid_from_sid(sid, namespace)
+        return server.eio.sockets.get(eio_sid) if eio_sid is not None else None
+
+    def depth(self, sid):
+        """Packets waiting to be sent to a connection"""
+        socket = self._socket(sid)
+        return socket.queue.qsize() if socket is not None else 0
+
+    def backlogged(self, sids):
+        """The connections that should not be sent ephemeral events now"""
+        return {sid for sid in sids if self.depth(sid) >= self.ephemeral_depth}
+
+    def hold(self, sid, event, payload, encode):
+        """Keep an ephemeral event for a backlogged connection, dropping its oldest held event if full"""
+        with self._lock:
+            held = self._held.get(sid)
+            if held is None:
+                held = self._held[sid] = deque(maxlen=self.held)
+            if len(held) == held.maxlen:
+                self.dropped += 1
+            held.append((event, payload, encode))
+            if self._running:
+                return
+            self._running = True
+        socketio.start_background_task(self._run)
+
+    def deliver(self):
+        """
+        Send held events to connections whose backlog has drained
+
+        Returns:
+            int: The number of events sent
+        """
+        with self._lock:
+            sids = list(self._held)
+        sent = 0
+        for sid in sids:
+            if self._socket(sid) is not None and self.depth(sid) >= self.ephemeral_depth:
+                continue
+            with self._lock:
+                held = self._held.pop(sid, ())
+            for event, payload, encode in held:
+                socketio.emit(event, encode(sid, payload), to=sid)
+                sent += 1
+        return sent
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.interval)
+            try:
+                self.deliver()
+            except Exception as e:
+                logger.exception("Error delivering held Socket.IO events: %s", e)
+            with self._lock:
+                if not self._held:
+                    self._running = False
+                    return
+
+    def evict_lagging(self, sids):
+        """
+        Disconnect the connections more than max_lag packets behind
+
+        Returns:
+            list: The sids disconnected
+        """
+        evicted = [sid for sid in sids if self.depth(sid) > self.max_lag]
+        for sid in evicted:
+            self.evict(sid)
+        return evicted
+
+    def evict(self, sid):
+        """Discard a connection's backlog and close its transport without waiting for it to drain"""
+        socket = self._socket(sid)
+        if socket is None:
+            return
+        empty = socketio.server.eio.get_queue_empty_exception()
+        discarded = 0
+        while True:
+            try:
+                socket.queue.get(block=False)
+            except empty:
+                break
+            socket.queue.task_done()
+            discarded += 1
+        logger.info("Disconnecting %s, %d packets behind", sid, discarded)
+        # abort: no CLOSE packet, so the client sees a transport error and reconnects
+        socket.close(wait=False, abort=True)
+        socketio.server.eio.sockets.pop(socket.sid, None)
+        with self._lock:
+            self.evicted += 1
+            self.discarded += discarded
+
+    def forget(self, sid):
+        with self._lock:
+            self._held.pop(sid, None)
+
+    def reset(self):
+        with self._lock:
+            self._held.clear()
+
+    def metrics_lines(self):
+        server = getattr(socketio, 'server', None)
+        sockets = list(server.eio.sockets.values()) if server is not None else []
+        depths = [socket.queue.qsize() for socket in sockets]
+        with self._lock:
+            held = sum(len(events) for events in self._held.values())
+        return [
+            '# TYPE socketio_outbound_queue_depth_max gauge',
+            f'socketio_outbound_queue_depth_max {max(depths, default=0)}',
+            '# TYPE socketio_outbound_queued_packets gauge',
+            f'socketio_outbound_queued_packets {sum(depths)}',
+            '# TYPE socketio_outbound_backlogged_connections gauge',
+            f'socketio_outbound_backlogged_connections {sum(depth >= self.ephemeral_depth for depth in depths)}',
+            '# TYPE socketio_outbound_held_events gauge',
+            f'socketio_outbound_held_events {held}',
+            '# TYPE socketio_outbound_dropped_events_total counter',
+            f'socketio_outbound_dropped_events_total {self.dropped}',
+            '# TYPE socketio_slow_consumer_disconnects_total counter',
+            f'socketio_slow_consumer_disconnects_total {self.evicted}',
+            '# TYPE socketio_outbound_discarded_packets_total counter',
+            f'socketio_outbound_discarded_packets_total {self.discarded}',
+        ]
+
+
+# Create a global instance for use throughout the application
+outbound_queues = OutboundQueues()
+register_collector(outbound_queues.metrics_lines)
@@ -0,0 +1,106 @@
+"""
+Query Counter Module
+Counts the SQL statements issued inside a block so hot paths can be held
+to a query budget, and reports statements repeated in loops (N+1 queries)
+"""
+
+import functools
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block issues more SQL statements than its budget allows"""
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self, threshold=2):
+        """Statements executed at least `threshold` times (likely N+1 loops)"""
+        return {statement: times for statement, times in Counter(self.statements).most_common()
+                if times >= threshold}
+
+    def report(self):
+        lines = [f"{self.count} queries issued:"]
+        lines.extend(f"  {index + 1}. {statement}" for index, statement in enumerate(self.statements))
+        repeated = self.repeated()
+        if repeated:
+            lines.append("Repeated statements (possible N+1):")
+            lines.extend(f"  {times}x {statement}" for statement, times in repeated.items())
+        return '\n'.join(lines)
+
+
+@contextmanager
+def count_queries(engine=Engine, all_threads=False):
+    """
+    Count SQL statements executed while the block runs
+
+    Args:
+        engine: Engine to listen on (defaults to every engine)
+        all_threads (bool): Also count statements issued by other threads
+
+    Yields:
+        QueryCounter: Holds the executed statements once the block exits
+    """
+    counter = QueryCounter()
+    thread_id = threading.get_ident()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if all_threads or threading.get_ident() == thread_id:
+            counter.statements.append(' '.join(statement.split()))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class query_budget:
+    """
+    Fail when a block issues more than `max_queries` SQL statements
+
+    Usable as a context manager or a decorator:
+
+        with query_budget(3):
+            client.get('/api/calendar/view/...')
+
+        @query_budget(2)
+        def test_something(): ...
+    """
+
+    def __init__(self, max_queries, engine=Engine, all_threads=False):
+        self.max_queries = max_queries
+        self.engine = engine
+        self.all_threads = all_threads
+        self.counter = None
+        self._context = None
+
+    def __enter__(self):
+        self._context = count_queries(self.engine, self.all_threads)
+        self.counter = self._context.__enter__()
+        return self.counter
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._context.__exit__(exc_type, exc, traceback)
+        if exc_type is None and self.counter.count > self.max_queries:
+            raise QueryBudgetExceeded(
+                f"Query budget of {self.max_queries} exceeded. {self.counter.report()}")
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_budget(self.max_queries, self.engine, self.all_threads):
+                return func(*args, **kwargs)
+        return wrapper
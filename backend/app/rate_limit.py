@@ -0,0 +1,285 @@
+"""
+Rate Limit Module
+Token-bucket rate limiting for Socket.IO events and Flask routes, keyed
+per user_session_id and per client IP
+
+Each bucket holds up to `burst` tokens and refills continuously at `rate`
+tokens per second; the refill is computed from the time since the last
+hit, so a check is O(1). A check takes a token from the user's and the
+IP's bucket only if both have one. Buckets idle long enough to be full
+again are equivalent to new ones and are dropped lazily. The in-memory backend is
+per process; set RATE_LIMIT_BACKEND=redis to share buckets between workers.
+"""
+
+import functools
+import logging
+import time
+
+from flask import jsonify, request
+
+from app.instrumentation import register_collector
+from app.runtime import native_lock
+
+logger = logging.getLogger(__name__)
+
+# Per-IP buckets allow this many times the per-user rate and burst, since
+# several users can share an address (NAT, campus networks)
+DEFAULT_IP_FACTOR = 10
+
+
+class MemoryBackend:
+    def __init__(self, sweep_interval=60.0):
+        self._buckets = {}  # key -> [tokens, last refill time, seconds until full]
+        self._lock = native_lock()
+        self._last_sweep = time.monotonic()
+        self.sweep_interval = sweep_interval
+
+    def consume(self, key, rate, burst, cost=1.0):
+        """
+        Take `cost` tokens from a bucket
+
+        Returns:
+            tuple: (allowed, seconds until enough tokens are available)
+        """
+        return self.consume_all([(key, rate, burst)], cost)
+
+    def consume_all(self, buckets, cost=1.0):
+        """
+        Take `cost` tokens from every bucket, or from none if any is short
+
+        Args:
+            buckets: (key, rate, burst) per bucket
+
+        Returns:
+            tuple: (allowed, seconds until all buckets have enough tokens)
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, rate, burst in buckets:
+                bucket = self._buckets.get(key)
+                tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+                levels.append(tokens)
+            retry_after = max(
+                [(cost - tokens) / rate for tokens, (_, rate, _) in zip(levels, buckets) if tokens < cost],
+                default=0.0
+            )
+            allowed = not retry_after
+            for tokens, (key, rate, burst) in zip(levels, buckets):
+                if allowed:
+                    tokens -= cost
+                self._buckets[key] = [tokens, now, (burst - tokens) / rate]
+
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+        return allowed, retry_after
+
+    def _sweep(self, now):
+        self._last_sweep = now
+        idle = [key for key, (_, last, full_after) in self._buckets.items() if now - last >= full_after]
+        for key in idle:
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Atomic token buckets in Redis, using the server clock so workers agree on
+# time; tokens are taken from every bucket (KEYS) or, if any is short, none.
+# ARGV: cost, then rate and burst per key
+_REDIS_TOKEN_BUCKETS = """
+local cost = tonumber(ARGV[1])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1])
+    if tokens == nil then
+        tokens = burst
+    else
+        tokens = math.min(burst, tokens + math.max(0, now - tonumber(bucket[2])) * rate)
+    end
+    levels[i] = tokens
+    if tokens < cost then
+        retry_after = math.max(retry_after, (cost - tokens) / rate)
+    end
+end
+local allowed = 0
+if retry_after == 0 then
+    allowed = 1
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local tokens = levels[i]
+    if allowed == 1 then
+        tokens = tokens - cost
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil((burst - tokens) / rate * 1000) + 1000)
+end
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisBackend:
+    """Shared buckets for multi-worker deployments; keys expire once full again"""
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKETS)
+        self.prefix = prefix
+
+    def consume(self, key, rate, burst, cost=1.0):
+        return self.consume_all([(key, rate, burst)], cost)
+
+    def consume_all(self, buckets, cost=1.0):
+        args = [cost]
+        for _, rate, burst in buckets:
+            args += [rate, burst]
+        allowed, retry_after = self._script(keys=[self.prefix + key for key, _, _ in buckets], args=args)
+        return bool(allowed), float(retry_after)
+
+
+class RateLimiter:
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self.enabled = True
+        self.ip_factor = DEFAULT_IP_FACTOR
+        self.trusted_proxies = 0  # reverse proxies in front of the app that set X-Forwarded-For
+        self.overrides = {}  # scope -> (rate, burst)
+        self.rejections = {}  # scope -> count
+        self._lock = native_lock()
+
+    def init_app(self, app):
+        """Configure the backend and per-scope limits from the app config"""
+        config = app.config
+        self.enabled = config.get('RATE_LIMIT_ENABLED', True)
+        self.ip_factor = config.get('RATE_LIMIT_IP_FACTOR', DEFAULT_IP_FACTOR)
+        self.trusted_proxies = config.get('RATE_LIMIT_TRUSTED_PROXIES', 0)
+        self.overrides = parse_limits(config.get('RATE_LIMITS', ''))
+        self.rejections = {}
+
+        if config.get('RATE_LIMIT_BACKEND', 'memory') == 'redis':
+            try:
+                self.backend = RedisBackend(config['RATE_LIMIT_REDIS_URL'])
+            except ImportError:
+                logger.warning("RATE_LIMIT_BACKEND=redis but the redis package is not installed; "
+                               "using per-process buckets")
+                self.backend = MemoryBackend()
+        else:
+            self.backend = MemoryBackend()
+
+    def limits(self, scope, rate, burst):
+        return self.overrides.get(scope, (rate, burst))
+
+    def client_ip(self):
+        """
+        The client's address for the current request or Socket.IO connection.
+        Behind `trusted_proxies` reverse proxies it is taken from
+        X-Forwarded-For, counting from the right (entries further left can
+        be set by the client).
+        """
+        if self.trusted_proxies:
+            forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',')]
+            forwarded = [part for part in forwarded if part]
+            if len(forwarded) >= self.trusted_proxies:
+                return forwarded[-self.trusted_proxies]
+        return request.remote_addr
+
+    def check(self, scope, user_key, ip, rate, burst):
+        """
+        Consume one token from the user's and the IP's bucket for `scope`
+
+        Returns:
+            float or None: Seconds to wait if limited, otherwise None
+        """
+        if not self.enabled:
+            return None
+        rate, burst = self.limits(scope, rate, burst)
+        buckets = []
+        if user_key:
+            buckets.append((f'{scope}:user:{user_key}', rate, burst))
+        if ip:
+            buckets.append((f'{scope}:ip:{ip}', rate * self.ip_factor, burst * self.ip_factor))
+        if not buckets:
+            return None
+        allowed, retry_after = self.backend.consume_all(buckets)
+        if not allowed:
+            with self._lock:
+                self.rejections[scope] = self.rejections.get(scope, 0) + 1
+            return retry_after
+        return None
+
+    def limit_event(self, scope, rate, burst, notify=True):
+        """
+        Decorator for Socket.IO handlers receiving a dict with user_session_id.
+        Limited events are dropped; with notify the client gets a
+        'rate_limited' event with the seconds to wait.
+        """
+        def decorator(handler):
+            @functools.wraps(handler)
+            def wrapper(data=None, *args, **kwargs):
+                user_key = data.get('user_session_id') if isinstance(data, dict) else None
+                retry_after = self.check(scope, user_key, self.client_ip(), rate, burst)
+                if retry_after is not None:
+                    if notify:
+                        # Imported here so apps without Socket.IO never load it
+                        from flask_socketio import emit
+                        emit('rate_limited', {'event': scope, 'retry_after': round(retry_after, 3)})
+                    return None
+                return handler(data, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def limit_route(self, scope, rate, burst):
+        """Decorator for Flask views; limited requests get a 429 with Retry-After"""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                data = request.get_json(silent=True)
+                user_key = data.get('user_session_id') if isinstance(data, dict) else None
+                retry_after = self.check(scope, user_key, self.client_ip(), rate, burst)
+                if retry_after is not None:
+                    response = jsonify({
+                        'success': False,
+                        'error': 'Too many requests',
+                        'retry_after': round(retry_after, 3)
+                    })
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+                    return response
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def metrics_lines(self):
+        lines = ['# TYPE rate_limit_rejections_total counter']
+        with self._lock:
+            rejections = sorted(self.rejections.items())
+        for scope, count in rejections:
+            lines.append(f'rate_limit_rejections_total{{scope="{scope}"}} {count}')
+        return lines
+
+
+def parse_limits(spec):
+    """
+    Parse per-scope overrides like "send_message=2:5,typing=4:8"
+    (rate in tokens per second : burst size)
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        scope, _, value = item.partition('=')
+        rate, _, burst = value.partition(':')
+        limits[scope.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+# Create a global instance for use throughout the application
+rate_limiter = RateLimiter()
+register_collector(rate_limiter.metrics_lines)
@@ -1,8 +1,21 @@
 # Initialize routes blueprints
-from app.routes.auth import auth_bp
-from app.routes.main import main_bp
-from app.routes.quote import quote_bp
-from app.routes.diary import diary_bp
-from app.routes.calendar import calendar_bp
-from app.routes.chat import chat_bp
-from app.routes.therapy import therapy_bp
\ No newline at end of file
+# Blueprints are imported on first access so that the app factory only
+# loads the subsystems enabled for this process
+import importlib
+
+_EXPORTS = {
+    'auth_bp': 'app.routes.auth',
+    'main_bp': 'app.routes.main',
+    'quote_bp': 'app.routes.quote',
+    'diary_bp': 'app.routes.diary',
+    'calendar_bp': 'app.routes.calendar',
+    'chat_bp': 'app.routes.chat',
+    'therapy_bp': 'app.routes.therapy',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module 'app.routes' has no attribute '{name}'")
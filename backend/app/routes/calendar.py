@@ -1,9 +1,9 @@
 from flask import Blueprint, jsonify, request
 from app.services.calendar_service import CalendarService
 from app.services.diary_service import DiaryService
-from app.services.quote_service import QuoteService
+from app.services.daily_quote_service import DailyQuoteService
 from app.services.user_service import UserService
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 calendar_bp = Blueprint('calendar', __name__)
 
@@ -86,25 +86,46 @@ def get_today_info(supabase_user_id):
 @calendar_bp.route('/api/calendar/quote/<string:supabase_user_id>', methods=['GET'])
 def get_daily_quote(supabase_user_id):
     """
-    Get a daily quote for the user (ensuring no repetition)
+    Get the quote of the day for the user (no repeats until the pool is exhausted)
     
     Args:
         supabase_user_id (str): The Supabase user ID (email)
+    
+    Query parameters:
+        date: Optional date in YYYY-MM-DD format (defaults to today)
          
     Returns:
-        JSON: A random quote
+        JSON: The user's quote for the date
     """
+    date_str = request.args.get('date')
+    if date_str:
+        try:
+            date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Expected YYYY-MM-DD"}), 400
+    else:
+        date_obj = date.today()
+    
     try:
         # Map Supabase user ID to local user ID
         user = UserService.get_or_create_user_by_supabase_id(supabase_user_id)
         if not user:
             return jsonify({"error": "User not found"}), 404
             
-        # In a more advanced implementation, we could track which quotes
-        # the user has seen recently to avoid repetition
-        quote = QuoteService.get_random_quote()
-        if quote:
-            return jsonify(quote.to_dict())
-        return jsonify({"error": "No quotes available"}), 404
+        quote = DailyQuoteService.get_daily_quote(user.id, date_obj)
+        if not quote:
+            return jsonify({"error": "No quotes available"}), 404
+        
+        # The quote is a pure function of (user, date), so it can be cached
+        # by the client until the date rolls over
+        response = jsonify(quote.to_dict())
+        if date_obj == date.today():
+            midnight = datetime.combine(date_obj + timedelta(days=1), datetime.min.time())
+            max_age = max(int((midnight - datetime.now()).total_seconds()), 0)
+        else:
+            max_age = 86400
+        response.headers['Cache-Control'] = f'private, max-age={max_age}'
+        response.add_etag()
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({"error": f"Failed to fetch quote: {str(e)}"}), 500
\ No newline at end of file
@@ -2,8 +2,12 @@ from flask import Blueprint, request, jsonify
 from sqlalchemy import and_
 from app.models import db
 from app.models.chat import ChatGroup, Message, UserFlag, BannedUser
+from app.rate_limit import rate_limiter
+from app.runtime import offload
+from app.serialization import USER_FLAG_ROWS
 from app.services.chat_service import chat_service
 from app.services.content_moderation_service import content_moderation_service
+from app.services.message_dedup import valid_client_message_id
 
 chat_bp = Blueprint('chat', __name__)
 
@@ -57,18 +61,25 @@ def join_group():
         }), 500
 
 @chat_bp.route('/api/chat/message', methods=['POST'])
+@rate_limiter.limit_route('send_message', rate=1, burst=5)
 def send_message():
     """Send a message to the chat group."""
     try:
         data = request.get_json()
         user_session_id = data.get('user_session_id')
         content = data.get('content')
+        client_message_id = data.get('client_message_id')
         
         if not user_session_id or not content:
             return jsonify({
                 'success': False,
                 'error': 'User session ID and content are required'
             }), 400
+        if not valid_client_message_id(client_message_id):
+            return jsonify({
+                'success': False,
+                'error': 'client_message_id must be a string of at most 64 characters'
+            }), 400
         
         # Check if user is banned
         if chat_service.is_user_banned(user_session_id):
@@ -78,8 +89,10 @@ def send_message():
                 'banned': True
             }), 403
         
-        # Send message
-        result = chat_service.send_message(user_session_id, content)
+        # Moderation may wait on the toxicity model, so it runs off the hub;
+        # the database work stays on it (see app.runtime.offload)
+        moderation = offload(chat_service.moderate_message, content)
+        result = chat_service.send_message(user_session_id, content, client_message_id, moderation)
         
         if not result['success']:
             return jsonify(result), 400
@@ -157,6 +170,7 @@ def get_user_status(user_session_id):
         }), 500
 
 @chat_bp.route('/api/chat/moderate', methods=['POST'])
+@rate_limiter.limit_route('moderate', rate=2, burst=10)
 def moderate_content():
     """Moderate content without sending it."""
     try:
@@ -169,8 +183,8 @@ def moderate_content():
                 'error': 'Content is required'
             }), 400
         
-        # Moderate content
-        result = content_moderation_service.moderate_content(content)
+        # Moderate content (the toxicity model blocks its thread, so keep it off the hub)
+        result = offload(content_moderation_service.moderate_content, content)
         censored_content, violations = content_moderation_service.censor_content(content)
         
         return jsonify({
@@ -191,13 +205,13 @@ def get_flagged_users():
     """Get all flagged users (admin only)."""
     try:
         # In a real implementation, you would check admin permissions here
-        flagged_users = UserFlag.query.filter(UserFlag.flag_count > 0)\
-                                     .order_by(UserFlag.flag_count.desc())\
-                                     .all()
+        flagged_users = USER_FLAG_ROWS.query().filter(UserFlag.flag_count > 0)\
+                                              .order_by(UserFlag.flag_count.desc())\
+                                              .all()
         
         return jsonify({
             'success': True,
-            'flagged_users': [user.to_dict() for user in flagged_users]
+            'flagged_users': USER_FLAG_ROWS.serialize(flagged_users)
         }), 200
     except Exception as e:
         return jsonify({
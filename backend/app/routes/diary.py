@@ -114,6 +114,64 @@ def update_diary_entry(entry_id):
         return jsonify(updated_entry.to_dict())
     return jsonify({"error": "Diary entry not found or unauthorized"}), 404
 
+@diary_bp.route('/api/diary/search/<string:supabase_user_id>', methods=['GET'])
+def search_diary(supabase_user_id):
+    """
+    Full-text search over a user's diary entries
+    Query parameters:
+        q: The search query
+        page: 1-based page number (default: 1)
+        per_page: Results per page (default: 10, max: 50)
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({"error": "Search query (q) is required"}), 400
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+    if page < 1 or per_page < 1:
+        return jsonify({"error": "page and per_page must be positive"}), 400
+    per_page = min(per_page, 50)
+    
+    # Map Supabase user ID to local user ID
+    user = UserService.get_or_create_user_by_supabase_id(supabase_user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    
+    try:
+        results = DiaryService.search_diary_entries(user.id, query, page, per_page)
+    except Exception as e:
+        return jsonify({"error": f"Failed to search diary: {str(e)}"}), 500
+    
+    return jsonify({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'total': results['total'],
+        'results': results['results']
+    })
+
+@diary_bp.route('/api/diary/mood-stats/<string:supabase_user_id>', methods=['GET'])
+def get_mood_stats(supabase_user_id):
+    """
+    Get mood trend analytics for a user
+    Query parameters:
+        window: Rolling window length in days (default: 30, max: 366)
+        samples: Number of rolling windows to return (default: 12, max: 120)
+    """
+    window_days = request.args.get('window', 30, type=int)
+    samples = request.args.get('samples', 12, type=int)
+    if not 1 <= window_days <= 366 or not 1 <= samples <= 120:
+        return jsonify({"error": "window must be 1-366 and samples 1-120"}), 400
+    
+    # Map Supabase user ID to local user ID
+    user = UserService.get_or_create_user_by_supabase_id(supabase_user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    
+    stats = DiaryService.get_mood_stats(user.id, window_days, samples)
+    return jsonify(stats)
+
 @diary_bp.route('/api/diary/can-edit/<string:supabase_user_id>/<string:date_str>', methods=['GET'])
 def can_edit_date(supabase_user_id, date_str):
     """Check if a user can edit/create an entry for a specific date"""
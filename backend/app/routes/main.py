@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from app.services.user_service import UserService
 from app.models.user import User
+from app.db_pool import pool_metrics
 
 main_bp = Blueprint('main', __name__)
 
@@ -26,4 +27,9 @@ def get_user(user_id):
     user = UserService.get_user_by_id(user_id)
     if user:
         return jsonify(user.to_dict())
-    return jsonify({"error": "User not found"}), 404
\ No newline at end of file
+    return jsonify({"error": "User not found"}), 404
+
+@main_bp.route('/api/health/db-pool', methods=['GET'])
+def get_db_pool_stats():
+    """Connection pool status and checkout wait-time metrics"""
+    return jsonify(pool_metrics.snapshot())
\ No newline at end of file
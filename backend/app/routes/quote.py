@@ -1,5 +1,9 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
+import csv
+import json
+import math
 from app.services.quote_service import QuoteService
+from app.services.quote_import_service import QuoteImportService, SUPPORTED_FORMATS
 
 quote_bp = Blueprint('quote', __name__)
 
@@ -15,6 +19,7 @@ def get_random_quote():
     Get a random quote
     Query parameters:
         exclude_ids: Comma-separated list of quote IDs to exclude
+        weights: Comma-separated category:weight pairs (e.g. hope:3,growth:2)
     """
     exclude_ids = request.args.get('exclude_ids')
     if exclude_ids:
@@ -25,7 +30,21 @@ def get_random_quote():
     else:
         exclude_ids = []
     
-    quote = QuoteService.get_random_quote(exclude_ids)
+    weights = request.args.get('weights')
+    if weights:
+        try:
+            weights = {
+                category.strip(): float(weight)
+                for category, weight in (pair.split(':', 1) for pair in weights.split(','))
+            }
+        except ValueError:
+            return jsonify({"error": "Invalid weights parameter"}), 400
+        if not all(math.isfinite(weight) and weight >= 0 for weight in weights.values()):
+            return jsonify({"error": "Weights must be finite and not negative"}), 400
+    else:
+        weights = None
+    
+    quote = QuoteService.get_random_quote(exclude_ids, weights)
     if quote:
         return jsonify(quote.to_dict())
     return jsonify({"error": "No quotes available"}), 404
@@ -44,6 +63,64 @@ def create_quote():
     quote = QuoteService.create_quote(text, author, category)
     return jsonify(quote.to_dict()), 201
 
+@quote_bp.route('/api/quotes/bulk', methods=['POST'])
+def bulk_import_quotes():
+    """
+    Bulk import quotes, skipping duplicates of existing quotes
+    Accepts one of:
+        - multipart upload with a `file` field (.jsonl/.ndjson or .csv)
+        - a raw request body with Content-Type application/x-ndjson or text/csv
+        - a JSON array of {text, author, category} objects, up to
+          QUOTE_IMPORT_MAX_JSON_BYTES (parsed whole; the formats above stream)
+    Query parameters:
+        format: Override the detected format (jsonl or csv)
+        batch_size: Rows per INSERT statement
+    """
+    fmt = request.args.get('format')
+    batch_size = request.args.get('batch_size', type=int)
+    if fmt and fmt not in SUPPORTED_FORMATS:
+        return jsonify({"error": f"Unsupported format. Expected one of: {', '.join(SUPPORTED_FORMATS)}"}), 400
+    if batch_size is not None and batch_size <= 0:
+        return jsonify({"error": "batch_size must be positive"}), 400
+    
+    try:
+        if 'file' in request.files:
+            upload = request.files['file']
+            fmt = fmt or QuoteImportService.detect_format(upload.filename)
+            if not fmt:
+                return jsonify({"error": "Could not detect file format; pass ?format=jsonl or ?format=csv"}), 400
+            stats = QuoteImportService.import_stream(upload.stream, fmt, batch_size=batch_size)
+        elif request.is_json:
+            limit = current_app.config['QUOTE_IMPORT_MAX_JSON_BYTES']
+            # Read one byte past the limit: chunked bodies have no Content-Length to check
+            body = b''
+            while len(body) <= limit:
+                chunk = request.stream.read(limit + 1 - len(body))
+                if not chunk:
+                    break
+                body += chunk
+            if len(body) > limit:
+                return jsonify({"error": "JSON import too large; send large packs as NDJSON or CSV"}), 413
+            records = json.loads(body)
+            if not isinstance(records, list):
+                return jsonify({"error": "Expected a JSON array of quotes"}), 400
+            stats = QuoteImportService.import_records(records, batch_size=batch_size)
+        else:
+            if not fmt:
+                if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+                    fmt = 'jsonl'
+                elif request.mimetype == 'text/csv':
+                    fmt = 'csv'
+                else:
+                    return jsonify({"error": "Unsupported content type"}), 415
+            stats = QuoteImportService.import_stream(request.stream, fmt, batch_size=batch_size)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"error": f"Invalid import data: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to import quotes: {str(e)}"}), 500
+    
+    return jsonify(stats), 201
+
 @quote_bp.route('/api/quotes/<int:quote_id>', methods=['GET'])
 def get_quote(quote_id):
     """Get a specific quote by ID"""
@@ -67,7 +144,10 @@ def update_quote(quote_id):
     if text is None and author is None and category is None:
         return jsonify({"error": "At least one field (text, author, category) is required"}), 400
     
-    updated_quote = QuoteService.update_quote(quote_id, text, author, category)
+    try:
+        updated_quote = QuoteService.update_quote(quote_id, text, author, category)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
     return jsonify(updated_quote.to_dict())
 
 @quote_bp.route('/api/quotes/<int:quote_id>', methods=['DELETE'])
@@ -4,6 +4,7 @@ API endpoints for therapy session management
 """
 
 from flask import Blueprint, request, jsonify
+from app.services.message_dedup import valid_client_message_id
 from app.services.therapy_service import therapy_service
 from app.services.user_service import UserService
 
@@ -167,19 +168,27 @@ def send_message():
         sender_id = data.get('sender_id')
         sender_type = data.get('sender_type')  # 'user' or 'therapist'
         content = data.get('content')
+        client_message_id = data.get('client_message_id')
         
         if not all([session_id, sender_id, sender_type, content]):
             return jsonify({
                 'success': False,
                 'error': 'Session ID, sender ID, sender type, and content are required'
             }), 400
+        if not valid_client_message_id(client_message_id):
+            return jsonify({
+                'success': False,
+                'error': 'client_message_id must be a string of at most 64 characters'
+            }), 400
         
-        result = therapy_service.send_message(session_id, sender_id, sender_type, content)
+        result = therapy_service.store_message(session_id, sender_id, sender_type, content, client_message_id)
         
+        # A retry gets the original message back, not a second one
         return jsonify({
             'success': True,
-            'message': result
-        }), 201
+            'message': result['message'],
+            'duplicate': result['duplicate']
+        }), 200 if result['duplicate'] else 201
     except Exception as e:
         return jsonify({
             'success': False,
@@ -0,0 +1,149 @@
+"""
+Runtime Module
+Helpers for running blocking work safely under the Socket.IO async mode
+(threading, eventlet or gevent) selected at startup
+"""
+
+import contextvars
+import importlib
+import sys
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+_state = {
+    'app': None,
+    'async_mode': 'threading',
+    'executor': None,  # threading mode pool for offload_with_timeout
+}
+
+
+class OffloadTimeout(TimeoutError):
+    """Raised by offload_with_timeout when the call misses its deadline"""
+
+
+def init_app(app, async_mode):
+    """Remember the app and async mode, and size the blocking-call thread pool"""
+    _state['app'] = app
+    _state['async_mode'] = async_mode
+    pool_size = app.config.get('OFFLOAD_THREADS', 10)
+
+    if async_mode == 'eventlet':
+        from eventlet import tpool
+        tpool.set_num_threads(pool_size)
+    elif async_mode == 'gevent':
+        import gevent
+        gevent.get_hub().threadpool.maxsize = pool_size
+    elif _state['executor'] is None:
+        _state['executor'] = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='offload')
+
+
+def get_async_mode():
+    return _state['async_mode']
+
+
+def get_app():
+    """The app passed to init_app, for work running outside any request"""
+    return _state['app']
+
+
+def _call_in_app_context(func, args, kwargs):
+    # Pool threads get their own app context (for current_app and config),
+    # but must not use the database session; see offload()
+    with _state['app'].app_context():
+        return func(*args, **kwargs)
+
+
+def offload(func, *args, **kwargs):
+    """
+    Run a blocking call that does not use the database (content moderation,
+    file I/O) without blocking the async hub
+
+    Under eventlet/gevent the call runs in a bounded native thread pool and
+    the calling greenlet waits for the result while other clients are
+    served. In threading mode every handler already has its own thread, so
+    the call runs inline.
+
+    Database work stays on the hub: SQLAlchemy's connection pool is built
+    from the monkey-patched (green) threading primitives, which lose
+    wakeups when native threads check connections out of the same pool,
+    and psycogreen (see wsgi.py) already makes psycopg2 wait cooperatively.
+    """
+    async_mode = _state['async_mode']
+    # Carry the caller's context vars (per-request instrumentation) into the pool thread
+    context = contextvars.copy_context()
+    if async_mode == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(context.run, _call_in_app_context, func, args, kwargs)
+    if async_mode == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(context.run, (_call_in_app_context, func, args, kwargs))
+    return func(*args, **kwargs)
+
+
+def offload_with_timeout(timeout, func, *args, **kwargs):
+    """
+    Like offload(), but always runs the call in the bounded pool (threading
+    mode included) and raises OffloadTimeout if it takes longer than
+    `timeout` seconds. The call itself is not interrupted; its result is
+    discarded when it finishes.
+    """
+    async_mode = _state['async_mode']
+    context = contextvars.copy_context()
+    if async_mode == 'eventlet':
+        import eventlet
+        from eventlet import tpool
+        with eventlet.Timeout(timeout, OffloadTimeout(f"{func.__name__} took longer than {timeout}s")):
+            return tpool.execute(context.run, _call_in_app_context, func, args, kwargs)
+    if async_mode == 'gevent':
+        import gevent
+        task = gevent.get_hub().threadpool.spawn(context.run, _call_in_app_context, func, args, kwargs)
+        try:
+            return task.get(timeout=timeout)
+        except gevent.Timeout:
+            raise OffloadTimeout(f"{func.__name__} took longer than {timeout}s") from None
+    future = _state['executor'].submit(context.run, _call_in_app_context, func, args, kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        raise OffloadTimeout(f"{func.__name__} took longer than {timeout}s") from None
+
+
+def _original(module_name, name):
+    """An attribute of a module as it was before any monkey-patching"""
+    # Only consult a green library if it has already been imported (and
+    # therefore possibly monkey-patched) by the entry point
+    if 'eventlet' in sys.modules:
+        import eventlet.patcher
+        if eventlet.patcher.is_monkey_patched('thread'):
+            return getattr(eventlet.patcher.original(module_name), name)
+    if 'gevent' in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            return monkey.get_original(module_name, name)
+    return getattr(importlib.import_module(module_name), name)
+
+
+def native_lock():
+    """
+    A re-entrant lock that works across real OS threads even when the
+    threading module has been monkey-patched (state shared between hub
+    greenlets and offloaded pool threads needs a real lock)
+    """
+    return _original('threading', 'RLock')()
+
+
+def native_signal():
+    """
+    A plain (non re-entrant) real lock, which unlike an RLock may be
+    released by another thread; used to hand results between pool threads
+    """
+    return _original('_thread', 'allocate_lock')()
+
+
+def start_native_thread(target, *args):
+    """Run `target(*args)` in a real OS thread, never a greenlet (it does not block process exit)"""
+    return _original('_thread', 'start_new_thread')(target, args)
+
+
+def native_sleep(seconds):
+    """Sleep the current OS thread (for code running in offload pool threads)"""
+    _original('time', 'sleep')(seconds)
@@ -0,0 +1,121 @@
+"""
+Serialization Module
+Fast paths for list endpoints: select only the needed columns as tuples,
+format timestamps once per value, and encode responses with orjson when it
+is installed (falling back to the standard library encoder)
+"""
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime
+
+from app.models import db
+from app.models.chat import BannedUser, Message, TherapyMessage, UserFlag
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class RowSerializer:
+    """
+    Turns column tuples into the same dicts the models' to_dict() builds,
+    without loading ORM instances
+
+        rows = MESSAGE_ROWS.query().filter(Message.group_id == 1).all()
+        MESSAGE_ROWS.serialize(rows)
+    """
+
+    def __init__(self, *columns):
+        self.columns = columns
+        self.keys = tuple(column.key for column in columns)
+        # Positions of date/datetime values, which need isoformat()
+        self._temporal = tuple(
+            index for index, column in enumerate(columns) if isinstance(column.type, (Date, DateTime))
+        )
+
+    def query(self):
+        """A query selecting just these columns"""
+        return db.session.query(*self.columns)
+
+    def serialize(self, rows):
+        keys = self.keys
+        temporal = self._temporal
+        if not temporal:
+            return [dict(zip(keys, row)) for row in rows]
+
+        result = []
+        for row in rows:
+            values = list(row)
+            for index in temporal:
+                value = values[index]
+                if value is not None:
+                    values[index] = value.isoformat()
+            result.append(dict(zip(keys, values)))
+        return result
+
+
+MESSAGE_ROWS = RowSerializer(
+    Message.id, Message.group_id, Message.user_session_id, Message.username,
+    Message.content, Message.flagged, Message.created_at, Message.client_message_id
+)
+THERAPY_MESSAGE_ROWS = RowSerializer(
+    TherapyMessage.id, TherapyMessage.session_id, TherapyMessage.sender_id,
+    TherapyMessage.sender_type, TherapyMessage.content, TherapyMessage.created_at,
+    TherapyMessage.client_message_id
+)
+USER_FLAG_ROWS = RowSerializer(
+    UserFlag.id, UserFlag.user_session_id, UserFlag.flag_count, UserFlag.last_flagged_at,
+    UserFlag.is_banned, UserFlag.banned_at, UserFlag.ban_reason
+)
+BANNED_USER_ROWS = RowSerializer(
+    BannedUser.id, BannedUser.user_session_id, BannedUser.banned_at, BannedUser.reason, BannedUser.banned_by
+)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson with the same output as Flask's default
+    provider: sorted keys, compact unless debugging, and Flask's handling of
+    dates, decimals, UUIDs and other non-JSON types. Anything orjson refuses
+    (e.g. integers beyond 64 bits) is encoded by the standard library.
+    """
+
+    def _encode(self, obj, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=options)
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            encoded = self._encode(obj)
+            if encoded is not None:
+                return encoded.decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        encoded = self._encode(obj, indent)
+        if encoded is None:
+            return super().response(obj)
+        return self._app.response_class(encoded + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Use the orjson provider when enabled and installed"""
+    if app.config.get('FAST_JSON', True) and orjson is not None:
+        app.json = OrjsonProvider(app)
+    return app.json
+
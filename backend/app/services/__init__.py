@@ -1,8 +1,27 @@
 # Initialize services
-from app.services.user_service import UserService
-from app.services.quote_service import QuoteService
-from app.services.diary_service import DiaryService
-from app.services.calendar_service import CalendarService
-from app.services.content_moderation_service import content_moderation_service
-from app.services.chat_service import chat_service
-from app.services.therapy_service import therapy_service
\ No newline at end of file
+# Services are imported on first access so that a process only pays for the
+# subsystems it actually uses (see FEATURES in app.config)
+import importlib
+
+_EXPORTS = {
+    'UserService': 'app.services.user_service',
+    'quote_pool': 'app.services.quote_pool',
+    'QuoteService': 'app.services.quote_service',
+    'DailyQuoteService': 'app.services.daily_quote_service',
+    'QuoteImportService': 'app.services.quote_import_service',
+    'diary_search_service': 'app.services.diary_search_service',
+    'mood_stats_service': 'app.services.mood_stats_service',
+    'DiaryService': 'app.services.diary_service',
+    'CalendarService': 'app.services.calendar_service',
+    'content_moderation_service': 'app.services.content_moderation_service',
+    'chat_service': 'app.services.chat_service',
+    'therapy_service': 'app.services.therapy_service',
+    'message_archive_service': 'app.services.message_archive_service',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module 'app.services' has no attribute '{name}'")
@@ -4,7 +4,7 @@ from app.models import db
 from datetime import datetime, timedelta, date
 from sqlalchemy import and_, or_, func
 from app.services.diary_service import DiaryService
-from app.services.quote_service import QuoteService
+from app.services.daily_quote_service import DailyQuoteService
 
 class CalendarService:
     @staticmethod
@@ -36,17 +36,22 @@ class CalendarService:
                 'created_at': entry.created_at.isoformat() if entry.created_at else None
             }
         
-        # Get streak information
-        streak = DiaryService.calculate_streak(user_id)
-        streak_data = DiaryService.get_streak_data(user_id, 35)  # Last 35 days for visualization
-        
-        # Get a random quote (could be enhanced to avoid recent quotes)
-        quote = QuoteService.get_random_quote()
-        quote_data = quote.to_dict() if quote else None
+        # Get streak information (one date-only query shared by both)
+        completed_dates = DiaryService.get_completed_dates(user_id)
+        streak = DiaryService.calculate_streak(user_id, completed_dates)
+        streak_data = DiaryService.get_streak_data(user_id, 35, completed_dates)  # Last 35 days for visualization
         
         # Get today's diary entry if it exists
         today = date.today()
-        today_entry = DiaryService.get_diary_entry(user_id, today)
+        
+        # Get the user's quote of the day (stable across refreshes, no repeats)
+        quote = DailyQuoteService.get_daily_quote(user_id, today)
+        quote_data = quote.to_dict() if quote else None
+        if (today.year, today.month) == (year, month):
+            # Already loaded with the month's entries
+            today_entry = next((entry for entry in diary_entries if entry.date == today), None)
+        else:
+            today_entry = DiaryService.get_diary_entry(user_id, today)
         today_entry_data = today_entry.to_dict() if today_entry else None
         
         return {
@@ -79,8 +84,8 @@ class CalendarService:
         # Check if user can edit this date
         can_edit = DiaryService.can_edit_entry(user_id, date_obj)
         
-        # Get a random quote
-        quote = QuoteService.get_random_quote()
+        # Get the user's quote for this date
+        quote = DailyQuoteService.get_daily_quote(user_id, date_obj)
         quote_data = quote.to_dict() if quote else None
         
         return {
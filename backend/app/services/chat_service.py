@@ -1,11 +1,27 @@
 import uuid
 import random
 import string
+import functools
+import time
 from datetime import datetime, timedelta
-from sqlalchemy import and_, or_
-from app.models import db
+from sqlalchemy import and_, case, or_
+from app.models import db, dialect_insert
 from app.models.chat import ChatGroup, Message, UserFlag, BannedUser
 from app.services.content_moderation_service import content_moderation_service
+from app.services.message_dedup import RecentMessageIds, insert_once
+from app.runtime import native_lock
+from app.serialization import BANNED_USER_ROWS, MESSAGE_ROWS, USER_FLAG_ROWS
+
+# Flags (inappropriate messages) after which a user is banned; more than one
+BAN_AFTER_FLAGS = 3
+
+def synchronized(method):
+    """Serialize access to the in-memory matchmaking state across threads."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class ChatService:
     def __init__(self):
@@ -14,6 +30,12 @@ class ChatService:
         self.active_groups = {}  # group_id -> list of user_session_ids
         self.user_sessions = {}  # user_session_id -> group_id
         self.waiting_users = []  # list of user_session_ids waiting to be matched
+        self.usernames = {}  # user_session_id -> anonymous username, kept until the user leaves
+        self.group_codes = {}  # group_id -> group_code, to match snapshot groups to database rows
+        self.restored = {}  # user_session_id -> monotonic deadline to rejoin after a restore
+        self.recent_messages = RecentMessageIds()  # client_message_id windows, for retried sends
+        # Handlers may run in offloaded pool threads (see app.runtime)
+        self._lock = native_lock()
 
     def generate_user_session_id(self):
         """Generate a unique session ID for anonymous users."""
@@ -30,6 +52,14 @@ class ChatService:
         
         return f"{adjective}{noun}{number}"
 
+    @synchronized
+    def get_username(self, user_session_id):
+        """The user's anonymous username, generated on first use and stable until they leave."""
+        username = self.usernames.get(user_session_id)
+        if username is None:
+            username = self.usernames[user_session_id] = self.generate_random_username()
+        return username
+
     def _fill_group_from_waiting_list(self, group_id):
         """Fill a group with available space from the waiting list."""
         # Check if group exists and has space
@@ -54,32 +84,55 @@ class ChatService:
             for user_id in moved_users:
                 self.user_sessions[user_id] = group_id
 
+    def _open_groups(self):
+        """
+        Active groups with room for another member, loaded in one query.
+        Groups that are gone or inactive in the database are dropped from
+        the in-memory tracking so they aren't checked again.
+        """
+        candidate_ids = [group_id for group_id, members in self.active_groups.items() if len(members) < 5]
+        if not candidate_ids:
+            return {}
+        
+        groups = {group.id: group for group in ChatGroup.query.filter(ChatGroup.id.in_(candidate_ids)).all()}
+        for group_id in candidate_ids:
+            group = groups.get(group_id)
+            if group is None or not group.is_active:
+                groups.pop(group_id, None)
+                self.active_groups.pop(group_id, None)
+                self.group_codes.pop(group_id, None)
+        # Preserve the in-memory order so the oldest groups are filled first
+        return {group_id: groups[group_id] for group_id in candidate_ids if group_id in groups}
+
     def _process_waiting_list(self):
         """Process the waiting list and fill existing groups with space."""
+        open_groups = self._open_groups()
+        
         # Make a copy of waiting users to avoid modification during iteration
         waiting_users_copy = self.waiting_users[:]
         
         for user_session_id in waiting_users_copy:
             # Look for an existing group that isn't full (has less than 5 members)
-            for group_id, members in self.active_groups.items():
-                if len(members) < 5:
-                    # Found a group with space, add user to it
-                    group = ChatGroup.query.get(group_id)
-                    if group and group.is_active:
-                        # Remove user from waiting list
-                        if user_session_id in self.waiting_users:
-                            self.waiting_users.remove(user_session_id)
-                        
-                        # Add user to the group
-                        self.active_groups[group_id].append(user_session_id)
-                        self.user_sessions[user_session_id] = group_id
-                        break  # Move to next waiting user
+            for group_id in open_groups:
+                if len(self.active_groups[group_id]) < 5:
+                    # Remove user from waiting list
+                    if user_session_id in self.waiting_users:
+                        self.waiting_users.remove(user_session_id)
+                    
+                    # Add user to the group
+                    self.active_groups[group_id].append(user_session_id)
+                    self.user_sessions[user_session_id] = group_id
+                    break  # Move to next waiting user
 
+    @synchronized
     def create_or_join_group(self, user_session_id):
         """
         Create a new chat group or join an existing one.
         Returns group information and whether user joined a new or existing group.
         """
+        # A user restored from a snapshot has reconnected
+        self.restored.pop(user_session_id, None)
+        
         # Check if user is already in a group
         if user_session_id in self.user_sessions:
             group_id = self.user_sessions[user_session_id]
@@ -94,25 +147,21 @@ class ChatService:
                     'group': group.to_dict(),
                     'is_new_group': False,
                     'members': members,
-                    'username': self.generate_random_username()  # Generate new username for each session
+                    'username': self.get_username(user_session_id)
                 }
         
         # Look for an existing group that isn't full (has less than 5 members)
-        for group_id, members in self.active_groups.items():
-            if len(members) < 5:
-                # Found a group with space, add user to it
-                group = ChatGroup.query.get(group_id)
-                if group and group.is_active:
-                    # Add user to the group
-                    self.active_groups[group_id].append(user_session_id)
-                    self.user_sessions[user_session_id] = group_id
-                    
-                    return {
-                        'group': group.to_dict(),
-                        'is_new_group': False,
-                        'members': list(self.active_groups[group_id]),
-                        'username': self.generate_random_username()
-                    }
+        for group_id, group in self._open_groups().items():
+            # Found a group with space, add user to it
+            self.active_groups[group_id].append(user_session_id)
+            self.user_sessions[user_session_id] = group_id
+            
+            return {
+                'group': group.to_dict(),
+                'is_new_group': False,
+                'members': list(self.active_groups[group_id]),
+                'username': self.get_username(user_session_id)
+            }
         
         # No existing group with space, add user to waiting list
         self.waiting_users.append(user_session_id)
@@ -134,7 +183,7 @@ class ChatService:
                     'group': group.to_dict(),
                     'is_new_group': False,
                     'members': members,
-                    'username': self.generate_random_username()
+                    'username': self.get_username(user_session_id)
                 }
         
         # If we have at least 2 users in waiting list, create a new group
@@ -151,6 +200,7 @@ class ChatService:
             
             # Update in-memory tracking
             self.active_groups[group.id] = group_users
+            self.group_codes[group.id] = group.group_code
             for uid in group_users:
                 self.user_sessions[uid] = group.id
             
@@ -159,7 +209,7 @@ class ChatService:
                 'group': group.to_dict(),
                 'is_new_group': True,
                 'members': group_users,
-                'username': self.generate_random_username()
+                'username': self.get_username(user_session_id)
             }
         
         # If we couldn't form a group, return waiting status
@@ -167,12 +217,35 @@ class ChatService:
             'group': None,
             'is_new_group': False,
             'members': [],
-            'username': self.generate_random_username(),
+            'username': self.get_username(user_session_id),
             'waiting': True
         }
 
+    @synchronized
+    def leave_waiting_list(self, user_session_id):
+        """
+        Remove a user still waiting to be matched. They have no group to
+        resume, so they are forgotten entirely.
+        
+        Returns:
+            bool: True if the user was waiting
+        """
+        if user_session_id not in self.waiting_users:
+            return False
+        self.waiting_users.remove(user_session_id)
+        self._forget(user_session_id)
+        return True
+
+    def _forget(self, user_session_id):
+        self.usernames.pop(user_session_id, None)
+        self.restored.pop(user_session_id, None)
+        self.recent_messages.forget(user_session_id)
+
+    @synchronized
     def leave_group(self, user_session_id):
-        """Remove user from their current group."""
+        """Remove user from their current group, or from the waiting list."""
+        if self.leave_waiting_list(user_session_id):
+            return True
         if user_session_id in self.user_sessions:
             group_id = self.user_sessions[user_session_id]
             
@@ -193,12 +266,145 @@ class ChatService:
             
             # Remove user from sessions
             del self.user_sessions[user_session_id]
+            self._forget(user_session_id)
             
             return True
         return False
 
-    def send_message(self, user_session_id, content):
-        """Send a message to the user's group after content moderation."""
+    @synchronized
+    def resume(self, user_session_id, group_id):
+        """
+        Reattach a reconnecting user to their group without matchmaking.
+        
+        Returns:
+            str or None: The user's username, or None if they are no longer in that group
+        """
+        if self.user_sessions.get(user_session_id) != group_id:
+            return None
+        self.restored.pop(user_session_id, None)
+        return self.get_username(user_session_id)
+
+    @synchronized
+    def snapshot(self):
+        """
+        The matchmaking state as plain data (see app/chat_snapshot.py)
+        
+        Returns:
+            dict: 'groups' ([group_id, group_code, members] per group),
+                  'waiting' (user_session_ids) and 'usernames'
+        """
+        return {
+            'groups': [
+                [group_id, self.group_codes.get(group_id), list(members)]
+                for group_id, members in self.active_groups.items() if members
+            ],
+            'waiting': list(self.waiting_users),
+            'usernames': dict(self.usernames),
+        }
+
+    @synchronized
+    def restore(self, state, grace=120.0):
+        """
+        Merge snapshot() output into the current state and reconcile it with the database.
+        
+        A group is restored only if it is still active in the database (with
+        the same group_code), and banned users are left out. Restored users
+        must rejoin within `grace` seconds or they are evicted (see
+        evict_unclaimed). Every other active group in the database is
+        deactivated with one bulk UPDATE.
+        
+        Returns:
+            dict: Counts of restored 'groups' and 'users', and of 'deactivated' groups
+        """
+        codes = {group_id: code for group_id, code, _ in state.get('groups', [])}
+        live = {
+            group_id for group_id, group_code in db.session.query(ChatGroup.id, ChatGroup.group_code).filter(
+                ChatGroup.id.in_(list(codes)), ChatGroup.is_active.is_(True)
+            ) if codes[group_id] in (None, group_code)
+        }
+        candidates = {uid for _, _, members in state.get('groups', []) for uid in members}
+        candidates.update(state.get('waiting', []))
+        banned = {
+            uid for uid, in db.session.query(UserFlag.user_session_id).filter(
+                UserFlag.user_session_id.in_(candidates), UserFlag.is_banned.is_(True)
+            )
+        } if candidates else set()
+        
+        deadline = time.monotonic() + grace
+        restored_groups = 0
+        restored_users = []
+        for group_id, group_code, members in state.get('groups', []):
+            if group_id not in live or group_id in self.active_groups:
+                continue
+            members = [uid for uid in members if uid not in banned and uid not in self.user_sessions]
+            if not members:
+                continue
+            self.active_groups[group_id] = members
+            if group_code:
+                self.group_codes[group_id] = group_code
+            for uid in members:
+                self.user_sessions[uid] = group_id
+            restored_groups += 1
+            restored_users.extend(members)
+        for uid in state.get('waiting', []):
+            if uid not in banned and uid not in self.user_sessions and uid not in self.waiting_users:
+                self.waiting_users.append(uid)
+                restored_users.append(uid)
+        
+        usernames = state.get('usernames', {})
+        for uid in restored_users:
+            self.restored[uid] = deadline
+            if uid in usernames:
+                self.usernames.setdefault(uid, usernames[uid])
+        
+        # Groups the previous process left marked active but nobody can rejoin
+        deactivated = ChatGroup.query.filter(
+            ChatGroup.is_active.is_(True), ChatGroup.id.notin_(list(self.active_groups))
+        ).update({ChatGroup.is_active: False}, synchronize_session=False)
+        db.session.commit()
+        
+        return {'groups': restored_groups, 'users': len(restored_users), 'deactivated': deactivated}
+
+    @synchronized
+    def evict_unclaimed(self, now=None):
+        """
+        Remove restored users who did not rejoin within the grace period.
+        
+        Returns:
+            list: The user_session_ids removed
+        """
+        now = time.monotonic() if now is None else now
+        expired = [uid for uid, deadline in self.restored.items() if deadline <= now]
+        for uid in expired:
+            del self.restored[uid]
+            self.leave_group(uid)
+        return expired
+
+    @staticmethod
+    def moderate_message(content):
+        """
+        Moderate and censor message content (CPU only, no database access).
+        
+        Returns:
+            dict: 'content' (censored), 'flagged', 'violations' (found by moderation)
+                  and 'censored' (violation types that were censored)
+        """
+        moderation_result = content_moderation_service.moderate_content(content)
+        censored_content, censored = content_moderation_service.censor_content(content)
+        return {
+            'content': censored_content,
+            'flagged': not moderation_result['is_appropriate'],
+            'violations': moderation_result['violations'],
+            'censored': censored
+        }
+
+    def save_message(self, user_session_id, moderation, client_message_id=None):
+        """
+        Store an already moderated message in the user's group.
+        
+        A retry carrying the same client_message_id returns the stored message
+        with 'duplicate' set instead of inserting it again.
+        """
         # Check if user is in a group
         if user_session_id not in self.user_sessions:
             return {'success': False, 'error': 'User not in a group'}
@@ -210,86 +416,115 @@ class ChatService:
         if not group or not group.is_active:
             return {'success': False, 'error': 'Group not active'}
         
-        # Moderate content
-        moderation_result = content_moderation_service.moderate_content(content)
-        
-        # If content is inappropriate, flag the user
-        if not moderation_result['is_appropriate']:
-            self.flag_user(user_session_id, ', '.join(moderation_result['violations']))
-        
-        # Censor content before storing
-        censored_content, violations = content_moderation_service.censor_content(content)
-        
-        # Create message in database
-        username = self.generate_random_username()  # Generate username for this message
-        message = Message(
-            group_id=group_id,
-            user_session_id=user_session_id,
-            username=username,
-            content=censored_content,
-            flagged=not moderation_result['is_appropriate']
-        )
-        
-        db.session.add(message)
+        # Create message in database (unless the unique index says it is already there)
+        message, duplicate = insert_once(MESSAGE_ROWS, Message, {
+            'group_id': group_id,
+            'user_session_id': user_session_id,
+            'username': self.get_username(user_session_id),
+            'content': moderation['content'],
+            'flagged': moderation['flagged'],
+            'client_message_id': client_message_id
+        }, Message.user_session_id == user_session_id, Message.client_message_id == client_message_id)
         db.session.commit()
+        self.recent_messages.remember(user_session_id, client_message_id, message)
         
         # Return message with all details
         return {
             'success': True,
-            'message': message.to_dict(),
-            'was_flagged': not moderation_result['is_appropriate'],
-            'violations': violations
+            'message': message,
+            'was_flagged': message['flagged'],
+            'violations': [] if duplicate else moderation['censored'],
+            'duplicate': duplicate
         }
 
+    def recent_message(self, user_session_id, client_message_id):
+        """The message a user already sent with this client_message_id, if it is in the window"""
+        return self.recent_messages.get(user_session_id, client_message_id)
+
+    def send_message(self, user_session_id, content, client_message_id=None, moderation=None):
+        """
+        Send a message to the user's group after content moderation, flagging
+        the user if it was inappropriate. Live chat runs these steps through
+        app.moderation_pipeline instead.
+        
+        moderation, when given, is the moderate_message() result for content
+        (computed by the caller off the async hub).
+        """
+        message = self.recent_message(user_session_id, client_message_id)
+        if message is not None:
+            return {'success': True, 'message': message, 'was_flagged': message['flagged'],
+                    'violations': [], 'duplicate': True}
+        
+        if moderation is None:
+            moderation = self.moderate_message(content)
+        result = self.save_message(user_session_id, moderation, client_message_id)
+        
+        # If content is inappropriate, flag the user (once, not for every retry)
+        if result['success'] and moderation['flagged'] and not result['duplicate']:
+            self.flag_user(user_session_id, ', '.join(moderation['violations']))
+        return result
+
     def get_group_messages(self, group_id, limit=50):
         """Get recent messages for a group."""
-        messages = Message.query.filter_by(group_id=group_id)\
-                               .order_by(Message.created_at.desc())\
-                               .limit(limit)\
-                               .all()
+        rows = MESSAGE_ROWS.query().filter(Message.group_id == group_id)\
+                                   .order_by(Message.created_at.desc())\
+                                   .limit(limit)\
+                                   .all()
         
-        return [msg.to_dict() for msg in reversed(messages)]  # Reverse to show oldest first
+        return MESSAGE_ROWS.serialize(reversed(rows))  # Reverse to show oldest first
 
     def get_messages_since(self, group_id, since_id):
         """Get messages since a specific ID."""
-        messages = Message.query.filter(
+        rows = MESSAGE_ROWS.query().filter(
             and_(Message.group_id == group_id, Message.id > since_id)
         ).order_by(Message.created_at.asc()).all()
         
-        return [msg.to_dict() for msg in messages]
+        return MESSAGE_ROWS.serialize(rows)
 
     def flag_user(self, user_session_id, reason="Inappropriate content"):
-        """Flag a user for inappropriate behavior."""
-        # Get or create user flag record
-        user_flag = UserFlag.query.filter_by(user_session_id=user_session_id).first()
-        
-        if not user_flag:
-            user_flag = UserFlag(user_session_id=user_session_id)
-            db.session.add(user_flag)
+        """
+        Flag a user for inappropriate behavior; the third flag bans them.
         
-        # Increment flag count
-        user_flag.flag_count += 1
-        user_flag.last_flagged_at = datetime.utcnow()
+        The flag row is created or incremented by a single upsert that
+        returns the new count, so concurrent messages from the same user
+        are all counted.
+        """
+        now = datetime.utcnow()
+        insert = dialect_insert()
+        statement = insert(UserFlag).values(
+            user_session_id=user_session_id,
+            flag_count=1,
+            last_flagged_at=now,
+            is_banned=False
+        )
+        reaches_ban = UserFlag.flag_count + 1 >= BAN_AFTER_FLAGS
+        statement = statement.on_conflict_do_update(
+            index_elements=[UserFlag.user_session_id],
+            set_={
+                'flag_count': UserFlag.flag_count + 1,
+                'last_flagged_at': now,
+                'is_banned': case((reaches_ban, True), else_=UserFlag.is_banned),
+                'banned_at': case((reaches_ban, now), else_=UserFlag.banned_at),
+                'ban_reason': case((reaches_ban, reason), else_=UserFlag.ban_reason)
+            }
+        ).returning(*USER_FLAG_ROWS.columns)
+        user_flag = USER_FLAG_ROWS.serialize([db.session.execute(statement).one()])[0]
         
-        # If user has been flagged 3 times, ban them
-        if user_flag.flag_count >= 3:
-            user_flag.is_banned = True
-            user_flag.banned_at = datetime.utcnow()
-            user_flag.ban_reason = reason
-            
-            # Add to banned users table
-            banned_user = BannedUser(
+        if user_flag['is_banned']:
+            # Add to banned users table (already there if they were banned before)
+            db.session.execute(insert(BannedUser).values(
                 user_session_id=user_session_id,
+                banned_at=now,
                 reason=reason,
                 banned_by="System"
-            )
-            db.session.add(banned_user)
-            
-            # Remove user from any active groups
-            self.leave_group(user_session_id)
+            ).on_conflict_do_nothing(index_elements=[BannedUser.user_session_id]))
         
         db.session.commit()
-        return user_flag.to_dict()
+        
+        if user_flag['is_banned']:
+            # Remove user from any active groups
+            self.leave_group(user_session_id)
+        return user_flag
 
     def is_user_banned(self, user_session_id):
         """Check if a user is banned."""
@@ -327,8 +562,7 @@ class ChatService:
 
     def get_banned_users(self):
         """Get list of all banned users."""
-        banned_users = BannedUser.query.all()
-        return [user.to_dict() for user in banned_users]
+        return BANNED_USER_ROWS.serialize(BANNED_USER_ROWS.query().all())
 
     def unban_user(self, user_session_id):
         """Unban a user."""
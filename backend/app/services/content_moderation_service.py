@@ -1,4 +1,9 @@
+import logging
 import re
+from functools import cached_property
+from app.instrumentation import moderation_duration, register_collector
+
+logger = logging.getLogger(__name__)
 
 class ContentModerationService:
     def __init__(self):
@@ -38,19 +43,65 @@ class ContentModerationService:
             'salvia', 'krokodil', 'bath salts', 'synthetic marijuana', 'spice', 'k2'
         ]
         
-        # Compile regex patterns for efficiency
-        self.compiled_email_pattern = re.compile(self.email_pattern, re.IGNORECASE)
-        self.compiled_phone_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.phone_patterns]
-        self.compiled_ssn_pattern = re.compile(self.ssn_pattern, re.IGNORECASE)
-        self.compiled_credit_card_pattern = re.compile(self.credit_card_pattern, re.IGNORECASE)
-        
+        # Optional model scoring, used when the regex checks find nothing (see init_app)
+        self.toxicity = None  # MicroBatcher around a ToxicityScorer
+        self.toxicity_timeout = 0.1
+
+    def init_app(self, app):
+        """Enable the toxicity scorer named by TOXICITY_SCORER, if any"""
+        spec = app.config.get('TOXICITY_SCORER')
+        if not spec or self.toxicity is not None:
+            return
+        from app.services.toxicity_scorer import MicroBatcher, load_scorer
+        try:
+            scorer = load_scorer(spec, app.config.get('TOXICITY_MODEL_PATH'))
+        except (ImportError, OSError, ValueError) as e:
+            logger.warning("Toxicity scorer disabled, could not load %s: %s", spec, e)
+            return
+        self.toxicity = MicroBatcher(
+            scorer,
+            max_batch=app.config.get('TOXICITY_BATCH_SIZE', 32),
+            max_wait=app.config.get('TOXICITY_BATCH_WAIT_MS', 5) / 1000
+        )
+        self.toxicity_timeout = app.config.get('TOXICITY_TIMEOUT_MS', 100) / 1000
+        register_collector(self.toxicity.metrics_lines)
+
+    # Regex patterns are compiled on first use rather than at import time, so
+    # processes that never moderate content don't pay for the compilation
+    
+    @cached_property
+    def compiled_email_pattern(self):
+        return re.compile(self.email_pattern, re.IGNORECASE)
+    
+    @cached_property
+    def compiled_phone_patterns(self):
+        return [re.compile(pattern, re.IGNORECASE) for pattern in self.phone_patterns]
+    
+    @cached_property
+    def compiled_ssn_pattern(self):
+        return re.compile(self.ssn_pattern, re.IGNORECASE)
+    
+    @cached_property
+    def compiled_credit_card_pattern(self):
+        return re.compile(self.credit_card_pattern, re.IGNORECASE)
+    
+    @cached_property
+    def profanity_pattern(self):
         # Create a combined profanity pattern for faster checking
         escaped_profanity = [re.escape(word) for word in self.profanity_words]
-        self.profanity_pattern = re.compile(r'\b(' + '|'.join(escaped_profanity) + r')\b', re.IGNORECASE)
-        
+        return re.compile(r'\b(' + '|'.join(escaped_profanity) + r')\b', re.IGNORECASE)
+    
+    @cached_property
+    def drug_pattern(self):
         # Create a combined drug pattern
         escaped_drugs = [re.escape(drug) for drug in self.drug_names]
-        self.drug_pattern = re.compile(r'\b(' + '|'.join(escaped_drugs) + r')\b', re.IGNORECASE)
+        return re.compile(r'\b(' + '|'.join(escaped_drugs) + r')\b', re.IGNORECASE)
+    
+    def warm_up(self):
+        """Compile all patterns now (e.g. before serving traffic)"""
+        for name in ('compiled_email_pattern', 'compiled_phone_patterns', 'compiled_ssn_pattern',
+                     'compiled_credit_card_pattern', 'profanity_pattern', 'drug_pattern'):
+            getattr(self, name)
 
     def contains_profanity(self, text):
         """Check if text contains profanity."""
@@ -79,6 +130,7 @@ class ContentModerationService:
         """Check if text contains references to harmful drugs."""
         return bool(self.drug_pattern.search(text))
 
+    @moderation_duration.time('moderate')
     def moderate_content(self, text):
         """
         Moderate content and return a dictionary with findings.
@@ -107,14 +159,25 @@ class ContentModerationService:
         if self.contains_drug_references(text):
             violations.append('drugs')
         
+        # The regexes are the fast pre-filter; only messages they pass are scored
+        toxicity = None
+        if not violations and self.toxicity is not None:
+            toxicity = self.toxicity.score(text, timeout=self.toxicity_timeout)
+            if toxicity is not None and toxicity >= self.toxicity.scorer.threshold:
+                violations.append('toxicity')
+        
         # Content is appropriate if no violations found
         is_appropriate = len(violations) == 0
         
-        return {
+        result = {
             'is_appropriate': is_appropriate,
             'violations': violations
         }
+        if toxicity is not None:
+            result['toxicity'] = round(toxicity, 4)
+        return result
 
+    @moderation_duration.time('censor')
     def censor_content(self, text):
         """
         Censor inappropriate content in the text.
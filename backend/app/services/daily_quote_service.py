@@ -0,0 +1,68 @@
+"""
+Daily Quote Service Module
+Deterministic quote-of-the-day rotation served from the quote pool
+"""
+
+import hashlib
+import random
+from math import gcd
+
+from app.services.quote_pool import quote_pool
+
+
+class DailyQuoteService:
+    # Seed for the pool-wide shuffle; changing it reshuffles every user's rotation
+    SHUFFLE_SEED = 'claario-daily-quotes'
+
+    # (snapshot, shuffled order) for the most recent pool snapshot
+    _order_cache = (None, ())
+
+    @staticmethod
+    def _shuffled_order(quotes):
+        """Shuffle the pool once per snapshot so neighbouring IDs are not served on neighbouring days"""
+        snapshot, order = DailyQuoteService._order_cache
+        if snapshot is not quotes:
+            order = list(range(len(quotes)))
+            random.Random(DailyQuoteService.SHUFFLE_SEED).shuffle(order)
+            order = tuple(order)
+            DailyQuoteService._order_cache = (quotes, order)
+        return order
+
+    @staticmethod
+    def _user_rotation(user_key, pool_size):
+        """
+        Derive a per-user (offset, stride) pair from a hash of the user key.
+        The stride is coprime with the pool size, so stepping it once per day
+        visits every quote exactly once before the cycle repeats.
+        """
+        digest = hashlib.blake2b(str(user_key).encode('utf-8'), digest_size=16).digest()
+        offset = int.from_bytes(digest[:8], 'big') % pool_size
+        stride = int.from_bytes(digest[8:], 'big') % pool_size or 1
+        while gcd(stride, pool_size) != 1:
+            stride += 1
+        return offset, stride
+
+    @staticmethod
+    def get_daily_quote(user_key, for_date):
+        """
+        Get the quote of the day for a user
+
+        The same (user, date) pair always maps to the same quote, and a user
+        sees no repeats until every quote in the pool has been shown, as long
+        as the pool itself does not change. No per-user state is stored.
+
+        Args:
+            user_key: Stable user identifier (e.g. the local user ID)
+            for_date (date): The date to get the quote for
+
+        Returns:
+            PooledQuote: The quote of the day or None if no quotes available
+        """
+        quotes = quote_pool.get_all()
+        if not quotes:
+            return None
+
+        pool_size = len(quotes)
+        offset, stride = DailyQuoteService._user_rotation(user_key, pool_size)
+        position = (offset + stride * for_date.toordinal()) % pool_size
+        return quotes[DailyQuoteService._shuffled_order(quotes)[position]]
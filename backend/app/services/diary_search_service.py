@@ -0,0 +1,187 @@
+"""
+Diary Search Service Module
+Full-text search over a user's diary entries.
+
+Postgres keeps a weighted tsvector column on the diary table behind a GIN
+index (created by migration 007); SQLite (used for local and test runs)
+keeps an FTS5 side table, created on first use. Both are updated
+incrementally whenever an entry is written; on SQLite a trigger removes
+the index row of a deleted entry.
+"""
+
+import logging
+import threading
+import weakref
+
+from sqlalchemy import text
+
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+
+_PG_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
+
+class DiarySearchService:
+    def __init__(self):
+        # Engines whose search schema has been ensured (weak, so a new engine
+        # can never inherit the id of a disposed one)
+        self._ready_engines = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _dialect(self):
+        return db.engine.dialect.name
+
+    def ensure_index(self):
+        """
+        Create the SQLite FTS5 table if needed (once per engine per process).
+        On Postgres the search column and its index come from migration 007;
+        schema changes there never run on the request path.
+        """
+        engine = db.engine
+        if engine in self._ready_engines:
+            return
+        with self._lock:
+            if engine in self._ready_engines:
+                return
+            dialect = engine.dialect.name
+            if dialect == 'sqlite':
+                exists = db.session.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'diary_fts'"
+                )).first()
+                if not exists:
+                    db.session.execute(text(
+                        "CREATE VIRTUAL TABLE diary_fts USING fts5("
+                        "title, content, user_id UNINDEXED, tokenize = 'porter unicode61')"
+                    ))
+                    # Backfill entries written before the index existed
+                    db.session.execute(text(
+                        "INSERT INTO diary_fts (rowid, title, content, user_id) "
+                        "SELECT id, title, content, user_id FROM diary"
+                    ))
+                db.session.execute(text(
+                    "CREATE TRIGGER IF NOT EXISTS diary_fts_delete AFTER DELETE ON diary "
+                    "BEGIN DELETE FROM diary_fts WHERE rowid = old.id; END"
+                ))
+                db.session.commit()
+            elif dialect != 'postgresql':
+                raise RuntimeError(f"Diary search is not supported on {dialect}")
+            self._ready_engines.add(engine)
+
+    def index_entry(self, entry):
+        """Update the search index for a single diary entry"""
+        try:
+            self.ensure_index()
+            if self._dialect() == 'postgresql':
+                db.session.execute(
+                    text(f"UPDATE diary SET search_vector = {_PG_VECTOR} WHERE id = :id"),
+                    {'id': entry.id}
+                )
+            else:
+                db.session.execute(text("DELETE FROM diary_fts WHERE rowid = :id"), {'id': entry.id})
+                db.session.execute(
+                    text("INSERT INTO diary_fts (rowid, title, content, user_id) "
+                         "VALUES (:id, :title, :content, :user_id)"),
+                    {'id': entry.id, 'title': entry.title, 'content': entry.content, 'user_id': entry.user_id}
+                )
+            db.session.commit()
+        except Exception as e:
+            # A stale search index must never fail the diary write itself
+            db.session.rollback()
+            logger.warning("Could not index diary entry %s: %s", entry.id, e)
+
+    @staticmethod
+    def _fts5_query(query):
+        """Quote each term so user input can't inject FTS5 query syntax"""
+        terms = [term.replace('"', '""') for term in query.split()]
+        return ' '.join(f'"{term}"' for term in terms if term)
+
+    def search(self, user_id, query, page=1, per_page=10):
+        """
+        Search a user's diary entries
+
+        Args:
+            user_id (int): The user ID
+            query (str): Free-text search query
+            page (int): 1-based page number
+            per_page (int): Results per page
+
+        Returns:
+            dict: Total match count and ranked results with highlighted snippets
+        """
+        self.ensure_index()
+        params = {
+            'user_id': user_id,
+            'limit': per_page,
+            'offset': (page - 1) * per_page,
+        }
+
+        if self._dialect() == 'postgresql':
+            params['query'] = query
+            # Rank and paginate on the index first, then build headlines only for the page
+            rows = db.session.execute(text(f"""
+                SELECT d.id, d.date, d.title, d.mood, page.rank, page.total,
+                       ts_headline('english', d.content, websearch_to_tsquery('english', :query),
+                                   'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2, MaxWords=20, MinWords=5')
+                           AS snippet
+                FROM (
+                    SELECT id, ts_rank(search_vector, websearch_to_tsquery('english', :query)) AS rank,
+                           count(*) OVER () AS total
+                    FROM diary
+                    WHERE user_id = :user_id
+                      AND search_vector @@ websearch_to_tsquery('english', :query)
+                    ORDER BY rank DESC, date DESC
+                    LIMIT :limit OFFSET :offset
+                ) AS page
+                JOIN diary d ON d.id = page.id
+                ORDER BY page.rank DESC, d.date DESC
+            """), params).fetchall()
+            total = rows[0].total if rows else self._pg_count(params)
+        else:
+            params['query'] = self._fts5_query(query)
+            if not params['query']:
+                return {'total': 0, 'results': []}
+            rows = db.session.execute(text(f"""
+                SELECT d.id, d.date, d.title, d.mood, -bm25(diary_fts, 2.0, 1.0) AS rank,
+                       snippet(diary_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}', '…', 16) AS snippet
+                FROM diary_fts
+                JOIN diary d ON d.id = diary_fts.rowid
+                WHERE diary_fts MATCH :query AND diary_fts.user_id = :user_id
+                ORDER BY bm25(diary_fts, 2.0, 1.0), d.date DESC
+                LIMIT :limit OFFSET :offset
+            """), params).fetchall()
+            total = db.session.execute(text(
+                "SELECT count(*) FROM diary_fts WHERE diary_fts MATCH :query AND user_id = :user_id"
+            ), params).scalar()
+
+        return {
+            'total': total,
+            'results': [
+                {
+                    'id': row.id,
+                    'date': row.date.isoformat() if hasattr(row.date, 'isoformat') else row.date,
+                    'title': row.title,
+                    'mood': row.mood,
+                    'rank': round(float(row.rank), 6),
+                    'snippet': row.snippet
+                }
+                for row in rows
+            ]
+        }
+
+    def _pg_count(self, params):
+        """Total matches when the requested page is past the last result"""
+        return db.session.execute(text(
+            "SELECT count(*) FROM diary "
+            "WHERE user_id = :user_id AND search_vector @@ websearch_to_tsquery('english', :query)"
+        ), params).scalar()
+
+
+# Create a global instance for use throughout the application
+diary_search_service = DiarySearchService()
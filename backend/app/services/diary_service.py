@@ -1,8 +1,10 @@
 from app.models.diary import Diary
 from app.models.user import User
-from app.models import db
+from app.models import db, dialect_insert
 from datetime import datetime, timedelta, date
 from sqlalchemy import and_, or_, func
+from app.services.diary_search_service import diary_search_service
+from app.services.mood_stats_service import mood_stats_service
 
 class DiaryService:
     @staticmethod
@@ -13,34 +15,46 @@ class DiaryService:
     @staticmethod
     def create_diary_entry(user_id, date, title, content, mood=None):
         """
-        Create a new diary entry
+        Create the diary entry for a date, or update it if one exists
+        
+        A single INSERT ... ON CONFLICT (user_id, date) DO UPDATE, so a
+        double submit can never create a second entry for the same day.
         
         Args:
             user_id (int): The user ID
             date (date): The date of the diary entry
             title (str): The title of the diary entry
             content (str): The content of the diary entry
-            mood (str, optional): The mood emoji
+            mood (str, optional): The mood emoji (an existing mood is kept if omitted)
             
         Returns:
-            Diary: The created diary entry
+            Diary: The created or updated diary entry
         """
-        # Check if entry already exists for this date
-        existing_entry = DiaryService.get_diary_entry(user_id, date)
-        if existing_entry:
-            return existing_entry
-            
-        # Create new diary entry
-        diary_entry = Diary(
+        now = datetime.utcnow()
+        statement = dialect_insert()(Diary).values(
             user_id=user_id,
             date=date,
             title=title,
             content=content,
             mood=mood,
-            is_completed=True
+            is_completed=True,
+            created_at=now,
+            updated_at=now
         )
-        db.session.add(diary_entry)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Diary.user_id, Diary.date],
+            set_={
+                'title': statement.excluded.title,
+                'content': statement.excluded.content,
+                'mood': func.coalesce(statement.excluded.mood, Diary.mood),
+                'is_completed': True,
+                'updated_at': now
+            }
+        ).returning(Diary)
+        diary_entry = db.session.scalars(statement, execution_options={'populate_existing': True}).one()
         db.session.commit()
+        mood_stats_service.invalidate(user_id)
+        diary_search_service.index_entry(diary_entry)
         return diary_entry
     
     @staticmethod
@@ -72,8 +86,42 @@ class DiaryService:
         diary_entry.is_completed = True
         diary_entry.updated_at = datetime.utcnow()
         db.session.commit()
+        mood_stats_service.invalidate(user_id)
+        if title is not None or content is not None:
+            diary_search_service.index_entry(diary_entry)
         return diary_entry
     
+    @staticmethod
+    def search_diary_entries(user_id, query, page=1, per_page=10):
+        """
+        Full-text search over a user's diary entries
+        
+        Args:
+            user_id (int): The user ID
+            query (str): The search query
+            page (int): 1-based page number
+            per_page (int): Results per page
+            
+        Returns:
+            dict: Total match count and ranked results with highlighted snippets
+        """
+        return diary_search_service.search(user_id, query, page, per_page)
+    
+    @staticmethod
+    def get_mood_stats(user_id, window_days=30, samples=12):
+        """
+        Get mood trend analytics for a user (cached until the next diary write)
+        
+        Args:
+            user_id (int): The user ID
+            window_days (int): Length of each rolling window in days
+            samples (int): Number of rolling windows to report
+            
+        Returns:
+            dict: Mood distribution, rolling windows, weekday patterns and streak correlation
+        """
+        return mood_stats_service.get_mood_stats(user_id, window_days, samples)
+    
     @staticmethod
     def get_monthly_diary_entries(user_id, year, month):
         """
@@ -129,21 +177,44 @@ class DiaryService:
         return False
     
     @staticmethod
-    def calculate_streak(user_id):
+    def get_completed_dates(user_id, start_date=None, end_date=None):
+        """
+        Get the dates of a user's completed diary entries (date column only)
+        
+        Args:
+            user_id (int): The user ID
+            start_date (date, optional): Earliest date to include
+            end_date (date, optional): Latest date to include
+            
+        Returns:
+            set: Dates with a completed entry
+        """
+        query = db.session.query(Diary.date).filter(
+            Diary.user_id == user_id,
+            Diary.is_completed == True
+        )
+        if start_date is not None:
+            query = query.filter(Diary.date >= start_date)
+        if end_date is not None:
+            query = query.filter(Diary.date <= end_date)
+        return {row[0] for row in query}
+
+    @staticmethod
+    def calculate_streak(user_id, completed_dates=None):
         """
         Calculate the current streak for a user based on consecutive diary entries
         
         Args:
             user_id (int): The user ID
+            completed_dates (set, optional): Completed entry dates already loaded by the caller
             
         Returns:
             int: The current streak count
         """
-        # Get all completed diary entries for the user, ordered by date descending
-        entries = Diary.query.filter_by(user_id=user_id, is_completed=True)\
-                            .order_by(Diary.date.desc()).all()
+        if completed_dates is None:
+            completed_dates = DiaryService.get_completed_dates(user_id)
         
-        if not entries:
+        if not completed_dates:
             return 0
             
         streak = 0
@@ -151,8 +222,8 @@ class DiaryService:
         
         # Check if the user has an entry for today or yesterday
         # (to maintain streak if they missed today but did yesterday)
-        has_today = any(entry.date == current_date for entry in entries)
-        has_yesterday = any(entry.date == current_date - timedelta(days=1) for entry in entries)
+        has_today = current_date in completed_dates
+        has_yesterday = current_date - timedelta(days=1) in completed_dates
         
         # If no entry for today or yesterday, streak is 0
         if not has_today and not has_yesterday:
@@ -162,25 +233,21 @@ class DiaryService:
         check_date = current_date if has_today else current_date - timedelta(days=1)
         
         # Count consecutive days backward
-        while True:
-            # Check if there's an entry for check_date
-            entry_exists = any(entry.date == check_date for entry in entries)
-            if not entry_exists:
-                break
-                
+        while check_date in completed_dates:
             streak += 1
             check_date -= timedelta(days=1)
             
         return streak
     
     @staticmethod
-    def get_streak_data(user_id, days=35):
+    def get_streak_data(user_id, days=35, completed_dates=None):
         """
         Get streak data for the last N days for GitHub-style visualization
         
         Args:
             user_id (int): The user ID
             days (int): Number of days to retrieve (default: 35 for 5 weeks)
+            completed_dates (set, optional): Completed entry dates already loaded by the caller
             
         Returns:
             list: List of dicts with date and completion status
@@ -189,18 +256,9 @@ class DiaryService:
         end_date = date.today()
         start_date = end_date - timedelta(days=days-1)
         
-        # Get all diary entries for the user in the date range
-        entries = Diary.query.filter(
-            and_(
-                Diary.user_id == user_id,
-                Diary.date >= start_date,
-                Diary.date <= end_date,
-                Diary.is_completed == True
-            )
-        ).all()
-        
-        # Create a set of dates with completed entries
-        completed_dates = {entry.date for entry in entries}
+        # Get the dates with completed entries in the range
+        if completed_dates is None:
+            completed_dates = DiaryService.get_completed_dates(user_id, start_date, end_date)
         
         # Generate streak data for each day
         streak_data = []
@@ -0,0 +1,216 @@
+"""
+Message Archive Service Module
+Keeps the chat message tables proportional to active traffic
+
+On PostgreSQL `messages` is range partitioned by month on created_at
+(migration 010). ensure_partitions() creates the partitions for the coming
+months, and drop_empty_partitions() drops old ones the archiver has
+emptied, which frees their table and index pages without a VACUUM. On
+SQLite the tables stay plain and only archiving applies. A unique index on
+the parent table would have to include created_at, so each partition gets
+its own unique (user_session_id, client_message_id) index (migration 011).
+
+archive() moves messages of inactive chat groups and finished therapy
+sessions that are older than the retention period into gzip-compressed
+NDJSON files, deleting them in bounded batches (one transaction each).
+Every batch is appended to the file as its own gzip member and synced to
+disk before its rows are deleted; gzip.open() reads the members back as
+one stream.
+"""
+
+import datetime
+import gzip
+import json
+import os
+import re
+
+from sqlalchemy import delete, select, text
+
+from app.models import db
+from app.models.chat import ChatGroup, Message, TherapyMessage, TherapySession
+from app.serialization import MESSAGE_ROWS, THERAPY_MESSAGE_ROWS
+
+PARTITIONED_TABLE = 'messages'
+DEFAULT_PARTITION = 'messages_pdefault'
+_PARTITION_NAME = re.compile(r'^messages_p(\d{4})_(\d{2})$')
+
+FINISHED_SESSION_STATUSES = ('completed', 'cancelled')
+
+# table -> (model, row serializer, parent column, parents whose messages may be archived)
+ARCHIVE_SOURCES = {
+    'messages': (
+        Message, MESSAGE_ROWS, Message.group_id,
+        select(ChatGroup.id).where(ChatGroup.is_active.is_(False))
+    ),
+    'therapy_messages': (
+        TherapyMessage, THERAPY_MESSAGE_ROWS, TherapyMessage.session_id,
+        select(TherapySession.id).where(TherapySession.status.in_(FINISHED_SESSION_STATUSES))
+    ),
+}
+
+
+def month_start(day):
+    return datetime.date(day.year, day.month, 1)
+
+
+def next_month(month):
+    return datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'messages_p{month.year:04d}_{month.month:02d}'
+
+
+def client_message_id_index(partition):
+    """The unique index that makes client_message_id retries idempotent within a partition"""
+    return (f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{partition}_client_message_id "
+            f"ON {partition} (user_session_id, client_message_id) WHERE client_message_id IS NOT NULL;")
+
+
+def _append_batch(path, records):
+    payload = ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n' for record in records)
+    with open(path, 'ab') as f:
+        f.write(gzip.compress(payload.encode()))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class MessageArchiveService:
+    @staticmethod
+    def is_partitioned():
+        """True if `messages` is a partitioned table (PostgreSQL after migration 010)"""
+        if db.engine.dialect.name != 'postgresql':
+            return False
+        return db.session.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+        ), {'table': PARTITIONED_TABLE}).first() is not None
+
+    @staticmethod
+    def create_partitions(first_month, last_month):
+        """
+        Create the monthly partitions from first_month to last_month in the
+        current transaction. Rows for a new month that were routed to the
+        default partition are moved into it.
+
+        Returns:
+            list: Names of the partitions created
+        """
+        created = []
+        has_client_message_id = db.session.execute(text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = :table AND column_name = 'client_message_id' AND table_schema = current_schema()"
+        ), {'table': PARTITIONED_TABLE}).first() is not None
+        month = month_start(first_month)
+        while month <= last_month:
+            name = partition_name(month)
+            if db.session.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is None:
+                bounds = {'start': month, 'end': next_month(month)}
+                # A partition cannot be attached while the default one holds rows in its range
+                db.session.execute(text(f"CREATE TEMP TABLE {name}_moved (LIKE {PARTITIONED_TABLE});"))
+                db.session.execute(text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                    f"WHERE created_at >= :start AND created_at < :end RETURNING *) "
+                    f"INSERT INTO {name}_moved SELECT * FROM moved;"
+                ), bounds)
+                db.session.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF {PARTITIONED_TABLE} "
+                    f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}');"
+                ))
+                if has_client_message_id:
+                    db.session.execute(text(client_message_id_index(name)))
+                db.session.execute(text(f"INSERT INTO {PARTITIONED_TABLE} SELECT * FROM {name}_moved;"))
+                db.session.execute(text(f"DROP TABLE {name}_moved;"))
+                created.append(name)
+            month = next_month(month)
+        return created
+
+    @staticmethod
+    def ensure_partitions(months_ahead=2, today=None):
+        """
+        Make sure partitions exist for this month and the next `months_ahead`
+
+        Returns:
+            list: Names of the partitions created
+        """
+        if not MessageArchiveService.is_partitioned():
+            return []
+        month = month_start(today or datetime.datetime.utcnow().date())
+        last_month = month
+        for _ in range(months_ahead):
+            last_month = next_month(last_month)
+        created = MessageArchiveService.create_partitions(month, last_month)
+        db.session.commit()
+        return created
+
+    @staticmethod
+    def drop_empty_partitions(before):
+        """
+        Drop the monthly partitions that end on or before `before` and hold no rows
+
+        Returns:
+            list: Names of the partitions dropped
+        """
+        if not MessageArchiveService.is_partitioned():
+            return []
+        names = db.session.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ), {'table': PARTITIONED_TABLE}).scalars().all()
+
+        dropped = []
+        for name in sorted(names):
+            match = _PARTITION_NAME.match(name)
+            if not match or next_month(datetime.date(int(match[1]), int(match[2]), 1)) > before:
+                continue
+            db.session.execute(text(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE;"))
+            if db.session.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None:
+                db.session.execute(text(f"DROP TABLE {name};"))
+                dropped.append(name)
+            db.session.commit()
+        return dropped
+
+    @staticmethod
+    def archive(table, older_than_days, archive_dir, batch_size=1000, now=None):
+        """
+        Move old messages of inactive groups (or finished therapy sessions) to an archive file
+
+        Args:
+            table (str): 'messages' or 'therapy_messages'
+            older_than_days (int): Only messages older than this are archived
+            archive_dir (str): Directory for the .ndjson.gz files
+            batch_size (int): Rows written and deleted per transaction
+
+        Returns:
+            dict: 'table', 'archived' (row count) and 'path' (None if nothing was archived)
+        """
+        model, serializer, parent, archivable = ARCHIVE_SOURCES[table]
+        now = now or datetime.datetime.utcnow()
+        cutoff = now - datetime.timedelta(days=older_than_days)
+        path = os.path.join(archive_dir, f'{table}-{now:%Y%m%dT%H%M%S}.ndjson.gz')
+
+        archived = 0
+        last_id = 0
+        while True:
+            rows = serializer.query().filter(
+                parent.in_(archivable), model.created_at < cutoff, model.id > last_id
+            ).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            if not archived:
+                os.makedirs(archive_dir, exist_ok=True)
+            _append_batch(path, serializer.serialize(rows))
+
+            ids = [row.id for row in rows]
+            db.session.execute(delete(model).where(model.id.in_(ids), model.created_at < cutoff))
+            db.session.commit()
+            archived += len(ids)
+            last_id = ids[-1]
+        db.session.commit()
+
+        return {'table': table, 'archived': archived, 'path': path if archived else None}
+
+
+# Create a global instance for use throughout the application
+message_archive_service = MessageArchiveService()
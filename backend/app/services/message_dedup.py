@@ -0,0 +1,89 @@
+"""
+Message Dedup Module
+Recently submitted client message IDs, so a retried send is answered from
+memory with the original message
+
+Clients may tag a message with a client_message_id. Each sender keeps a
+window of its last `per_sender` IDs; the least recently active senders
+are forgotten beyond `max_senders`. The unique indexes on
+(user_session_id | sender_id, client_message_id) catch whatever the window
+misses (an evicted ID, another worker, concurrent retries).
+"""
+
+from collections import OrderedDict
+
+from app.models import db, dialect_insert
+from app.runtime import native_lock
+
+MAX_CLIENT_MESSAGE_ID_LENGTH = 64
+
+
+def valid_client_message_id(value):
+    """True for the optional client_message_id field: absent, or a non-empty string of at most 64 characters"""
+    return value is None or (isinstance(value, str) and 0 < len(value) <= MAX_CLIENT_MESSAGE_ID_LENGTH)
+
+
+def insert_once(rows, model, values, *existing):
+    """
+    Insert a message row unless the client already sent it (not committed)
+
+    Args:
+        rows: The RowSerializer for the model, used for RETURNING and the result
+        model: Message or TherapyMessage
+        values: Column values for the new row
+        existing: Filters selecting the row a unique conflict ran into
+
+    Returns:
+        tuple: (message dict, True if it was already stored)
+    """
+    statement = dialect_insert()(model).values(**values).on_conflict_do_nothing().returning(*rows.columns)
+    row = db.session.execute(statement).first()
+    if row is not None:
+        return rows.serialize([row])[0], False
+    # Monthly partitions of messages each have their own unique index, so a
+    # retry may match copies stored in different months; return the first
+    original = rows.query().filter(*existing).order_by(model.id).first()
+    return rows.serialize([original])[0], True
+
+
+class RecentMessageIds:
+    def __init__(self, per_sender=64, max_senders=10000):
+        self.per_sender = per_sender
+        self.max_senders = max_senders
+        self._senders = OrderedDict()  # sender -> OrderedDict(client_message_id -> message dict)
+        self._lock = native_lock()
+        self.hits = 0
+
+    def get(self, sender, client_message_id):
+        """The message already stored for this client ID, or None"""
+        if client_message_id is None:
+            return None
+        with self._lock:
+            window = self._senders.get(sender)
+            message = window.get(client_message_id) if window else None
+            if message is not None:
+                self.hits += 1
+            return message
+
+    def remember(self, sender, client_message_id, message):
+        if client_message_id is None:
+            return
+        with self._lock:
+            window = self._senders.get(sender)
+            if window is None:
+                window = self._senders[sender] = OrderedDict()
+                if len(self._senders) > self.max_senders:
+                    self._senders.popitem(last=False)
+            else:
+                self._senders.move_to_end(sender)
+            window[client_message_id] = message
+            if len(window) > self.per_sender:
+                window.popitem(last=False)
+
+    def forget(self, sender):
+        with self._lock:
+            self._senders.pop(sender, None)
+
+    def clear(self):
+        with self._lock:
+            self._senders.clear()
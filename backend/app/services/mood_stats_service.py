@@ -0,0 +1,168 @@
+"""
+Mood Stats Service Module
+Mood trend analytics computed from a single (date, mood) projection
+"""
+
+import threading
+from collections import Counter, OrderedDict, deque
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+from app.models import db
+from app.models.diary import Diary
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Streak-length buckets as (label, minimum run length)
+STREAK_BUCKETS = [('1', 1), ('2-6', 2), ('7-13', 7), ('14+', 14)]
+
+
+class MoodStatsService:
+    def __init__(self, max_cached_users=1024, max_cached_params=8):
+        # user_id -> OrderedDict(params key -> stats); least recently used
+        # users, and parameter sets within a user, are evicted first
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_cached_users = max_cached_users
+        self.max_cached_params = max_cached_params
+
+    def invalidate(self, user_id):
+        """Drop cached stats for a user in this process (call after any diary write)"""
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def get_mood_stats(self, user_id, window_days=30, samples=12):
+        """
+        Get mood trend analytics for a user
+
+        Args:
+            user_id (int): The user ID
+            window_days (int): Length of each rolling window in days
+            samples (int): Number of rolling windows to report, stepping back one window at a time
+
+        Returns:
+            dict: Overall distribution, rolling distributions, weekday patterns
+                and mood distribution by streak length
+        """
+        today = date.today()
+        # Writes handled by other workers (or while this computation runs)
+        # change the version, so stale entries are never served
+        version = self._data_version(user_id)
+        key = (today, window_days, samples, version)
+        with self._lock:
+            user_cache = self._cache.get(user_id)
+            if user_cache is not None and key in user_cache:
+                self._cache.move_to_end(user_id)
+                user_cache.move_to_end(key)
+                return user_cache[key]
+
+        stats = self._compute(self._load_projection(user_id), today, window_days, samples)
+
+        with self._lock:
+            user_cache = self._cache.get(user_id)
+            if user_cache is None:
+                user_cache = self._cache[user_id] = OrderedDict()
+            # Entries for another day or data version are never served again
+            for stale in [cached for cached in user_cache if (cached[0], cached[3]) != (today, version)]:
+                del user_cache[stale]
+            user_cache[key] = stats
+            while len(user_cache) > self.max_cached_params:
+                user_cache.popitem(last=False)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_cached_users:
+                self._cache.popitem(last=False)
+        return stats
+
+    @staticmethod
+    def _data_version(user_id):
+        """A cheap fingerprint of the user's diary rows: (count, last update, highest id)"""
+        return tuple(db.session.query(
+            func.count(Diary.id), func.max(Diary.updated_at), func.max(Diary.id)
+        ).filter(Diary.user_id == user_id).one())
+
+    @staticmethod
+    def _load_projection(user_id):
+        """Fetch only the (date, mood) columns for completed entries, oldest first"""
+        return db.session.query(Diary.date, Diary.mood).filter(
+            Diary.user_id == user_id,
+            Diary.is_completed == True,
+            Diary.mood.isnot(None)
+        ).order_by(Diary.date.asc()).all()
+
+    @staticmethod
+    def _compute(rows, today, window_days, samples):
+        """Single pass over the projection for all aggregates"""
+        distribution = Counter()
+        weekday = [Counter() for _ in WEEKDAYS]
+        by_streak = {label: Counter() for label, _ in STREAK_BUCKETS}
+
+        run_length = 0
+        previous_date = None
+        for entry_date, mood in rows:
+            distribution[mood] += 1
+            weekday[entry_date.weekday()][mood] += 1
+
+            # Length of the consecutive-day run ending on this entry
+            if previous_date is not None and entry_date - previous_date == timedelta(days=1):
+                run_length += 1
+            elif previous_date != entry_date:
+                run_length = 1
+            previous_date = entry_date
+
+            for label, minimum in reversed(STREAK_BUCKETS):
+                if run_length >= minimum:
+                    by_streak[label][mood] += 1
+                    break
+
+        return {
+            'total_entries': len(rows),
+            'first_date': rows[0][0].isoformat() if rows else None,
+            'last_date': rows[-1][0].isoformat() if rows else None,
+            'distribution': dict(distribution.most_common()),
+            'rolling': MoodStatsService._rolling(rows, today, window_days, samples),
+            'weekday': {
+                name: dict(counts.most_common()) for name, counts in zip(WEEKDAYS, weekday)
+            },
+            'by_streak_length': {
+                label: {
+                    'entries': sum(counts.values()),
+                    'distribution': dict(counts.most_common()),
+                    'top_mood': counts.most_common(1)[0][0] if counts else None
+                }
+                for label, counts in by_streak.items()
+            }
+        }
+
+    @staticmethod
+    def _rolling(rows, today, window_days, samples):
+        """
+        Mood distributions over consecutive windows ending today, oldest first.
+        Uses a sliding window over the date-sorted rows so each row is added
+        and removed at most once.
+        """
+        ends = [today - timedelta(days=window_days * i) for i in reversed(range(samples))]
+        window = deque()
+        counts = Counter()
+        position = 0
+        result = []
+
+        for end in ends:
+            start = end - timedelta(days=window_days - 1)
+            while position < len(rows) and rows[position][0] <= end:
+                window.append(rows[position])
+                counts[rows[position][1]] += 1
+                position += 1
+            while window and window[0][0] < start:
+                counts[window.popleft()[1]] -= 1
+            result.append({
+                'start_date': start.isoformat(),
+                'end_date': end.isoformat(),
+                'entries': len(window),
+                'distribution': {mood: count for mood, count in counts.most_common() if count > 0}
+            })
+        return result
+
+
+# Create a global instance for use throughout the application
+mood_stats_service = MoodStatsService()
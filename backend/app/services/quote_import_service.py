@@ -0,0 +1,189 @@
+"""
+Quote Import Service Module
+Streams quote packs (JSONL/CSV) into the database in deduplicated batches
+"""
+
+import csv
+import io
+import json
+import time
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models import db
+from app.models.quote import Quote
+from app.services.quote_pool import quote_pool
+
+SUPPORTED_FORMATS = ('jsonl', 'csv')
+
+# Dialect-specific INSERT constructs supporting ON CONFLICT DO NOTHING
+_INSERT_BY_DIALECT = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+class QuoteImportService:
+    DEFAULT_BATCH_SIZE = 500
+
+    @staticmethod
+    def detect_format(filename):
+        """Guess the import format from a file name, or None if unknown"""
+        if not filename:
+            return None
+        lowered = filename.lower()
+        if lowered.endswith(('.jsonl', '.ndjson')):
+            return 'jsonl'
+        if lowered.endswith('.csv'):
+            return 'csv'
+        return None
+
+    @staticmethod
+    def iter_records(stream, fmt):
+        """
+        Lazily yield quote records from a text stream
+
+        Args:
+            stream: A text file-like object
+            fmt (str): 'jsonl' or 'csv'
+
+        Yields:
+            dict: Raw record with at least a 'text' key, or None for unparseable lines
+        """
+        if fmt == 'jsonl':
+            for line in stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield None
+                    continue
+                yield record if isinstance(record, dict) else None
+        elif fmt == 'csv':
+            for record in csv.DictReader(stream):
+                yield record
+        else:
+            raise ValueError(f"Unsupported import format: {fmt}")
+
+    @staticmethod
+    def _build_row(record):
+        """Validate a raw record and turn it into an insertable row, or None if invalid"""
+        if not record or not isinstance(record, dict):
+            return None
+        # JSON packs can hold numbers, lists or objects where strings belong
+        if any(not isinstance(record.get(field), (str, type(None))) for field in ('text', 'author', 'category')):
+            return None
+        text = (record.get('text') or '').strip()
+        if not text or not Quote.normalize_text(text):
+            return None
+        author = (record.get('author') or '').strip() or None
+        category = (record.get('category') or '').strip() or None
+        return {
+            'text': text,
+            'author': author[:255] if author else None,
+            'category': category[:100] if category else None,
+            'text_hash': Quote.hash_text(text),
+        }
+
+    @staticmethod
+    def _insert_batch(rows):
+        """Insert a batch in one statement, skipping rows whose normalized text already exists"""
+        insert = _INSERT_BY_DIALECT.get(db.engine.dialect.name)
+        if insert is None:
+            raise RuntimeError(f"Bulk import is not supported on {db.engine.dialect.name}")
+
+        statement = insert(Quote.__table__).on_conflict_do_nothing(index_elements=['text_hash'])
+        result = db.session.execute(statement.values(rows))
+        db.session.commit()
+        return max(result.rowcount, 0)
+
+    @staticmethod
+    def import_records(records, batch_size=None):
+        """
+        Import an iterable of quote records in batches
+
+        Only one batch is held in memory at a time; duplicates across batches
+        and against existing quotes are dropped by the unique text hash.
+
+        Args:
+            records (iterable): Dicts with 'text' and optional 'author'/'category'
+            batch_size (int, optional): Rows per INSERT statement
+
+        Returns:
+            dict: Import statistics including throughput
+        """
+        batch_size = batch_size or QuoteImportService.DEFAULT_BATCH_SIZE
+        stats = {'read': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0, 'batches': 0}
+        started = time.perf_counter()
+
+        batch = []
+        batch_hashes = set()
+
+        def flush():
+            inserted = QuoteImportService._insert_batch(batch)
+            stats['inserted'] += inserted
+            stats['duplicates'] += len(batch) - inserted
+            stats['batches'] += 1
+            batch.clear()
+            batch_hashes.clear()
+
+        try:
+            for record in records:
+                stats['read'] += 1
+                row = QuoteImportService._build_row(record)
+                if row is None:
+                    stats['invalid'] += 1
+                    continue
+                if row['text_hash'] in batch_hashes:
+                    stats['duplicates'] += 1
+                    continue
+                batch_hashes.add(row['text_hash'])
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            if stats['inserted']:
+                quote_pool.invalidate()
+
+        elapsed = time.perf_counter() - started
+        stats['elapsed_seconds'] = round(elapsed, 4)
+        stats['rows_per_second'] = round(stats['read'] / elapsed, 1) if elapsed > 0 else None
+        return stats
+
+    @staticmethod
+    def import_stream(stream, fmt, batch_size=None, encoding='utf-8'):
+        """
+        Import quotes from a binary or text stream
+
+        Args:
+            stream: File-like object (binary streams are decoded with `encoding`)
+            fmt (str): 'jsonl' or 'csv'
+            batch_size (int, optional): Rows per INSERT statement
+
+        Returns:
+            dict: Import statistics including throughput
+        """
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported import format: {fmt}")
+        if not isinstance(stream, io.TextIOBase):
+            stream = io.TextIOWrapper(stream, encoding=encoding, newline='')
+        return QuoteImportService.import_records(
+            QuoteImportService.iter_records(stream, fmt),
+            batch_size=batch_size
+        )
+
+    @staticmethod
+    def import_file(path, fmt=None, batch_size=None):
+        """Import quotes from a JSONL or CSV file on disk"""
+        fmt = fmt or QuoteImportService.detect_format(path)
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"Cannot determine import format for {path}")
+        with open(path, 'r', encoding='utf-8', newline='') as stream:
+            return QuoteImportService.import_stream(stream, fmt, batch_size=batch_size)
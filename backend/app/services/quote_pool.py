@@ -0,0 +1,216 @@
+"""
+Quote Pool Module
+Keeps an in-memory snapshot of the quotes table so random selection
+never has to touch the database on the request path
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import accumulate
+
+from app.models.quote import Quote
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+
+class PooledQuote(namedtuple('PooledQuote', ['id', 'text', 'author', 'category', 'created_at'])):
+    """Compact, immutable quote record held by the pool"""
+    __slots__ = ()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'text': self.text,
+            'author': self.author,
+            'category': self.category,
+            'created_at': self.created_at
+        }
+
+    @classmethod
+    def from_model(cls, quote):
+        return cls(
+            quote.id,
+            quote.text,
+            quote.author,
+            quote.category,
+            quote.created_at.isoformat() if quote.created_at else None
+        )
+
+
+class QuotePool:
+    # Number of random draws to try before falling back to a filtered scan
+    MAX_REJECTION_DRAWS = 8
+    # Weight sets with a cached sampler; weights come from the query string
+    MAX_CACHED_WEIGHTS = 32
+
+    def __init__(self, ttl=300):
+        # Snapshot is swapped as a whole so readers never need the lock
+        self._quotes = ()
+        self._index = {}  # quote_id -> position in self._quotes
+        self._weight_cache = {}  # sorted weight items -> sampler over self._quotes
+        self._categories = frozenset()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self.ttl = ttl  # Seconds before a snapshot is reloaded (other workers may have written)
+
+    def init_app(self, app):
+        """Configure the pool from the app config and warm it at startup"""
+        self.ttl = app.config.get('QUOTE_POOL_TTL', self.ttl)
+        with app.app_context():
+            try:
+                self.load()
+            except Exception as e:
+                # Tables may not exist yet (e.g. before init_db); the pool loads lazily later
+                db.session.rollback()
+                logger.warning("Could not preload the quote pool: %s", e)
+
+    def _set_snapshot(self, quotes):
+        quotes = tuple(quotes)
+        self._index = {quote.id: position for position, quote in enumerate(quotes)}
+        self._weight_cache = {}
+        self._categories = frozenset(quote.category for quote in quotes)
+        self._quotes = quotes
+        self._loaded_at = time.monotonic()
+
+    def load(self):
+        """Load (or reload) the pool from the database"""
+        rows = db.session.query(
+            Quote.id, Quote.text, Quote.author, Quote.category, Quote.created_at
+        ).order_by(Quote.id).all()
+
+        with self._lock:
+            self._set_snapshot(
+                PooledQuote(
+                    row.id,
+                    row.text,
+                    row.author,
+                    row.category,
+                    row.created_at.isoformat() if row.created_at else None
+                )
+                for row in rows
+            )
+        return len(self._quotes)
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or (self.ttl and time.monotonic() - self._loaded_at > self.ttl):
+            self.load()
+
+    def is_loaded(self):
+        return self._loaded_at is not None
+
+    def get_all(self):
+        """Get the current snapshot of quotes"""
+        self._ensure_fresh()
+        return self._quotes
+
+    def get(self, quote_id):
+        """Get a pooled quote by ID or None"""
+        self._ensure_fresh()
+        position = self._index.get(quote_id)
+        quotes = self._quotes
+        if position is None or position >= len(quotes) or quotes[position].id != quote_id:
+            return None
+        return quotes[position]
+
+    def get_random(self, exclude_ids=None, weights=None):
+        """
+        Pick a random quote without querying the database
+
+        Args:
+            exclude_ids (iterable, optional): Quote IDs that must not be returned
+            weights (dict, optional): Mapping of category -> relative weight.
+                Categories not listed get a weight of 1.
+
+        Returns:
+            PooledQuote: A random quote or None if no quotes are available
+        """
+        self._ensure_fresh()
+        quotes = self._quotes
+        if not quotes:
+            return None
+
+        excluded = set(exclude_ids) if exclude_ids else None
+
+        if weights:
+            draw = self._weighted_drawer(weights)
+        else:
+            draw = lambda: quotes[random.randrange(len(quotes))]
+
+        # Rejection sampling keeps selection O(1) while the exclusion set is
+        # small relative to the pool
+        if not excluded:
+            return draw()
+        for _ in range(self.MAX_REJECTION_DRAWS):
+            quote = draw()
+            if quote.id not in excluded:
+                return quote
+
+        candidates = [quote for quote in quotes if quote.id not in excluded]
+        if not candidates:
+            return None
+        if weights:
+            candidate_weights = [max(weights.get(quote.category, 1), 0) for quote in candidates]
+            if 0 < sum(candidate_weights) < math.inf:
+                return random.choices(candidates, weights=candidate_weights)[0]
+        return random.choice(candidates)
+
+    def _weighted_drawer(self, weights):
+        """Build (and cache per snapshot) a cumulative-weight sampler"""
+        # Weights for categories the pool does not have change nothing
+        categories = self._categories
+        key = tuple(sorted(item for item in weights.items() if item[0] in categories))
+        cache = self._weight_cache
+        drawer = cache.get(key)
+        if drawer is None:
+            quotes = self._quotes
+            cumulative = list(accumulate(max(weights.get(quote.category, 1), 0) for quote in quotes))
+            total = cumulative[-1]
+            last = len(quotes) - 1
+            if not 0 < total < math.inf:  # also catches NaN and overflowed sums
+                drawer = lambda: quotes[random.randrange(len(quotes))]
+            else:
+                # hi= guards against random() * total rounding up to total
+                drawer = lambda: quotes[bisect_right(cumulative, random.random() * total, hi=last)]
+            if len(cache) >= self.MAX_CACHED_WEIGHTS:
+                cache.clear()
+            cache[key] = drawer
+        return drawer
+
+    def upsert(self, quote):
+        """Add or replace a quote in the pool after a create/update"""
+        pooled = PooledQuote.from_model(quote)
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            quotes = list(self._quotes)
+            position = self._index.get(pooled.id)
+            if position is None:
+                quotes.append(pooled)
+            else:
+                quotes[position] = pooled
+            self._set_snapshot(quotes)
+
+    def remove(self, quote_id):
+        """Remove a quote from the pool after a delete"""
+        with self._lock:
+            if self._loaded_at is None or quote_id not in self._index:
+                return
+            self._set_snapshot(quote for quote in self._quotes if quote.id != quote_id)
+
+    def invalidate(self):
+        """Force the next read to reload from the database"""
+        with self._lock:
+            self._loaded_at = None
+
+    def __len__(self):
+        return len(self._quotes)
+
+
+# Create a global instance for use throughout the application
+quote_pool = QuotePool()
@@ -1,6 +1,7 @@
 from app.models.quote import Quote
 from app.models import db
-import random
+from sqlalchemy.exc import IntegrityError
+from app.services.quote_pool import quote_pool
 
 class QuoteService:
     @staticmethod
@@ -14,29 +15,19 @@ class QuoteService:
         return Quote.query.get(quote_id)
     
     @staticmethod
-    def get_random_quote(exclude_ids=None):
+    def get_random_quote(exclude_ids=None, weights=None):
         """
-        Get a random quote, excluding specific IDs to prevent repetition
+        Get a random quote, excluding specific IDs to prevent repetition.
+        Served from the in-memory quote pool, so no database query is made.
         
         Args:
             exclude_ids (list): List of quote IDs to exclude
+            weights (dict, optional): Mapping of category -> relative weight
             
         Returns:
-            Quote: A random quote object or None if no quotes available
+            PooledQuote: A random quote or None if no quotes available
         """
-        query = Quote.query
-        
-        # Exclude specific IDs if provided
-        if exclude_ids:
-            query = query.filter(~Quote.id.in_(exclude_ids))
-            
-        # Get all matching quotes
-        quotes = query.all()
-        
-        # Return random quote or None if no quotes
-        if quotes:
-            return random.choice(quotes)
-        return None
+        return quote_pool.get_random(exclude_ids, weights)
     
     @staticmethod
     def create_quote(text, author=None, category=None):
@@ -49,11 +40,18 @@ class QuoteService:
             category (str, optional): The quote category
             
         Returns:
-            Quote: The created quote object
+            Quote: The created quote object, or the existing quote if one
+                with the same normalized text already exists
         """
-        quote = Quote(text=text, author=author, category=category)
+        text_hash = Quote.hash_text(text)
+        quote = Quote(text=text, author=author, category=category, text_hash=text_hash)
         db.session.add(quote)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return Quote.query.filter_by(text_hash=text_hash).first()
+        quote_pool.upsert(quote)
         return quote
     
     @staticmethod
@@ -69,16 +67,25 @@ class QuoteService:
             
         Returns:
             Quote: The updated quote object or None if not found
+            
+        Raises:
+            ValueError: If the new text duplicates another quote
         """
         quote = Quote.query.get(quote_id)
         if quote:
             if text is not None:
                 quote.text = text
+                quote.text_hash = Quote.hash_text(text)
             if author is not None:
                 quote.author = author
             if category is not None:
                 quote.category = category
-            db.session.commit()
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                raise ValueError("A quote with the same text already exists")
+            quote_pool.upsert(quote)
         return quote
     
     @staticmethod
@@ -96,6 +103,7 @@ class QuoteService:
         if quote:
             db.session.delete(quote)
             db.session.commit()
+            quote_pool.remove(quote_id)
             return True
         return False
     
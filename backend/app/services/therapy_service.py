@@ -5,9 +5,17 @@ Handles therapy session requests, management, and communication
 
 from app.models import db
 from app.models.chat import TherapySession, TherapyMessage
+from app.serialization import THERAPY_MESSAGE_ROWS
+from app.services.message_dedup import RecentMessageIds, insert_once
 from datetime import datetime
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
+# client_message_id windows per sender, for retried sends
+recent_therapy_messages = RecentMessageIds()
+
 class TherapyService:
     @staticmethod
     def create_therapy_request(user_session_id, user_email):
@@ -62,26 +70,23 @@ class TherapyService:
         """
         try:
             session = TherapySession.query.get(session_id)
-            print(f"Attempting to start session {session_id}")
-            print(f"Session found: {session is not None}")
-            if session:
-                print(f"Session status before start: {session.status}")
+            logger.debug("Starting session %s (status: %s)", session_id, session.status if session else None)
             
             if session and session.status == 'accepted':
                 session.status = 'in_progress'
                 session.started_at = datetime.utcnow()
                 db.session.commit()
-                print(f"Session started successfully: {session.to_dict()}")
+                logger.info("Session %s started", session_id)
                 return session.to_dict()
             elif session:
-                print(f"Session cannot be started. Status is {session.status}")
+                logger.warning("Session %s cannot be started. Status is %s", session_id, session.status)
                 return None
             else:
-                print("Session not found")
+                logger.warning("Session %s not found", session_id)
                 return None
         except Exception as e:
             db.session.rollback()
-            print(f"Error starting session: {e}")
+            logger.exception("Error starting session %s", session_id)
             raise e
 
     @staticmethod
@@ -91,11 +96,8 @@ class TherapyService:
         """
         try:
             session = TherapySession.query.get(session_id)
-            print(f"Attempting to end session {session_id}")
-            print(f"Session found: {session is not None}")
-            if session:
-                print(f"Session status: {session.status}")
-                print(f"Session started_at: {session.started_at}")
+            logger.debug("Ending session %s (status: %s, started_at: %s)", session_id,
+                         session.status if session else None, session.started_at if session else None)
             
             if session and session.status == 'in_progress':
                 session.status = 'completed'
@@ -104,17 +106,17 @@ class TherapyService:
                     duration = (session.ended_at - session.started_at).total_seconds() / 60
                     session.actual_duration = int(duration)
                 db.session.commit()
-                print(f"Session ended successfully: {session.to_dict()}")
+                logger.info("Session %s ended after %s minutes", session_id, session.actual_duration)
                 return session.to_dict()
             elif session:
-                print(f"Session cannot be ended. Status is {session.status}")
+                logger.warning("Session %s cannot be ended. Status is %s", session_id, session.status)
                 return None
             else:
-                print("Session not found")
+                logger.warning("Session %s not found", session_id)
                 return None
         except Exception as e:
             db.session.rollback()
-            print(f"Error ending session: {e}")
+            logger.exception("Error ending session %s", session_id)
             raise e
 
     @staticmethod
@@ -142,23 +144,38 @@ class TherapyService:
             raise e
 
     @staticmethod
-    def send_message(session_id, sender_id, sender_type, content):
+    def store_message(session_id, sender_id, sender_type, content, client_message_id=None):
         """
-        Send a message in a therapy session
+        Store a therapy session message once per client_message_id
+
+        Returns:
+            dict: {'message': message dict, 'duplicate': True if a retry of a stored message}
         """
+        message = recent_therapy_messages.get(sender_id, client_message_id)
+        if message is not None:
+            return {'message': message, 'duplicate': True}
         try:
-            message = TherapyMessage(
-                session_id=session_id,
-                sender_id=sender_id,
-                sender_type=sender_type,
-                content=content
-            )
-            db.session.add(message)
+            message, duplicate = insert_once(THERAPY_MESSAGE_ROWS, TherapyMessage, {
+                'session_id': session_id,
+                'sender_id': sender_id,
+                'sender_type': sender_type,
+                'content': content,
+                'client_message_id': client_message_id
+            }, TherapyMessage.sender_id == sender_id, TherapyMessage.client_message_id == client_message_id)
             db.session.commit()
-            return message.to_dict()
         except Exception as e:
             db.session.rollback()
             raise e
+        recent_therapy_messages.remember(sender_id, client_message_id, message)
+        return {'message': message, 'duplicate': duplicate}
+
+    @staticmethod
+    def send_message(session_id, sender_id, sender_type, content, client_message_id=None):
+        """
+        Send a message in a therapy session
+        """
+        return TherapyService.store_message(session_id, sender_id, sender_type, content,
+                                            client_message_id)['message']
 
     @staticmethod
     def get_session_messages(session_id):
@@ -166,10 +183,10 @@ class TherapyService:
         Get all messages for a therapy session
         """
         try:
-            messages = TherapyMessage.query.filter_by(session_id=session_id).order_by(
+            rows = THERAPY_MESSAGE_ROWS.query().filter(TherapyMessage.session_id == session_id).order_by(
                 TherapyMessage.created_at.asc()
             ).all()
-            return [message.to_dict() for message in messages]
+            return THERAPY_MESSAGE_ROWS.serialize(rows)
         except Exception as e:
             raise e
 
@@ -0,0 +1,285 @@
+"""
+Toxicity Scorer Module
+Optional machine-learned moderation that catches abuse the word lists
+miss (misspellings, l33t-speak, spaced-out letters)
+
+Scorers implement ToxicityScorer.score_batch(). The bundled one is a
+logistic regression over hashed character and word n-grams, stored as a
+NumPy .npz weight file and trained with train_toxicity_model.py; no
+weights ship with the repository. Messages are scored through a
+MicroBatcher, which groups concurrent requests into one vectorized call.
+
+NumPy is only needed when the hashed n-gram scorer is enabled.
+"""
+
+import abc
+import importlib
+import logging
+import math
+import re
+import time
+import zlib
+
+from app.runtime import native_lock, native_signal, native_sleep, start_native_thread
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+MODEL_FORMAT = 1
+DEFAULT_FEATURES = 2 ** 18
+
+_LEET = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b',
+    '@': 'a', '$': 's', '!': 'i', '|': 'l', '+': 't',
+})
+_REPEATS = re.compile(r'(.)\1{2,}')
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+_NON_LETTER = re.compile(r'[^a-z]+')
+
+
+def normalize(text):
+    """Lowercase, undo common character substitutions and squash long repeats"""
+    text = text.lower().translate(_LEET)
+    return _REPEATS.sub(r'\1\1', text)
+
+
+def extract_features(text, n_features=DEFAULT_FEATURES):
+    """
+    Hashed feature indices for a message (unique, unweighted)
+
+    Character 3-5 grams are taken from the words and from the letters with
+    everything else removed, so "f.u.c.k" and "f u c k" share features with
+    "fuck"; word unigrams and bigrams add context.
+    """
+    normalized = normalize(text)
+    words = _NON_WORD.sub(' ', normalized).split()
+    squashed = _NON_LETTER.sub('', normalized)
+
+    grams = [f'w:{word}' for word in words]
+    grams.extend(f'b:{first} {second}' for first, second in zip(words, words[1:]))
+    for source, prefix in ((' '.join(words), 'c'), (squashed, 's')):
+        padded = f' {source} '
+        for size in (3, 4, 5):
+            grams.extend(f'{prefix}{size}:{padded[i:i + size]}' for i in range(len(padded) - size + 1))
+    return sorted({zlib.crc32(gram.encode()) % n_features for gram in grams})
+
+
+class ToxicityScorer(abc.ABC):
+    """Interface for pluggable scorers"""
+
+    # Scores at or above this are treated as a violation
+    threshold = 0.5
+
+    @abc.abstractmethod
+    def score_batch(self, texts):
+        """
+        Returns:
+            list: Probability that each text is toxic, in [0, 1]
+        """
+
+
+class HashedNgramScorer(ToxicityScorer):
+    def __init__(self, weights, bias, threshold=0.5):
+        self.weights = weights
+        self.bias = float(bias)
+        self.threshold = float(threshold)
+        self.n_features = len(weights)
+
+    @classmethod
+    def load(cls, path):
+        if np is None:
+            raise ImportError("The hashed n-gram toxicity scorer needs numpy")
+        with np.load(path) as model:
+            if int(model['format']) != MODEL_FORMAT:
+                raise ValueError(f"Unsupported toxicity model format {int(model['format'])} in {path}")
+            return cls(model['weights'].astype(np.float32), model['bias'], model['threshold'])
+
+    def save(self, path, **metadata):
+        np.savez_compressed(
+            path, format=MODEL_FORMAT, weights=self.weights, bias=self.bias,
+            threshold=self.threshold, **metadata
+        )
+
+    def logits(self, feature_lists):
+        """One sparse matrix-vector product for the whole batch"""
+        matrix = rows, columns, values = _sparse_rows(feature_lists)
+        logits = self.bias + np.bincount(rows, weights=self.weights[columns] * values, minlength=len(feature_lists))
+        return logits, matrix
+
+    def score_batch(self, texts):
+        logits, _ = self.logits([extract_features(text, self.n_features) for text in texts])
+        return (1.0 / (1.0 + np.exp(-logits))).tolist()
+
+
+def _sparse_rows(feature_lists):
+    """A batch as coordinate-format sparse rows (row ids, feature indices, values), each row L2-normalized"""
+    rows, columns, values = [], [], []
+    for row, features in enumerate(feature_lists):
+        if features:
+            rows.extend([row] * len(features))
+            columns.extend(features)
+            values.extend([1.0 / math.sqrt(len(features))] * len(features))
+    return (np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64),
+            np.asarray(values, dtype=np.float32))
+
+
+def train(texts, labels, n_features=DEFAULT_FEATURES, epochs=5, learning_rate=0.5, l2=1e-6,
+          batch_size=256, seed=0):
+    """
+    Fit a HashedNgramScorer with mini-batch gradient descent
+
+    Args:
+        texts (list): Messages
+        labels (list): 1 for toxic, 0 otherwise
+
+    Returns:
+        HashedNgramScorer: The trained scorer (threshold 0.5; tune it on held-out data)
+    """
+    if np is None:
+        raise ImportError("Training the toxicity model needs numpy")
+    scorer = HashedNgramScorer(np.zeros(n_features, dtype=np.float32), 0.0)
+    labels = np.asarray(labels, dtype=np.float32)
+    features = [extract_features(text, n_features) for text in texts]
+    rng = np.random.default_rng(seed)
+
+    for _ in range(epochs):
+        order = rng.permutation(len(texts))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            logits, (rows, columns, values) = scorer.logits([features[index] for index in batch])
+            errors = (1.0 / (1.0 + np.exp(-logits))) - labels[batch]
+            gradient = np.zeros(n_features, dtype=np.float32)
+            np.add.at(gradient, columns, errors[rows] * values)
+            scorer.weights -= learning_rate * (gradient / len(batch) + l2 * scorer.weights)
+            scorer.bias -= learning_rate * float(errors.mean())
+    return scorer
+
+
+class _Request:
+    __slots__ = ('text', 'score', 'error', 'done', 'abandoned')
+
+    def __init__(self, text):
+        self.text = text
+        self.score = None
+        self.error = None
+        self.abandoned = False  # the caller timed out; not worth scoring
+        self.done = native_signal()
+        self.done.acquire()  # released once scored
+
+
+class MicroBatcher:
+    """
+    Groups concurrent score() calls into one score_batch() call
+
+    A dedicated OS thread, started on first use, does all the scoring: once
+    a request arrives it waits up to `max_wait` seconds for more (or until
+    `max_batch` are queued), scores them all at once and hands each waiting
+    caller its result. Callers only wait for their own result, so under
+    steady load nobody scores anyone else's batch. Under low load a request
+    costs at most `max_wait` extra; under high load batches fill up and the
+    per-message cost drops.
+
+    score() blocks its OS thread; call it from offload() pool threads, not
+    from the hub under eventlet/gevent.
+    """
+
+    def __init__(self, scorer, max_batch=32, max_wait=0.005):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = []
+        self._lock = native_lock()
+        self._wakeup = native_signal()
+        self._wakeup.acquire()  # released when requests are pending
+        self._signalled = False
+        self._started = False
+        self.batches = 0
+        self.scored = 0
+        self.abandoned = 0
+
+    def score(self, text, timeout=1.0):
+        """
+        Returns:
+            float or None: The toxicity probability, or None if not scored within `timeout`
+        """
+        request = _Request(text)
+        with self._lock:
+            if not self._started:
+                self._started = True
+                start_native_thread(self._work)
+            self._pending.append(request)
+            if not self._signalled:
+                self._signalled = True
+                self._wakeup.release()
+        if not request.done.acquire(timeout=timeout):
+            request.abandoned = True
+            return None
+        if request.error is not None:
+            raise request.error
+        return request.score
+
+    def _work(self):
+        while True:
+            self._wakeup.acquire()
+            # Give concurrent callers a moment to join the batch
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch and time.monotonic() < deadline:
+                native_sleep(min(0.0005, self.max_wait))
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.max_batch]
+                    del self._pending[:self.max_batch]
+                    if not self._pending:
+                        self._signalled = False
+                if not batch:
+                    break
+                try:
+                    self._run(batch)
+                except Exception as e:  # pragma: no cover - _run reports errors to callers
+                    logger.exception("Toxicity batch failed: %s", e)
+
+    def _run(self, batch):
+        abandoned = [request for request in batch if request.abandoned]
+        batch = [request for request in batch if not request.abandoned]
+        if batch:
+            try:
+                scores = self.scorer.score_batch([request.text for request in batch])
+                for request, score in zip(batch, scores):
+                    request.score = score
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+        with self._lock:
+            self.batches += bool(batch)
+            self.scored += len(batch)
+            self.abandoned += len(abandoned)
+        for request in batch:
+            request.done.release()
+
+    def metrics_lines(self):
+        return [
+            '# TYPE toxicity_batches_total counter',
+            f'toxicity_batches_total {self.batches}',
+            '# TYPE toxicity_scored_total counter',
+            f'toxicity_scored_total {self.scored}',
+            '# TYPE toxicity_abandoned_total counter',
+            f'toxicity_abandoned_total {self.abandoned}',
+        ]
+
+
+def load_scorer(spec, model_path=None):
+    """
+    Build the scorer named by TOXICITY_SCORER: "hashed_ngram" (the bundled
+    model at TOXICITY_MODEL_PATH) or "package.module:factory" for a custom
+    scorer, called with no arguments
+    """
+    if spec == 'hashed_ngram':
+        return HashedNgramScorer.load(model_path)
+    module_name, _, attribute = spec.partition(':')
+    if not attribute:
+        raise ValueError(f"TOXICITY_SCORER must be 'hashed_ngram' or 'module:factory', not {spec!r}")
+    return getattr(importlib.import_module(module_name), attribute)()
@@ -0,0 +1,125 @@
+import logging
+from flask_socketio import emit, join_room, leave_room
+from app import socketio
+from app.instrumentation import instrumented_event
+from app.outbound import outbound_queues, room_sids
+from app.rate_limit import rate_limiter
+from app.services.message_dedup import valid_client_message_id
+from app.services.therapy_service import therapy_service
+
+logger = logging.getLogger(__name__)
+
+# Database work below runs on the calling greenlet (psycogreen makes
+# psycopg2 yield to the hub). Each helper bundles the database calls of
+# one handler.
+
+def _join_therapy_session(session_id, connected_users):
+    session_info = therapy_service.get_user_sessions(session_id)
+    if session_info and len(session_info) > 0:
+        session = session_info[0]
+        # If session is accepted and both user and therapist have joined, start the session
+        if session['status'] == 'accepted' and connected_users >= 2:
+            logger.info("Both user and therapist have joined session %s, starting session", session_id)
+            return therapy_service.start_session(session_id)
+    return None
+
+# Keep track of connected users per session
+therapy_session_connections = {}
+
+# Therapy session events
+@socketio.on('join_therapy_session')
+@instrumented_event('join_therapy_session')
+def handle_join_therapy_session(data):
+    """Handle therapist or user joining a therapy session"""
+    session_id = data.get('session_id')
+    user_id = data.get('user_id')
+    
+    if not session_id or not user_id:
+        emit('error', {'message': 'Session ID and user ID are required'})
+        return
+    
+    # Initialize the session connections tracking if not exists
+    if session_id not in therapy_session_connections:
+        therapy_session_connections[session_id] = set()
+    
+    # Add user to the session connections
+    therapy_session_connections[session_id].add(user_id)
+    
+    # Join the SocketIO room for this therapy session
+    join_room(f"therapy_{session_id}")
+    
+    # Check if we should start the session (when both user and therapist have joined)
+    started_session = _join_therapy_session(session_id, len(therapy_session_connections[session_id]))
+    if started_session:
+        # Notify all in the session that it has started
+        emit('therapy_session_started', {
+            'session': started_session
+        }, to=f"therapy_{session_id}")
+    
+    # Notify others in the session
+    emit('user_joined_therapy', {
+        'user_id': user_id,
+        'message': f"User {user_id} joined the therapy session"
+    }, to=f"therapy_{session_id}")
+
+@socketio.on('send_therapy_message')
+@instrumented_event('send_therapy_message')
+@rate_limiter.limit_event('send_therapy_message', rate=1, burst=5)
+def handle_send_therapy_message(data):
+    """Handle sending a therapy session message"""
+    session_id = data.get('session_id')
+    sender_id = data.get('sender_id')
+    sender_type = data.get('sender_type')  # 'user' or 'therapist'
+    content = data.get('content')
+    client_message_id = data.get('client_message_id')
+    
+    if not all([session_id, sender_id, sender_type, content]):
+        emit('error', {'message': 'Session ID, sender ID, sender type, and content are required'})
+        return
+    if not valid_client_message_id(client_message_id):
+        emit('error', {'message': 'client_message_id must be a string of at most 64 characters'})
+        return
+    
+    try:
+        # Save message to database
+        result = therapy_service.store_message(session_id, sender_id, sender_type, content,
+                                              client_message_id)
+        
+        if result['duplicate']:
+            # A retry: the room already has it, only the sender still waits for it
+            emit('new_therapy_message', result['message'])
+            return
+        
+        # Broadcast message to the therapy session room
+        room = f"therapy_{session_id}"
+        emit('new_therapy_message', result['message'], to=room)
+        outbound_queues.evict_lagging(room_sids(room))
+    except Exception as e:
+        emit('error', {'message': f'Failed to send message: {str(e)}'})
+
+@socketio.on('leave_therapy_session')
+@instrumented_event('leave_therapy_session')
+def handle_leave_therapy_session(data):
+    """Handle user or therapist leaving a therapy session"""
+    session_id = data.get('session_id')
+    user_id = data.get('user_id')
+    
+    if not session_id or not user_id:
+        emit('error', {'message': 'Session ID and user ID are required'})
+        return
+    
+    # Remove user from the session connections
+    if session_id in therapy_session_connections and user_id in therapy_session_connections[session_id]:
+        therapy_session_connections[session_id].remove(user_id)
+        # Clean up the set if it's empty
+        if not therapy_session_connections[session_id]:
+            del therapy_session_connections[session_id]
+    
+    # Leave the SocketIO room for this therapy session
+    leave_room(f"therapy_{session_id}")
+    
+    # Notify others in the session
+    emit('user_left_therapy', {
+        'user_id': user_id,
+        'message': f"User {user_id} left the therapy session"
+    }, to=f"therapy_{session_id}")
@@ -0,0 +1,119 @@
+"""
+Typing Indicator Module
+Per-group typing state for chat. Typing events only update the state; a
+flush sends each changed group one `typing_users` update with everyone
+currently typing, at most once per interval, so fan-out follows state
+changes rather than keystrokes. Flags not refreshed within the timeout
+expire server-side (clients that disconnect mid-word never send
+is_typing: false).
+"""
+
+import time
+
+from app.runtime import native_lock
+
+
+class TypingIndicators:
+    def __init__(self, interval=0.3, timeout=6.0):
+        self.interval = interval  # seconds between flushes
+        self.timeout = timeout  # seconds before an unrefreshed flag expires
+        self._typing = {}  # group_id -> {user_session_id: (username, expires_at)}
+        self._groups = {}  # user_session_id -> group_id
+        self._dirty = set()  # group_ids changed since the last flush
+        self._sent = {}  # group_id -> user_session_ids in the last update sent
+        self._running = False
+        self._lock = native_lock()
+
+    def init_app(self, app):
+        self.interval = app.config.get('TYPING_FLUSH_INTERVAL', self.interval)
+        self.timeout = app.config.get('TYPING_TIMEOUT', self.timeout)
+
+    def update(self, group_id, user_session_id, username, is_typing, now=None):
+        """
+        Record a typing event
+
+        Returns:
+            bool: True if the flush loop is not running and must be started
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if is_typing:
+                if self._groups.get(user_session_id) not in (None, group_id):
+                    self._remove(user_session_id)
+                group = self._typing.setdefault(group_id, {})
+                if user_session_id not in group:
+                    self._dirty.add(group_id)
+                group[user_session_id] = (username, now + self.timeout)
+                self._groups[user_session_id] = group_id
+            elif self._groups.get(user_session_id) == group_id:
+                self._remove(user_session_id)
+
+            if self._dirty and not self._running:
+                self._running = True
+                return True
+            return False
+
+    def discard(self, user_session_id):
+        """Forget a user who left the chat"""
+        with self._lock:
+            self._remove(user_session_id)
+
+    def _remove(self, user_session_id):
+        group_id = self._groups.pop(user_session_id, None)
+        if group_id is None:
+            return
+        group = self._typing.get(group_id, {})
+        group.pop(user_session_id, None)
+        if not group:
+            self._typing.pop(group_id, None)
+        self._dirty.add(group_id)
+
+    def flush(self, now=None):
+        """
+        Expire stale flags and collect the groups whose typing set changed
+
+        Returns:
+            list: (group_id, [{'user_session_id', 'username'}, ...]) per changed group
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for group in list(self._typing.values()):
+                for user_session_id, (_, expires_at) in list(group.items()):
+                    if expires_at <= now:
+                        self._remove(user_session_id)
+
+            updates = []
+            for group_id in self._dirty:
+                group = self._typing.get(group_id, {})
+                # A user who stopped and restarted between flushes is no change
+                if set(group) == self._sent.get(group_id, set()):
+                    continue
+                if group:
+                    self._sent[group_id] = set(group)
+                else:
+                    self._sent.pop(group_id, None)
+                updates.append((group_id, [
+                    {'user_session_id': user_session_id, 'username': username}
+                    for user_session_id, (username, _) in group.items()
+                ]))
+            self._dirty.clear()
+        return updates
+
+    def stop_if_idle(self):
+        """Mark the flush loop stopped if nobody is typing; returns True if it should exit"""
+        with self._lock:
+            if self._typing or self._dirty:
+                return False
+            self._running = False
+            return True
+
+    def reset(self):
+        with self._lock:
+            self._typing.clear()
+            self._groups.clear()
+            self._dirty.clear()
+            self._sent.clear()
+
+
+# Create a global instance for use throughout the application
+typing_indicators = TypingIndicators()
@@ -0,0 +1,158 @@
+"""
+Wire Format Module
+Optional compact encoding for high-volume chat Socket.IO events, negotiated
+per connection when the client joins (join_chat with "wire": "compact")
+
+Compact events use short keys, epoch-millisecond timestamps and small
+per-connection sender references instead of repeating the sender's
+session UUID and username on every event:
+
+    new_message       {"i": id, "u": ref, "c": content, "t": ms, "f": 1 (only when flagged),
+                       "s": 1 (only for the client's own messages), "k": client_message_id (own
+                       messages sent with one), "d": [[ref, username], ...]}
+    previous_messages {"m": [<new_message>, ...], "d": [...]}  (also missed_messages)
+    typing_users      {"g": group_id, "y": [ref, ...], "d": [...]}
+
+"d" carries definitions for references the client has not seen yet; when
+the table is reset (before a payload that would take it past max_refs
+senders, never within one) references are re-sent.
+"""
+
+import threading
+from datetime import datetime
+
+COMPACT = 'compact'
+VERBOSE = 'verbose'
+WIRE_FORMATS = (VERBOSE, COMPACT)
+
+
+class _Connection:
+    __slots__ = ('user_session_id', 'refs')
+
+    def __init__(self, user_session_id):
+        self.user_session_id = user_session_id
+        self.refs = {}  # (user_session_id, username) -> ref
+
+
+def _epoch_ms(timestamp):
+    if not timestamp:
+        return None
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    # Timestamps are stored as naive UTC
+    return int((timestamp - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+class WireFormats:
+    def __init__(self, max_refs=256):
+        self._connections = {}  # sid -> _Connection, compact clients only
+        self._lock = threading.Lock()
+        self.max_refs = max_refs
+
+    def negotiate(self, sid, requested, user_session_id):
+        """Record the format a connection asked for and return the one it gets"""
+        with self._lock:
+            if requested == COMPACT:
+                connection = self._connections.get(sid)
+                if connection is None or connection.user_session_id != user_session_id:
+                    self._connections[sid] = _Connection(user_session_id)
+                return COMPACT
+            self._connections.pop(sid, None)
+            return VERBOSE
+
+    def forget(self, sid):
+        with self._lock:
+            self._connections.pop(sid, None)
+
+    def is_compact(self, sid):
+        return sid in self._connections
+
+    def compact_sids(self, sids):
+        """The subset of `sids` using the compact format"""
+        connections = self._connections
+        return [sid for sid in sids if sid in connections]
+
+    def _make_room(self, connection, senders):
+        """
+        Reset the reference table if a payload's new senders would take it
+        past max_refs. A payload never reuses a reference it defines; one
+        with more senders than max_refs grows the table until the next.
+        """
+        refs = connection.refs
+        new = len(set(senders) - refs.keys())
+        if new and len(refs) + new > self.max_refs:
+            refs.clear()
+
+    def _ref(self, connection, user_session_id, username, definitions):
+        key = (user_session_id, username)
+        ref = connection.refs.get(key)
+        if ref is None:
+            ref = connection.refs[key] = len(connection.refs) + 1
+            definitions.append([ref, username])
+        return ref
+
+    def _message(self, connection, message, definitions):
+        sender = message['user_session_id']
+        compact = {
+            'i': message['id'],
+            'u': self._ref(connection, sender, message['username'], definitions),
+            'c': message['content'],
+            't': _epoch_ms(message.get('created_at')),
+        }
+        if message.get('flagged'):
+            compact['f'] = 1
+        if sender == connection.user_session_id:
+            compact['s'] = 1
+            if message.get('client_message_id'):
+                compact['k'] = message['client_message_id']
+        return compact
+
+    def encode_message(self, sid, message):
+        """A verbose new_message payload in the compact format for `sid`"""
+        with self._lock:
+            connection = self._connections.get(sid)
+            if connection is None:
+                return message
+            self._make_room(connection, [(message['user_session_id'], message['username'])])
+            definitions = []
+            compact = self._message(connection, message, definitions)
+        if definitions:
+            compact['d'] = definitions
+        return compact
+
+    def encode_messages(self, sid, messages):
+        """A previous_messages payload for `sid`"""
+        with self._lock:
+            connection = self._connections.get(sid)
+            if connection is None:
+                return {'messages': messages}
+            self._make_room(connection, [(message['user_session_id'], message['username'])
+                                         for message in messages])
+            definitions = []
+            compact = [self._message(connection, message, definitions) for message in messages]
+        payload = {'m': compact}
+        if definitions:
+            payload['d'] = definitions
+        return payload
+
+    def encode_typing(self, sid, typing):
+        """A typing_users payload for `sid`"""
+        with self._lock:
+            connection = self._connections.get(sid)
+            if connection is None:
+                return typing
+            self._make_room(connection, [(user['user_session_id'], user['username'])
+                                         for user in typing['typing']])
+            definitions = []
+            compact = {
+                'g': typing['group_id'],
+                'y': [self._ref(connection, user['user_session_id'], user['username'], definitions)
+                      for user in typing['typing']],
+            }
+        if definitions:
+            compact['d'] = definitions
+        return compact
+
+
+# Create a global instance for use throughout the application
+wire_formats = WireFormats()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Script to archive old chat and therapy messages (run it daily, e.g. from cron)
+
+Usage:
+    python archive_messages.py [--days 30] [--archive-dir DIR] [--batch-size 1000]
+                               [--tables messages,therapy_messages]
+
+Messages of inactive chat groups and finished therapy sessions older than
+--days (MESSAGE_RETENTION_DAYS) are written to <table>-<timestamp>.ndjson.gz
+files in --archive-dir (MESSAGE_ARCHIVE_DIR) and deleted. On PostgreSQL the
+job also creates the next months' `messages` partitions and drops old
+partitions that are left empty.
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from flask import Flask
+
+from app.config import Config
+from app.models import db
+from app.services.message_archive_service import ARCHIVE_SOURCES, MessageArchiveService, month_start
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Archive and delete old messages of inactive chats')
+    parser.add_argument('--days', type=int, default=Config.MESSAGE_RETENTION_DAYS,
+                        help='Archive messages older than this many days')
+    parser.add_argument('--archive-dir', default=Config.MESSAGE_ARCHIVE_DIR)
+    parser.add_argument('--batch-size', type=int, default=Config.MESSAGE_ARCHIVE_BATCH_SIZE,
+                        help='Rows archived and deleted per transaction')
+    parser.add_argument('--tables', default=','.join(ARCHIVE_SOURCES),
+                        help='Comma-separated tables to archive')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    with app.app_context():
+        created = MessageArchiveService.ensure_partitions(app.config['MESSAGE_PARTITIONS_AHEAD'])
+        if created:
+            print(f"Created partitions: {', '.join(created)}")
+
+        for table in filter(None, (name.strip() for name in args.tables.split(','))):
+            result = MessageArchiveService.archive(table, args.days, args.archive_dir, args.batch_size)
+            if result['archived']:
+                print(f"Archived {result['archived']} rows from {table} to {result['path']}")
+            else:
+                print(f"Nothing to archive in {table}")
+
+        # Months entirely before the cutoff only hold messages of active chats once archived
+        cutoff = datetime.utcnow() - timedelta(days=args.days)
+        dropped = MessageArchiveService.drop_empty_partitions(month_start(cutoff.date()))
+        if dropped:
+            print(f"Dropped empty partitions: {', '.join(dropped)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Socket.IO Connection Capacity Load Test
+=======================================
+
+Opens many concurrent Socket.IO clients against a running server, has each
+one join the anonymous chat, holds the connections open and reports how
+many were established, connect/join latency percentiles and failures.
+
+Start the server in production mode first, e.g.:
+    python wsgi.py --mode eventlet --port 3000
+
+Then run:
+    python benchmarks/connection_capacity.py --url http://localhost:3000 --clients 2000
+
+Requires: python-socketio[asyncio_client] (aiohttp)
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+try:
+    import socketio
+except ImportError:
+    sys.exit("python-socketio is required: pip install 'python-socketio[asyncio_client]'")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_client(url, hold_seconds, results, semaphore):
+    client = socketio.AsyncClient(reconnection=False)
+    joined = asyncio.Event()
+
+    @client.on('joined_group')
+    async def on_joined(data):
+        joined.set()
+
+    @client.on('waiting_for_group')
+    async def on_waiting(data):
+        joined.set()
+
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            await client.connect(url, transports=['websocket'], wait_timeout=30)
+        except Exception as e:
+            results['connect_errors'].append(str(e))
+            return
+        results['connect_latency'].append(time.perf_counter() - started)
+
+    join_started = time.perf_counter()
+    await client.emit('join_chat', {'user_session_id': str(uuid.uuid4())})
+    try:
+        await asyncio.wait_for(joined.wait(), timeout=30)
+        results['join_latency'].append(time.perf_counter() - join_started)
+    except asyncio.TimeoutError:
+        results['join_timeouts'] += 1
+
+    results['connected'] += 1
+    results['peak'] = max(results['peak'], results['connected'])
+    await asyncio.sleep(hold_seconds)
+    results['connected'] -= 1
+    await client.disconnect()
+
+
+async def main_async(args):
+    results = {
+        'connected': 0,
+        'peak': 0,
+        'connect_latency': [],
+        'join_latency': [],
+        'connect_errors': [],
+        'join_timeouts': 0,
+    }
+    # Limits how many handshakes are in flight at once (ramp-up rate)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(args.url, args.hold, results, semaphore) for _ in range(args.clients)
+    ))
+    return results, time.perf_counter() - started
+
+
+def report(results, elapsed, clients):
+    print(f"Clients requested:      {clients}")
+    print(f"Peak concurrent:        {results['peak']}")
+    print(f"Connect errors:         {len(results['connect_errors'])}")
+    print(f"Join timeouts:          {results['join_timeouts']}")
+    print(f"Total time:             {elapsed:.2f}s")
+    for name in ('connect_latency', 'join_latency'):
+        values = results[name]
+        if not values:
+            continue
+        print(f"{name:<23} p50={percentile(values, 50) * 1000:.1f}ms "
+              f"p95={percentile(values, 95) * 1000:.1f}ms "
+              f"p99={percentile(values, 99) * 1000:.1f}ms "
+              f"mean={statistics.mean(values) * 1000:.1f}ms")
+    if results['connect_errors']:
+        print(f"First error: {results['connect_errors'][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO connection capacity load test')
+    parser.add_argument('--url', default='http://localhost:3000')
+    parser.add_argument('--clients', type=int, default=1000, help='Total clients to open')
+    parser.add_argument('--concurrency', type=int, default=100, help='Handshakes in flight at once')
+    parser.add_argument('--hold', type=float, default=30.0, help='Seconds each client stays connected')
+    args = parser.parse_args()
+
+    results, elapsed = asyncio.run(main_async(args))
+    report(results, elapsed, args.clients)
+    return 0 if not results['connect_errors'] and not results['join_timeouts'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
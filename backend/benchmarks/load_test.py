@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+End-to-end Load Test
+====================
+
+Starts the app (or targets a running server) and drives a realistic mix of
+workloads at the same time:
+
+- chat:     anonymous Socket.IO clients join the chat, send messages (timed
+            until the server echoes them back to the room) and leave
+- therapy:  dashboard pollers hitting GET /api/therapy/user/<id>
+- calendar: users loading GET /api/calendar/view/<user>/<year>/<month>
+            with a year of diary history
+
+Reports p50/p95/p99 latency and throughput per operation, can save the
+results as a JSON baseline and compare a run against a saved baseline so
+regressions in ChatService, ContentModerationService and CalendarService
+show up between commits.
+
+Usage:
+    python benchmarks/load_test.py --save benchmarks/results/baseline.json
+    python benchmarks/load_test.py --compare benchmarks/results/baseline.json
+    python benchmarks/load_test.py --database-url postgresql://localhost/claario_bench
+    python benchmarks/load_test.py --url http://localhost:3000   # already running and seeded
+
+Requires: python-socketio[asyncio_client] (aiohttp), eventlet for the
+default server mode
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict, deque
+from datetime import date, datetime, timezone
+
+try:
+    import aiohttp
+    import socketio
+except ImportError:
+    sys.exit("python-socketio and aiohttp are required: pip install 'python-socketio[asyncio_client]'")
+
+from connection_capacity import percentile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCENARIOS = ('chat', 'therapy', 'calendar')
+
+# Runs inside the server process: seeds the database, then serves via wsgi.py
+SERVER_SCRIPT = r'''
+import sys
+mode, port, calendar_users, therapy_users = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+sys.argv = ['wsgi.py', '--mode', mode, '--host', '127.0.0.1', '--port', port]
+import wsgi
+from datetime import date, timedelta
+from app.models import db
+from app.services.diary_service import DiaryService
+from app.services.quote_import_service import QuoteImportService
+from app.services.therapy_service import therapy_service
+from app.services.user_service import UserService
+from seed_quotes import MENTAL_HEALTH_QUOTES
+
+with wsgi.app.app_context():
+    db.create_all()
+    QuoteImportService.import_records(MENTAL_HEALTH_QUOTES)
+    today = date.today()
+    for index in range(calendar_users):
+        user = UserService.get_or_create_user_by_supabase_id(f'bench-{index}@example.com')
+        if not DiaryService.get_completed_dates(user.id):
+            for offset in range(365):
+                if offset % 7 != 3:
+                    DiaryService.create_diary_entry(user.id, today - timedelta(days=offset),
+                                                    'Benchmark entry', 'Feeling steady today', 'happy')
+    for index in range(therapy_users):
+        if not therapy_service.get_user_sessions(f'bench-therapy-{index}'):
+            therapy_service.create_therapy_request(f'bench-therapy-{index}', f'bench-therapy-{index}@example.com')
+    db.session.remove()
+
+wsgi.main()
+'''
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+
+    def record(self, operation, seconds):
+        self.latencies[operation].append(seconds)
+
+    def error(self, operation, reason):
+        self.errors[operation][reason] += 1
+
+    def summary(self, elapsed):
+        operations = {}
+        for operation in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(operation, [])
+            operations[operation] = {
+                'count': len(values),
+                'errors': sum(self.errors[operation].values()),
+                'error_reasons': dict(self.errors[operation]),
+                'throughput_per_sec': round(len(values) / elapsed, 2) if elapsed else 0.0,
+                'p50_ms': _ms(percentile(values, 50)),
+                'p95_ms': _ms(percentile(values, 95)),
+                'p99_ms': _ms(percentile(values, 99)),
+                'mean_ms': _ms(statistics.mean(values) if values else None),
+                'max_ms': _ms(max(values) if values else None),
+            }
+        return operations
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+async def timed_get(session, recorder, operation, url):
+    started = time.perf_counter()
+    try:
+        async with session.get(url) as response:
+            await response.read()
+            if response.status != 200:
+                recorder.error(operation, f'HTTP {response.status}')
+                return
+    except aiohttp.ClientError as e:
+        recorder.error(operation, type(e).__name__)
+        return
+    recorder.record(operation, time.perf_counter() - started)
+
+
+async def chat_client(url, index, messages, think, recorder, semaphore):
+    client = socketio.AsyncClient(reconnection=False)
+    user_session_id = f'bench-chat-{index}-{int(time.time())}'
+    joined = asyncio.Event()
+    waiting = asyncio.Event()
+    # Send times of this client's messages awaiting their echo, oldest first
+    pending = deque()
+    echoed = asyncio.Queue()
+
+    @client.on('joined_group')
+    async def on_joined(data):
+        joined.set()
+
+    @client.on('waiting_for_group')
+    async def on_waiting(data):
+        waiting.set()
+
+    @client.on('new_message')
+    async def on_new_message(data):
+        if data.get('user_session_id') == user_session_id and pending:
+            recorder.record('chat_message', time.perf_counter() - pending.popleft())
+            echoed.put_nowait(True)
+
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            await client.connect(url, transports=['websocket'], wait_timeout=30)
+        except Exception as e:
+            recorder.error('chat_connect', type(e).__name__)
+            return
+        recorder.record('chat_connect', time.perf_counter() - started)
+
+    try:
+        started = time.perf_counter()
+        # Waiting users are not pushed into a group later, so re-join until placed
+        for _ in range(40):
+            waiting.clear()
+            await client.emit('join_chat', {'user_session_id': user_session_id})
+            done, not_done = await asyncio.wait(
+                [asyncio.ensure_future(joined.wait()), asyncio.ensure_future(waiting.wait())],
+                timeout=10, return_when=asyncio.FIRST_COMPLETED)
+            for task in not_done:
+                task.cancel()
+            if joined.is_set() or not done:
+                break
+            await asyncio.sleep(0.25)
+        if not joined.is_set():
+            recorder.error('chat_join', 'not placed in a group')
+            return
+        recorder.record('chat_join', time.perf_counter() - started)
+
+        for number in range(messages):
+            pending.append(time.perf_counter())
+            await client.emit('send_message', {
+                'user_session_id': user_session_id,
+                'content': f'Benchmark message {number} from client {index}'
+            })
+            try:
+                await asyncio.wait_for(echoed.get(), timeout=10)
+            except asyncio.TimeoutError:
+                pending.clear()
+                recorder.error('chat_message', 'timeout')
+            await asyncio.sleep(think)
+
+        await client.emit('leave_chat', {'user_session_id': user_session_id})
+    finally:
+        await client.disconnect()
+
+
+async def poller(session, base_url, recorder, operation, path, interval, deadline):
+    while time.perf_counter() < deadline:
+        await timed_get(session, recorder, operation, base_url + path)
+        await asyncio.sleep(interval)
+
+
+async def run_workloads(args, recorder):
+    scenarios = set(args.scenarios)
+    today = date.today()
+    deadline = time.perf_counter() + args.duration
+    tasks = []
+
+    async with aiohttp.ClientSession() as session:
+        if 'chat' in scenarios:
+            semaphore = asyncio.Semaphore(args.concurrency)
+            tasks.extend(
+                chat_client(args.url, index, args.messages, args.think, recorder, semaphore)
+                for index in range(args.chat_clients)
+            )
+        if 'therapy' in scenarios:
+            tasks.extend(
+                poller(session, args.url, recorder, 'therapy_poll', f'/api/therapy/user/bench-therapy-{index}',
+                       args.poll_interval, deadline)
+                for index in range(args.therapy_pollers)
+            )
+        if 'calendar' in scenarios:
+            tasks.extend(
+                poller(session, args.url, recorder, 'calendar_view',
+                       f'/api/calendar/view/bench-{index}@example.com/{today.year}/{today.month}',
+                       args.poll_interval, deadline)
+                for index in range(args.calendar_users)
+            )
+
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args):
+    port = free_port()
+    env = dict(os.environ)
+    env['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    # Every simulated client shares one IP and sends faster than the chat limits
+    env.setdefault('RATE_LIMIT_ENABLED', 'false')
+    process = subprocess.Popen(
+        [sys.executable, '-c', SERVER_SCRIPT, args.mode, str(port),
+         str(args.calendar_users), str(args.therapy_pollers)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    url = f'http://127.0.0.1:{port}'
+    return process, url
+
+
+async def wait_until_ready(url, process, timeout=120):
+    deadline = time.perf_counter() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.perf_counter() < deadline:
+            if process is not None and process.poll() is not None:
+                sys.exit(f"Server exited during startup:\n{process.stderr.read()}")
+            try:
+                async with session.get(url + '/health') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    sys.exit(f"Server at {url} did not become ready within {timeout}s")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results):
+    meta = results['meta']
+    print(f"Commit {meta['commit']} | {meta['database']} | mode {meta['mode']} | {meta['elapsed_seconds']}s")
+    print(f"{'operation':<16}{'count':>8}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for operation, stats in results['operations'].items():
+        print(f"{operation:<16}{stats['count']:>8}{stats['errors']:>8}{stats['throughput_per_sec']:>10}"
+              f"{_fmt(stats['p50_ms'])}{_fmt(stats['p95_ms'])}{_fmt(stats['p99_ms'])}")
+
+
+def _fmt(value):
+    return f"{'-' if value is None else value:>10}"
+
+
+def compare(results, baseline, tolerance):
+    """Print changes against a baseline; returns the list of regressions"""
+    regressions = []
+    print(f"\nCompared with baseline from commit {baseline['meta'].get('commit')}:")
+    if baseline['meta'].get('settings') != results['meta']['settings']:
+        print("  Warning: baseline was recorded with different settings; throughput is not comparable")
+    for operation, stats in results['operations'].items():
+        before = baseline['operations'].get(operation)
+        if not before:
+            continue
+        changes = []
+        for key, higher_is_worse in (('p50_ms', True), ('p95_ms', True), ('p99_ms', True),
+                                     ('throughput_per_sec', False)):
+            old, new = before.get(key), stats.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            changes.append(f"{key} {old} -> {new} ({change:+.1f}%)")
+            worse = change if higher_is_worse else -change
+            # p50 is too noisy to fail on; p95/p99 and throughput gate the run
+            if key != 'p50_ms' and worse > tolerance:
+                regressions.append(f"{operation} {key} {change:+.1f}%")
+        print(f"  {operation:<16}" + ', '.join(changes))
+    if regressions:
+        print(f"\nRegressions beyond {tolerance}%: " + '; '.join(regressions))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end REST and Socket.IO load test')
+    parser.add_argument('--url', help='Target a running, already seeded server instead of starting one')
+    parser.add_argument('--database-url', help='Database for the started server (default: temporary SQLite file)')
+    parser.add_argument('--mode', choices=('eventlet', 'gevent', 'threading'), default='eventlet',
+                        help='Async mode of the started server')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds the pollers run')
+    parser.add_argument('--chat-clients', type=int, default=50)
+    parser.add_argument('--messages', type=int, default=20, help='Messages sent by each chat client')
+    parser.add_argument('--think', type=float, default=0.2, help='Seconds between chat messages')
+    parser.add_argument('--concurrency', type=int, default=50, help='Chat handshakes in flight at once')
+    parser.add_argument('--therapy-pollers', type=int, default=20)
+    parser.add_argument('--calendar-users', type=int, default=10)
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='Seconds between polls per client')
+    parser.add_argument('--save', help='Write the results as JSON to this path')
+    parser.add_argument('--compare', help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=25.0,
+                        help='Percent p95/p99/throughput regression that fails the run')
+    args = parser.parse_args()
+
+    process = None
+    if not args.url:
+        process, args.url = start_server(args)
+    try:
+        asyncio.run(wait_until_ready(args.url, process))
+        recorder = Recorder()
+        elapsed = asyncio.run(run_workloads(args, recorder))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    database = args.database_url or ('external' if process is None else 'sqlite')
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'database': database.split(':', 1)[0],
+            'mode': args.mode if process is not None else 'external',
+            'elapsed_seconds': round(elapsed, 2),
+            'settings': {key: value for key, value in vars(args).items()
+                         if key not in ('url', 'database_url', 'save', 'compare')},
+        },
+        'operations': recorder.summary(elapsed),
+    }
+    report(results)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+List Endpoint Serialization Benchmark
+=====================================
+
+Measures rows/sec for the large list endpoints (flagged users, therapy
+messages, chat messages), comparing the old path (load ORM instances,
+to_dict() per row, stdlib JSON) with the column-tuple serializers and the
+orjson provider, plus the full request through the Flask test client.
+
+Usage:
+    python benchmarks/serialization_throughput.py [--rows 2000] [--runs 7]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app.factory import create_app  # noqa: E402
+from app.models import db  # noqa: E402
+from app.models.chat import ChatGroup, Message, TherapyMessage, TherapySession, UserFlag  # noqa: E402
+from app.serialization import MESSAGE_ROWS, THERAPY_MESSAGE_ROWS, USER_FLAG_ROWS  # noqa: E402
+
+
+def seed(rows):
+    now = datetime.utcnow()
+    group = ChatGroup()
+    session = TherapySession(user_session_id='bench-user', user_email='bench@example.com')
+    db.session.add_all([group, session])
+    db.session.commit()
+    for index in range(rows):
+        created_at = now - timedelta(seconds=rows - index)
+        db.session.add(Message(group_id=group.id, user_session_id=f'user-{index % 5}', username='CalmOtter12',
+                               content=f'Chat message number {index} with some text', created_at=created_at))
+        db.session.add(TherapyMessage(session_id=session.id, sender_id='bench-user', sender_type='user',
+                                      content=f'Therapy message number {index} with some text',
+                                      created_at=created_at))
+        db.session.add(UserFlag(user_session_id=f'flagged-{index}', flag_count=index % 3 + 1,
+                                last_flagged_at=created_at, ban_reason='Inappropriate content'))
+    db.session.commit()
+    return group.id, session.id
+
+
+def median_time(runs, func):
+    timings = []
+    for _ in range(runs):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rows/sec for the large list endpoints')
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=7)
+    args = parser.parse_args()
+
+    app = create_app(features='chat,therapy')
+    stdlib_json = DefaultJSONProvider(app)
+    with app.app_context():
+        db.create_all()
+        group_id, session_id = seed(args.rows)
+        client = app.test_client()
+
+        cases = [
+            ('flagged users', UserFlag.query.filter(UserFlag.flag_count > 0),
+             USER_FLAG_ROWS, USER_FLAG_ROWS.query().filter(UserFlag.flag_count > 0),
+             '/api/chat/admin/flagged-users'),
+            ('therapy messages', TherapyMessage.query.filter_by(session_id=session_id),
+             THERAPY_MESSAGE_ROWS, THERAPY_MESSAGE_ROWS.query().filter(TherapyMessage.session_id == session_id),
+             f'/api/therapy/messages/{session_id}'),
+            ('chat messages', Message.query.filter_by(group_id=group_id),
+             MESSAGE_ROWS, MESSAGE_ROWS.query().filter(Message.group_id == group_id),
+             f'/api/chat/messages/{group_id}?limit={args.rows}'),
+        ]
+
+        print(f"{args.rows} rows, median of {args.runs} runs (rows/sec)")
+        print(f"{'endpoint':<18}{'to_dict+stdlib':>16}{'tuples+' + app.json.__class__.__name__:>30}{'speedup':>9}"
+              f"{'HTTP endpoint':>15}")
+        for name, orm_query, serializer, tuple_query, url in cases:
+            legacy = median_time(args.runs, lambda: stdlib_json.response(
+                {'success': True, 'rows': [row.to_dict() for row in orm_query.all()]}))
+            fast = median_time(args.runs, lambda: app.json.response(
+                {'success': True, 'rows': serializer.serialize(tuple_query.all())}))
+            endpoint = median_time(args.runs, lambda: client.get(url))
+            print(f"{name:<18}{args.rows / legacy:>16,.0f}{args.rows / fast:>30,.0f}{legacy / fast:>8.1f}x"
+                  f"{args.rows / endpoint:>15,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Worker Startup Benchmark
+========================
+
+Measures how long a fresh process takes to import the application and
+build it with create_app(), and its peak memory, for different feature
+sets. Each measurement runs in a new interpreter so import caches don't
+leak between runs.
+
+Usage:
+    python benchmarks/startup_time.py [--runs 5] [--features chat therapy diary,quotes all]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Runs inside the child interpreter; prints one JSON line
+CHILD_SCRIPT = r'''
+import json, resource, sys, time
+started = time.perf_counter()
+from app.factory import create_app
+imported = time.perf_counter()
+app = create_app(features=sys.argv[1])
+built = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "total_ms": (built - started) * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+}))
+'''
+
+ALL_FEATURES = 'chat,therapy,diary,quotes'
+
+
+def measure(features, runs):
+    env = dict(os.environ)
+    # An in-memory SQLite database keeps the measurement about Python startup, not the network
+    env.setdefault('DATABASE_URL', 'sqlite://')
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, features],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'features': features,
+        'total_ms': statistics.median(sample['total_ms'] for sample in samples),
+        'import_ms': statistics.median(sample['import_ms'] for sample in samples),
+        'max_rss_mb': statistics.median(sample['max_rss_mb'] for sample in samples),
+        'modules': samples[-1]['modules'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure worker startup time per feature set')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--features', nargs='+', default=['all', 'chat', 'therapy', 'diary,quotes', 'quotes'])
+    args = parser.parse_args()
+
+    print(f"{'features':<28}{'total ms':>10}{'import ms':>11}{'rss MB':>9}{'modules':>9}")
+    for features in args.features:
+        result = measure(ALL_FEATURES if features == 'all' else features, args.runs)
+        print(f"{features:<28}{result['total_ms']:>10.1f}{result['import_ms']:>11.1f}"
+              f"{result['max_rss_mb']:>9.1f}{result['modules']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Query Plan Check
+================
+
+Seeds a large dataset, runs each hot service query, EXPLAINs the SQL it
+actually issued and fails if any of them reads its table with a
+sequential scan. Works on PostgreSQL (EXPLAIN) and SQLite (EXPLAIN QUERY
+PLAN). The seed data is rolled back when the check finishes.
+
+Usage:
+    python migrations/check_query_plans.py [--database-url URL] [--scale 1.0] [--create-schema]
+
+Run it against a scratch database with --create-schema to check the model
+indexes, or against a migrated copy of production (after
+`python migrations/migrate.py up`) to check the migrations.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Fail if a hot query plans a sequential scan')
+    parser.add_argument('--database-url', help='Database to check (defaults to DATABASE_URL)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for the seeded row counts')
+    parser.add_argument('--create-schema', action='store_true', help='Create missing tables and model indexes first')
+    return parser.parse_args()
+
+
+# Configuration is read at import time, so set the database first
+ARGS = parse_args() if __name__ == '__main__' else None
+if ARGS and ARGS.database_url:
+    os.environ['DATABASE_URL'] = ARGS.database_url
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event, insert, text  # noqa: E402
+
+from app.config import Config  # noqa: E402
+from app.models import db  # noqa: E402
+from app.models.chat import ChatGroup, Message, TherapyMessage, TherapySession, UserFlag  # noqa: E402
+from app.models.diary import Diary  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.chat_service import chat_service  # noqa: E402
+from app.services.diary_service import DiaryService  # noqa: E402
+from app.services.therapy_service import TherapyService  # noqa: E402
+
+# Row counts at --scale 1.0
+GROUPS = 2000
+MESSAGES = 200000
+SESSIONS = 50000
+THERAPY_MESSAGES = 200000
+FLAGGED_USERS = 20000
+USERS = 1000
+DIARY_DAYS = 100
+BATCH = 5000
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(insert(model), rows[start:start + BATCH])
+
+
+def seed(scale):
+    """Insert the dataset in the current transaction and return ids to query"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    counts = {name: max(10, int(value * scale)) for name, value in {
+        'groups': GROUPS, 'messages': MESSAGES, 'sessions': SESSIONS,
+        'therapy_messages': THERAPY_MESSAGES, 'flagged': FLAGGED_USERS, 'users': USERS,
+    }.items()}
+
+    _insert(ChatGroup, [
+        {'group_code': f'plan{index:08d}', 'created_at': now, 'max_members': 5, 'is_active': True}
+        for index in range(counts['groups'])
+    ])
+    group_ids = [row[0] for row in db.session.execute(
+        text("SELECT id FROM chat_groups WHERE group_code LIKE 'plan%'"))]
+    _insert(Message, [
+        {'group_id': rng.choice(group_ids), 'user_session_id': f'plan-user-{index % 5000}',
+         'username': 'CalmOtter12', 'content': f'Plan check message {index}', 'flagged': False,
+         'created_at': now - timedelta(seconds=counts['messages'] - index)}
+        for index in range(counts['messages'])
+    ])
+    _insert(UserFlag, [
+        {'user_session_id': f'plan-user-{index}', 'flag_count': 1, 'last_flagged_at': now,
+         'is_banned': index % 10 == 0, 'ban_reason': 'Inappropriate content'}
+        for index in range(counts['flagged'])
+    ])
+
+    # Nearly all sessions are finished; only a handful are waiting for a therapist
+    _insert(TherapySession, [
+        {'user_session_id': f'plan-user-{index % 5000}', 'user_email': f'plan{index}@example.com',
+         'therapist_id': f'plan-therapist-{index % 200}',
+         'status': 'pending' if index % 500 == 0 else 'completed',
+         'created_at': now, 'scheduled_duration': 15}
+        for index in range(counts['sessions'])
+    ])
+    session_ids = [row[0] for row in db.session.execute(
+        text("SELECT id FROM therapy_sessions WHERE user_email LIKE 'plan%'"))]
+    _insert(TherapyMessage, [
+        {'session_id': rng.choice(session_ids), 'sender_id': 'plan-user', 'sender_type': 'user',
+         'content': f'Plan check therapy message {index}',
+         'created_at': now - timedelta(seconds=counts['therapy_messages'] - index)}
+        for index in range(counts['therapy_messages'])
+    ])
+
+    _insert(User, [
+        {'username': f'plan-user-{index}', 'email': f'plan-user-{index}@example.com', 'created_at': now}
+        for index in range(counts['users'])
+    ])
+    user_ids = [row[0] for row in db.session.execute(
+        text("SELECT id FROM users WHERE username LIKE 'plan-user-%'"))]
+    today = date.today()
+    _insert(Diary, [
+        {'user_id': user_id, 'date': today - timedelta(days=day), 'title': 'Plan check',
+         'content': 'Plan check entry', 'mood': None, 'is_completed': day % 3 != 0,
+         'created_at': now, 'updated_at': now}
+        for user_id in user_ids for day in range(DIARY_DAYS)
+    ])
+
+    for table in ('chat_groups', 'messages', 'user_flags', 'therapy_sessions', 'therapy_messages', 'users', 'diary'):
+        db.session.execute(text(f"ANALYZE {table}"))
+
+    return {
+        'group_id': group_ids[len(group_ids) // 2],
+        'session_id': session_ids[len(session_ids) // 2],
+        'user_id': user_ids[len(user_ids) // 2],
+        'today': today,
+    }
+
+
+def hot_queries(ids):
+    """(description, table, call) for each hot service query"""
+    today = ids['today']
+    return [
+        ('recent group messages', 'messages', lambda: chat_service.get_group_messages(ids['group_id'])),
+        ('group messages since id', 'messages',
+         lambda: chat_service.get_messages_since(ids['group_id'], 1)),
+        ('ban check on every message', 'user_flags', lambda: chat_service.is_user_banned('plan-user-7')),
+        ('pending therapy sessions', 'therapy_sessions', TherapyService.get_pending_sessions),
+        ("a user's therapy sessions", 'therapy_sessions', lambda: TherapyService.get_user_sessions('plan-user-7')),
+        ("a therapist's sessions", 'therapy_sessions',
+         lambda: TherapyService.get_therapist_sessions('plan-therapist-7')),
+        ('therapy session messages', 'therapy_messages',
+         lambda: TherapyService.get_session_messages(ids['session_id'])),
+        ('diary entry for a date', 'diary', lambda: DiaryService.get_diary_entry(ids['user_id'], today)),
+        ('diary entries for a month', 'diary',
+         lambda: DiaryService.get_monthly_diary_entries(ids['user_id'], today.year, today.month)),
+        ('completed diary dates', 'diary', lambda: DiaryService.get_completed_dates(ids['user_id'])),
+    ]
+
+
+def capture_selects(call, table):
+    """Run `call` and return the SELECT statements (with parameters) it issued against `table`"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and table in statement:
+            captured.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return captured
+
+
+def _postgres_seq_scans(plan, table):
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        # Monthly partitions of a partitioned table are named <table>_p...
+        relation = node.get('Relation Name') or ''
+        if node.get('Node Type') == 'Seq Scan' and (relation == table or relation.startswith(f'{table}_p')):
+            yield node
+        nodes.extend(node.get('Plans', []))
+
+
+def explain(statement, parameters, table):
+    """
+    Returns:
+        tuple: (plan text, True if `table` is read with a sequential scan)
+    """
+    connection = db.session.connection()
+    if db.engine.dialect.name == 'postgresql':
+        result = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        plan = (json.loads(result) if isinstance(result, str) else result)[0]['Plan']
+        summary = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+        return '\n'.join(row[0] for row in summary), any(_postgres_seq_scans(plan, table))
+
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    details = [row[-1] for row in rows]
+    # SQLite reports "SCAN <table>" for full table scans and
+    # "SEARCH <table> USING INDEX ..." when an index is used
+    seq_scan = False
+    for detail in details:
+        words = detail.split()
+        if words[:1] == ['SCAN'] and 'USING' not in words:
+            scanned = words[2] if words[1:2] == ['TABLE'] else words[1]
+            seq_scan = seq_scan or scanned == table
+    return '\n'.join(details), seq_scan
+
+
+def main():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    with app.app_context():
+        if ARGS.create_schema:
+            db.create_all()
+
+        print(f"Seeding plan-check data on {db.engine.dialect.name} (scale {ARGS.scale})...")
+        failures = 0
+        try:
+            ids = seed(ARGS.scale)
+            for description, table, call in hot_queries(ids):
+                statements = capture_selects(call, table)
+                if not statements:
+                    print(f"SKIP  {description}: no query against {table}")
+                    continue
+                for statement, parameters in statements:
+                    plan, seq_scan = explain(statement, parameters, table)
+                    status = 'FAIL' if seq_scan else 'ok'
+                    print(f"{status:<5} {description}")
+                    if seq_scan:
+                        failures += 1
+                        print('      ' + ' '.join(statement.split()))
+                        print('      ' + plan.replace('\n', '\n      '))
+        finally:
+            db.session.rollback()
+
+        if failures:
+            print(f"{failures} hot queries fall back to a sequential scan")
+            return 1
+        print("All hot queries use an index.")
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
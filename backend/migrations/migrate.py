@@ -24,6 +24,10 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from flask import Flask
 from app.config import Config
 from app.models import db, Migration
+from app.models.quote import Quote
+from app.services.message_archive_service import (
+    DEFAULT_PARTITION, MessageArchiveService, client_message_id_index, month_start, next_month
+)
 from sqlalchemy import text
 
 def create_minimal_app():
@@ -36,6 +40,219 @@ def create_minimal_app():
     
     return app
 
+def add_quote_text_hash():
+    """Add quotes.text_hash, backfill it and make it unique (duplicates keep a NULL hash)"""
+    db.session.execute(text("ALTER TABLE quotes ADD COLUMN IF NOT EXISTS text_hash VARCHAR(40);"))
+    
+    seen = set()
+    rows = db.session.execute(text("SELECT id, text FROM quotes ORDER BY id")).fetchall()
+    for quote_id, quote_text in rows:
+        text_hash = Quote.hash_text(quote_text)
+        if text_hash in seen:
+            continue
+        seen.add(text_hash)
+        db.session.execute(
+            text("UPDATE quotes SET text_hash = :text_hash WHERE id = :id"),
+            {'text_hash': text_hash, 'id': quote_id}
+        )
+    
+    db.session.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_quotes_text_hash ON quotes(text_hash);"))
+
+# Indexes for the hot service queries (also declared on the models);
+# see check_query_plans.py. user_flags.user_session_id and
+# banned_users.user_session_id are already covered by unique constraints,
+# and 009 replaces idx_diary_user_date with a unique index.
+HOT_PATH_INDEXES = [
+    ('idx_messages_group_created', 'messages', 'group_id, created_at'),
+    ('idx_therapy_sessions_status', 'therapy_sessions', 'status'),
+    ('idx_therapy_sessions_user_session', 'therapy_sessions', 'user_session_id'),
+    ('idx_therapy_sessions_therapist', 'therapy_sessions', 'therapist_id'),
+    ('idx_therapy_messages_session_created', 'therapy_messages', 'session_id, created_at'),
+    ('idx_diary_user_date', 'diary', 'user_id, date'),
+]
+
+def create_index_concurrently(name, table, columns, unique=False, where=None):
+    """
+    Build an index without blocking writes to the table. CONCURRENTLY cannot
+    run inside a transaction, so this uses its own autocommit connection.
+    """
+    # Don't keep a transaction open while the build waits for older ones
+    db.session.commit()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        # An interrupted concurrent build leaves an INVALID index behind,
+        # which IF NOT EXISTS would silently accept; drop it and rebuild
+        invalid = connection.execute(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {'name': name}).first()
+        if invalid:
+            print(f"  Dropping invalid index {name} left by an earlier build")
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name};"))
+        unique_sql = "UNIQUE " if unique else ""
+        where_sql = f" WHERE {where}" if where else ""
+        connection.execute(text(
+            f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns}){where_sql};"
+        ))
+        connection.execute(text(f"ANALYZE {table};"))
+
+def drop_index_concurrently(name):
+    db.session.commit()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name};"))
+
+def add_diary_unique_user_date():
+    """
+    Remove duplicate diary entries (keeping the most recently written one
+    per user and day), then make (user_id, date) unique. The unique index
+    replaces idx_diary_user_date.
+    """
+    result = db.session.execute(text("""
+        DELETE FROM diary WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id, date
+                    ORDER BY is_completed DESC, COALESCE(updated_at, created_at) DESC NULLS LAST, id DESC
+                ) AS position
+                FROM diary
+            ) ranked
+            WHERE position > 1
+        );
+    """))
+    print(f"  Removed {result.rowcount} duplicate diary entries")
+    
+    # Entries written between the DELETE and the end of the build would make
+    # it fail (leaving an invalid index that the next run rebuilds), so stop
+    # the old create path or run this during a quiet period
+    create_index_concurrently('uq_diary_user_date', 'diary', 'user_id, date', unique=True)
+    exists = db.session.execute(text(
+        "SELECT 1 FROM pg_constraint WHERE conname = 'uq_diary_user_date'"
+    )).first()
+    if not exists:
+        db.session.execute(text(
+            "ALTER TABLE diary ADD CONSTRAINT uq_diary_user_date UNIQUE USING INDEX uq_diary_user_date;"
+        ))
+        db.session.commit()
+    drop_index_concurrently('idx_diary_user_date')
+
+def message_columns(table):
+    """The columns of a messages table, in order (011 adds client_message_id)"""
+    return [name for name, in db.session.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name = :table AND table_schema = current_schema() ORDER BY ordinal_position"
+    ), {'table': table})]
+
+def partition_messages():
+    """
+    Rebuild messages as a table range partitioned by month on created_at
+    (primary key (id, created_at)) with a default partition for rows
+    outside the created months. Writes to messages are blocked while the
+    rows are copied, so run this during a quiet period.
+    """
+    if MessageArchiveService.is_partitioned():
+        print("  messages is already partitioned")
+        return
+    db.session.execute(text("LOCK TABLE messages IN ACCESS EXCLUSIVE MODE;"))
+    db.session.execute(text("ALTER TABLE messages RENAME TO messages_unpartitioned;"))
+    db.session.execute(text("ALTER INDEX IF EXISTS messages_pkey RENAME TO messages_unpartitioned_pkey;"))
+    db.session.execute(text(
+        "ALTER INDEX IF EXISTS idx_messages_group_created RENAME TO idx_messages_unpartitioned_group_created;"
+    ))
+    db.session.execute(text("""
+        CREATE TABLE messages (
+            LIKE messages_unpartitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id, created_at),
+            FOREIGN KEY (group_id) REFERENCES chat_groups (id)
+        ) PARTITION BY RANGE (created_at);
+    """))
+    db.session.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF messages DEFAULT;"))
+    
+    # One partition per month from the oldest message through the next two months
+    oldest = db.session.execute(text("SELECT min(created_at) FROM messages_unpartitioned")).scalar()
+    this_month = month_start(datetime.utcnow().date())
+    created = MessageArchiveService.create_partitions(
+        month_start(oldest.date()) if oldest else this_month, next_month(next_month(this_month))
+    )
+    print(f"  Created {len(created)} monthly partitions")
+    
+    db.session.execute(text("CREATE INDEX idx_messages_group_created ON messages (group_id, created_at);"))
+    columns = message_columns('messages_unpartitioned')
+    if 'client_message_id' in columns:
+        for partition in [DEFAULT_PARTITION] + created:
+            db.session.execute(text(client_message_id_index(partition)))
+    values = ["COALESCE(created_at, now() AT TIME ZONE 'utc')" if column == 'created_at' else column
+              for column in columns]
+    result = db.session.execute(text(
+        f"INSERT INTO messages ({', '.join(columns)}) "
+        f"SELECT {', '.join(values)} FROM messages_unpartitioned;"
+    ))
+    print(f"  Copied {result.rowcount} messages")
+    db.session.execute(text("ALTER SEQUENCE IF EXISTS messages_id_seq OWNED BY messages.id;"))
+    db.session.execute(text("DROP TABLE messages_unpartitioned;"))
+    db.session.execute(text("ANALYZE messages;"))
+
+def message_partitions():
+    """The partitions of messages, or just messages itself when it is a plain table"""
+    if not MessageArchiveService.is_partitioned():
+        return ['messages']
+    return [name for name, in db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'messages' ORDER BY c.relname"
+    ))]
+
+def add_client_message_ids():
+    """
+    Add client_message_id to chat and therapy messages with partial unique
+    indexes, so retried sends are stored once. A unique index on the
+    partitioned messages table would have to include created_at, so each
+    partition gets its own (new partitions too, see create_partitions).
+    """
+    for table in ('messages', 'therapy_messages'):
+        db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS client_message_id VARCHAR(64);"))
+    db.session.commit()
+    for partition in message_partitions():
+        create_index_concurrently(f'uq_{partition}_client_message_id', partition,
+                                  'user_session_id, client_message_id', unique=True,
+                                  where='client_message_id IS NOT NULL')
+    create_index_concurrently('uq_therapy_messages_client_message_id', 'therapy_messages',
+                              'sender_id, client_message_id', unique=True,
+                              where='client_message_id IS NOT NULL')
+
+def drop_client_message_ids():
+    for table in ('messages', 'therapy_messages'):
+        # Drops the unique indexes with the column
+        db.session.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS client_message_id;"))
+
+def unpartition_messages():
+    """Rebuild messages as a plain table (blocks writes while the rows are copied)"""
+    if not MessageArchiveService.is_partitioned():
+        return
+    db.session.execute(text("LOCK TABLE messages IN ACCESS EXCLUSIVE MODE;"))
+    db.session.execute(text("ALTER TABLE messages RENAME TO messages_partitioned;"))
+    db.session.execute(text("ALTER INDEX IF EXISTS messages_pkey RENAME TO messages_partitioned_pkey;"))
+    db.session.execute(text(
+        "ALTER INDEX IF EXISTS idx_messages_group_created RENAME TO idx_messages_partitioned_group_created;"
+    ))
+    db.session.execute(text("""
+        CREATE TABLE messages (
+            LIKE messages_partitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id),
+            FOREIGN KEY (group_id) REFERENCES chat_groups (id)
+        );
+    """))
+    columns = message_columns('messages_partitioned')
+    db.session.execute(text(
+        f"INSERT INTO messages ({', '.join(columns)}) SELECT {', '.join(columns)} FROM messages_partitioned;"
+    ))
+    db.session.execute(text("CREATE INDEX idx_messages_group_created ON messages (group_id, created_at);"))
+    if 'client_message_id' in columns:
+        db.session.execute(text(
+            "CREATE UNIQUE INDEX uq_messages_client_message_id ON messages (user_session_id, client_message_id) "
+            "WHERE client_message_id IS NOT NULL;"
+        ))
+    db.session.execute(text("ALTER SEQUENCE IF EXISTS messages_id_seq OWNED BY messages.id;"))
+    db.session.execute(text("DROP TABLE messages_partitioned;"))
+    db.session.execute(text("ANALYZE messages;"))
+
 # Migration definitions
 MIGRATIONS = [
     {
@@ -75,6 +292,59 @@ MIGRATIONS = [
       'description': 'Add updated_at column to diary table',
       'upgrade': lambda: db.session.execute(text("ALTER TABLE diary ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;")),
       'downgrade': lambda: db.session.execute(text("ALTER TABLE diary DROP COLUMN IF EXISTS updated_at;"))
+  },
+  {
+      'version': '006_add_quote_text_hash',
+      'description': 'Add unique normalized-text hash to quotes for deduplicated bulk imports',
+      'upgrade': add_quote_text_hash,
+      'downgrade': lambda: [
+          db.session.execute(text("DROP INDEX IF EXISTS uq_quotes_text_hash;")),
+          db.session.execute(text("ALTER TABLE quotes DROP COLUMN IF EXISTS text_hash;"))
+      ]
+  },
+  {
+      'version': '007_add_diary_search_vector',
+      'description': 'Add full-text search vector and GIN index to diary',
+      'upgrade': lambda: [
+          db.session.execute(text("ALTER TABLE diary ADD COLUMN IF NOT EXISTS search_vector tsvector;")),
+          db.session.execute(text(
+              "UPDATE diary SET search_vector = "
+              "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+              "setweight(to_tsvector('english', coalesce(content, '')), 'B');"
+          )),
+          db.session.execute(text("CREATE INDEX IF NOT EXISTS idx_diary_search_vector ON diary USING GIN (search_vector);"))
+      ],
+      'downgrade': lambda: [
+          db.session.execute(text("DROP INDEX IF EXISTS idx_diary_search_vector;")),
+          db.session.execute(text("ALTER TABLE diary DROP COLUMN IF EXISTS search_vector;"))
+      ]
+  },
+  {
+      'version': '008_add_hot_path_indexes',
+      'description': 'Index chat, therapy and diary lookups (built concurrently)',
+      'upgrade': lambda: [create_index_concurrently(*index) for index in HOT_PATH_INDEXES],
+      'downgrade': lambda: [drop_index_concurrently(name) for name, _, _ in HOT_PATH_INDEXES]
+  },
+  {
+      'version': '009_add_diary_unique_user_date',
+      'description': 'Remove duplicate diary entries and make (user_id, date) unique',
+      'upgrade': add_diary_unique_user_date,
+      'downgrade': lambda: [
+          create_index_concurrently('idx_diary_user_date', 'diary', 'user_id, date'),
+          db.session.execute(text("ALTER TABLE diary DROP CONSTRAINT IF EXISTS uq_diary_user_date;"))
+      ]
+  },
+  {
+      'version': '010_partition_messages',
+      'description': 'Partition messages by month on created_at',
+      'upgrade': partition_messages,
+      'downgrade': unpartition_messages
+  },
+  {
+      'version': '011_add_client_message_ids',
+      'description': 'Add client message IDs with unique indexes for idempotent message sends',
+      'upgrade': add_client_message_ids,
+      'downgrade': drop_client_message_ids
   }
 ]
 
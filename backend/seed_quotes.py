@@ -1,5 +1,9 @@
 """
 Script to seed the database with mental health quotes
+
+Usage:
+    python seed_quotes.py                 Seed the built-in quotes
+    python seed_quotes.py <pack.jsonl>    Import a quote pack (JSONL or CSV)
 """
 
 import sys
@@ -10,7 +14,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__)))
 
 from app.flaskServer import create_app
 from app.models import db
-from app.models.quote import Quote
+from app.services.quote_import_service import QuoteImportService
 
 # Mental health quotes to seed the database
 MENTAL_HEALTH_QUOTES = [
@@ -116,28 +120,24 @@ MENTAL_HEALTH_QUOTES = [
     }
 ]
 
-def seed_quotes():
-    """Seed the database with mental health quotes"""
+def print_import_stats(stats):
+    """Print a summary of an import run"""
+    print(f"Read {stats['read']} quotes: {stats['inserted']} inserted, "
+          f"{stats['duplicates']} duplicates skipped, {stats['invalid']} invalid "
+          f"({stats['batches']} batches, {stats['elapsed_seconds']}s, "
+          f"{stats['rows_per_second']} rows/s)")
+
+def seed_quotes(path=None):
+    """Seed the database with mental health quotes, or import a quote pack file"""
     app = create_app()
     
     with app.app_context():
-        # Check if quotes already exist
-        existing_quotes = Quote.query.count()
-        if existing_quotes > 0:
-            print(f"Database already contains {existing_quotes} quotes. Skipping seeding.")
-            return
-        
-        # Add quotes to database
-        for quote_data in MENTAL_HEALTH_QUOTES:
-            quote = Quote(
-                text=quote_data["text"],
-                author=quote_data["author"],
-                category=quote_data["category"]
-            )
-            db.session.add(quote)
-        
-        db.session.commit()
-        print(f"Successfully seeded database with {len(MENTAL_HEALTH_QUOTES)} mental health quotes.")
+        if path:
+            stats = QuoteImportService.import_file(path)
+        else:
+            # Existing quotes are skipped by the unique text hash, so this is safe to re-run
+            stats = QuoteImportService.import_records(MENTAL_HEALTH_QUOTES)
+        print_import_stats(stats)
 
 if __name__ == "__main__":
-    seed_quotes()
\ No newline at end of file
+    seed_quotes(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,133 @@
+import os
+import sys
+
+# Configuration is read at import time, so point it at an in-memory
+# SQLite database before anything from the app package is imported
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.setdefault('FEATURES', 'chat,therapy,diary,quotes')
+os.environ.setdefault('CHAT_SNAPSHOT_ENABLED', 'false')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask
+
+from app import socketio
+from app.config import Config
+from app.factory import create_app
+from app.models import db
+from app.outbound import outbound_queues
+from app.query_counter import query_budget as _query_budget
+from app.services.chat_service import chat_service
+from app.services.quote_pool import quote_pool
+from app.services.therapy_service import recent_therapy_messages
+from app.typing_indicator import typing_indicators
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'file_database: run the app on a file database instead of the shared in-memory one')
+
+
+@pytest.fixture
+def app(request, tmp_path, monkeypatch):
+    if request.node.get_closest_marker('file_database'):
+        # The in-memory database is one connection shared by every thread;
+        # a file gives each thread its own, as a real database server would
+        monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'app.db'}")
+        monkeypatch.setattr(Config, 'SQLALCHEMY_ENGINE_OPTIONS', {'connect_args': {'timeout': 30}})
+    app = create_app(async_mode='threading')
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        quote_pool.invalidate()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    # The chat service keeps groups and sessions in process memory
+    chat_service.waiting_users.clear()
+    chat_service.active_groups.clear()
+    chat_service.user_sessions.clear()
+    chat_service.usernames.clear()
+    chat_service.group_codes.clear()
+    chat_service.restored.clear()
+    chat_service.recent_messages.clear()
+    recent_therapy_messages.clear()
+    typing_indicators.reset()
+    outbound_queues.reset()
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """
+    A bare app on a file database, so concurrent threads write through
+    separate connections (the in-memory database shares one)
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'app.db'}"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def socket_client(app, client):
+    """Factory for Socket.IO test clients sharing the Flask test client"""
+    clients = []
+
+    def connect():
+        socket = socketio.test_client(app, flask_test_client=client)
+        clients.append(socket)
+        return socket
+
+    yield connect
+    for socket in clients:
+        if socket.is_connected():
+            socket.disconnect()
+
+
+def _events(socket, name):
+    return [packet['args'][0] for packet in socket.get_received() if packet['name'] == name]
+
+
+@pytest.fixture
+def events():
+    """The payloads of the named event a Socket.IO test client received since the last call"""
+    return _events
+
+
+@pytest.fixture
+def chat_group(client, socket_client):
+    """
+    Two users chatting in one group, with nothing left to receive:
+    ((first socket, second socket), (first user_session_id, second), first user's resume token)
+    """
+    first, second = (client.post('/api/chat/session').get_json()['user_session_id'] for _ in range(2))
+    sockets = [socket_client(), socket_client()]
+    for socket, user_session_id in zip(sockets, (first, second)):
+        socket.emit('join_chat', {'user_session_id': user_session_id})
+    # The first user was put on the waiting list; joining again enters the group's room
+    sockets[0].emit('join_chat', {'user_session_id': first})
+    token = _events(sockets[0], 'joined_group')[-1]['resume_token']
+    sockets[1].get_received()
+    return sockets, (first, second), token
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Assert a maximum number of SQL statements for a block:
+
+        with query_budget(4):
+            client.get(...)
+    """
+    return _query_budget
@@ -0,0 +1,76 @@
+from app.chat_resume import resume_tokens
+from app.services.chat_service import chat_service
+
+
+def test_reconnect_resumes_with_only_the_missed_messages(socket_client, chat_group, events):
+    (dropped, peer), (first, second), token = chat_group
+    peer.emit('send_message', {'user_session_id': second, 'content': 'before the drop'})
+    before = events(dropped, 'new_message')[-1]['id']
+    dropped.disconnect()
+
+    for content in ('missed one', 'missed two'):
+        peer.emit('send_message', {'user_session_id': second, 'content': content})
+
+    reconnected = socket_client()
+    reconnected.get_received()
+    reconnected.emit('resume_chat', {'resume_token': token, 'last_message_id': before})
+    received = reconnected.get_received()
+    names = [packet['name'] for packet in received]
+    assert names == ['chat_resumed', 'missed_messages']
+    resumed, missed = (packet['args'][0] for packet in received)
+    assert [message['content'] for message in missed['messages']] == ['missed one', 'missed two']
+    assert resumed['username'] and resumed['resume_token'] != token
+    # No matchmaking: nobody is told the user joined again
+    assert events(peer, 'user_joined') == []
+
+    # Back in the room
+    peer.emit('send_message', {'user_session_id': second, 'content': 'welcome back'})
+    assert [message['content'] for message in events(reconnected, 'new_message')] == ['welcome back']
+
+    # The new token starts after the last missed message
+    again = socket_client()
+    again.get_received()
+    again.emit('resume_chat', {'resume_token': resumed['resume_token']})
+    assert [message['content'] for message in events(again, 'missed_messages')[0]['messages']] == ['welcome back']
+
+
+def test_resume_fails_for_bad_tokens_and_users_who_left(chat_group, events, monkeypatch):
+    (socket, _), (first, _), token = chat_group
+
+    socket.emit('resume_chat', {'resume_token': token + 'x'})
+    assert events(socket, 'resume_failed') == [{'reason': 'invalid_token'}]
+
+    monkeypatch.setattr(resume_tokens, 'ttl', -1)
+    socket.emit('resume_chat', {'resume_token': token})
+    assert events(socket, 'resume_failed') == [{'reason': 'invalid_token'}]
+    monkeypatch.undo()
+
+    socket.emit('leave_chat', {'user_session_id': first})
+    socket.get_received()
+    socket.emit('resume_chat', {'resume_token': token})
+    assert events(socket, 'resume_failed') == [{'reason': 'not_in_group'}]
+
+
+def test_tokens_can_be_refreshed_while_connected(chat_group, events):
+    (socket, _), (first, _), token = chat_group
+
+    socket.emit('refresh_resume_token', {'resume_token': token, 'last_message_id': 42})
+    refreshed = events(socket, 'resume_token')[0]['resume_token']
+    assert resume_tokens.verify(refreshed) == (first, resume_tokens.verify(token)[1], 42)
+
+
+def test_waiting_users_are_forgotten_when_they_leave_or_disconnect(client, socket_client, events):
+    leaving, closing = (client.post('/api/chat/session').get_json()['user_session_id'] for _ in range(2))
+    socket = socket_client()
+    socket.emit('join_chat', {'user_session_id': leaving})
+    assert events(socket, 'waiting_for_group')
+    socket.emit('leave_chat', {'user_session_id': leaving})
+    assert events(socket, 'left_chat')
+
+    socket = socket_client()
+    socket.emit('join_chat', {'user_session_id': closing})
+    assert events(socket, 'waiting_for_group')
+    socket.disconnect()
+
+    assert chat_service.waiting_users == []
+    assert chat_service.usernames == {}
@@ -0,0 +1,89 @@
+import time
+
+from app.chat_snapshot import ChatSnapshots, decode_snapshot, encode_snapshot, write_atomic
+from app.models import db
+from app.models.chat import ChatGroup, UserFlag
+from app.services.chat_service import chat_service
+
+
+def _group(is_active=True):
+    group = ChatGroup()
+    group.is_active = is_active
+    db.session.add(group)
+    db.session.commit()
+    return group
+
+
+def test_snapshot_is_written_atomically_and_only_when_changed(app, tmp_path):
+    snapshots = ChatSnapshots()
+    snapshots.path = str(tmp_path / 'chat.snapshot')
+    for user_session_id in ('first', 'second'):
+        chat_service.create_or_join_group(user_session_id)
+
+    assert snapshots.save()
+    assert not snapshots.save()
+    state = snapshots.load()
+    (group_id, group_code, members), = state['groups']
+    assert members == ['first', 'second']
+    assert group_code == chat_service.group_codes[group_id]
+    assert state['usernames'] == chat_service.usernames
+    # No temporary files are left behind
+    assert [path.name for path in tmp_path.iterdir()] == ['chat.snapshot']
+
+
+def test_unreadable_or_stale_snapshots_are_ignored(tmp_path):
+    snapshots = ChatSnapshots(max_age=60)
+    snapshots.path = str(tmp_path / 'chat.snapshot')
+    assert snapshots.load() is None
+
+    write_atomic(snapshots.path, b'garbage')
+    assert snapshots.load() is None
+
+    write_atomic(snapshots.path, encode_snapshot({'groups': []}, taken_at=time.time() - 120))
+    assert snapshots.load() is None
+
+    data = encode_snapshot({'groups': []})
+    write_atomic(snapshots.path, data)
+    assert snapshots.load() == {'groups': []}
+    assert decode_snapshot(data)[0] == {'groups': []}
+
+
+def test_restore_reconciles_with_the_database(app):
+    kept, renamed, inactive, orphan = _group(), _group(), _group(is_active=False), _group()
+    db.session.add(UserFlag(user_session_id='banned', flag_count=3, is_banned=True))
+    db.session.commit()
+
+    result = chat_service.restore({
+        'groups': [
+            [kept.id, kept.group_code, ['alice', 'banned', 'bob']],
+            [renamed.id, 'othercode', ['carol']],
+            [inactive.id, inactive.group_code, ['dave']],
+            [9999, 'missing', ['erin']],
+        ],
+        'waiting': ['frank', 'banned'],
+        'usernames': {'alice': 'BraveFox12', 'frank': 'CoolWolf34'},
+    })
+
+    assert result == {'groups': 1, 'users': 3, 'deactivated': 2}
+    assert chat_service.active_groups == {kept.id: ['alice', 'bob']}
+    assert chat_service.user_sessions == {'alice': kept.id, 'bob': kept.id}
+    assert chat_service.waiting_users == ['frank']
+    assert chat_service.get_username('alice') == 'BraveFox12'
+    active = {group_id for group_id, in db.session.query(ChatGroup.id).filter(ChatGroup.is_active.is_(True))}
+    assert active == {kept.id}
+    assert orphan.id not in active and renamed.id not in active
+
+
+def test_restored_users_who_do_not_rejoin_are_evicted(app):
+    group = _group()
+    chat_service.restore({'groups': [[group.id, group.group_code, ['alice', 'bob']]], 'waiting': ['carol']},
+                         grace=30)
+
+    # alice reconnects and lands back in her group
+    assert chat_service.create_or_join_group('alice')['group']['id'] == group.id
+    assert chat_service.evict_unclaimed() == []
+
+    assert sorted(chat_service.evict_unclaimed(now=time.monotonic() + 60)) == ['bob', 'carol']
+    assert chat_service.active_groups[group.id] == ['alice']
+    assert chat_service.waiting_users == []
+    assert chat_service.restored == {}
@@ -0,0 +1,40 @@
+import gzip
+
+from app.compression import choose_encoding
+from app.models import db
+from app.models.chat import TherapyMessage, TherapySession
+
+
+def _session_with_messages(count):
+    session = TherapySession(user_session_id='user-1', user_email='user@example.com')
+    db.session.add(session)
+    db.session.commit()
+    db.session.add_all(
+        TherapyMessage(session_id=session.id, sender_id='user-1', sender_type='user', content=f'message {index}')
+        for index in range(count)
+    )
+    db.session.commit()
+    return session.id
+
+
+def test_large_json_responses_are_gzipped(client):
+    session_id = _session_with_messages(50)
+    plain = client.get(f'/api/therapy/messages/{session_id}')
+    compressed = client.get(f'/api/therapy/messages/{session_id}', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get('/api/health', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_choose_encoding():
+    assert choose_encoding('') is None
+    assert choose_encoding('identity') is None
+    assert choose_encoding('gzip;q=0, deflate') is None
+    assert choose_encoding('deflate, gzip;q=0.5') == 'gzip'
@@ -0,0 +1,67 @@
+import re
+from datetime import date, timedelta
+from math import gcd
+
+from app.models import db
+from app.models.quote import Quote
+from app.services.daily_quote_service import DailyQuoteService
+from app.services.quote_pool import quote_pool
+
+READER = 'reader@example.com'
+
+
+def _seed_quotes(count=12):
+    for index in range(count):
+        db.session.add(Quote(text=f'Quote number {index}', author='Author', category='hope'))
+    db.session.commit()
+    quote_pool.load()
+
+
+def test_rotation_strides_are_coprime_with_the_pool_size():
+    for pool_size in (1, 2, 12, 97, 360, 1024):
+        for user_key in range(50):
+            offset, stride = DailyQuoteService._user_rotation(user_key, pool_size)
+            assert 0 <= offset < pool_size
+            assert 0 < stride and gcd(stride, pool_size) == 1
+
+
+def test_users_see_every_quote_once_per_cycle(app):
+    _seed_quotes()
+    start = date(2026, 1, 1)
+    for user_key in range(20):
+        cycle = [DailyQuoteService.get_daily_quote(user_key, start + timedelta(days=day)).id for day in range(12)]
+        assert len(set(cycle)) == 12
+        # The next cycle repeats the same order
+        assert DailyQuoteService.get_daily_quote(user_key, start + timedelta(days=12)).id == cycle[0]
+
+    # Users do not all walk the pool in the same order
+    firsts = {DailyQuoteService.get_daily_quote(user_key, start).id for user_key in range(20)}
+    assert len(firsts) > 1
+
+
+def test_daily_quotes_are_stable_across_calls_and_reloads(app):
+    _seed_quotes()
+    day = date(2026, 3, 14)
+    quote = DailyQuoteService.get_daily_quote(7, day)
+    assert DailyQuoteService.get_daily_quote(7, day) is quote
+    quote_pool.load()
+    assert DailyQuoteService.get_daily_quote(7, day).id == quote.id
+
+
+def test_quote_route_sets_cache_headers(client):
+    assert client.get(f'/api/calendar/quote/{READER}').status_code == 404
+    _seed_quotes()
+    assert client.get(f'/api/calendar/quote/{READER}?date=14-03-2026').status_code == 400
+
+    today = client.get(f'/api/calendar/quote/{READER}')
+    assert today.status_code == 200
+    max_age = int(re.fullmatch(r'private, max-age=(\d+)', today.headers['Cache-Control']).group(1))
+    assert 0 <= max_age <= 86400
+
+    past = client.get(f'/api/calendar/quote/{READER}?date=2026-03-14')
+    assert past.headers['Cache-Control'] == 'private, max-age=86400'
+    assert past.headers['ETag'] and past.get_json() == client.get(f'/api/calendar/quote/{READER}?date=2026-03-14').get_json()
+
+    revalidated = client.get(f'/api/calendar/quote/{READER}?date=2026-03-14',
+                             headers={'If-None-Match': past.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.get_data() == b''
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+from app.models import db
+from app.models.diary import Diary
+from app.services.diary_service import DiaryService
+from app.services.user_service import UserService
+
+READER = 'reader@example.com'
+
+
+def _search(client, query, user=READER, **params):
+    return client.get(f'/api/diary/search/{user}', query_string={'q': query, **params})
+
+
+def _entries(user_id, *entries):
+    today = date.today()
+    return [DiaryService.create_diary_entry(user_id, today - timedelta(days=days), title, content).id
+            for days, (title, content) in enumerate(entries)]
+
+
+def test_entries_are_indexed_when_written(client):
+    user = UserService.get_or_create_user_by_supabase_id(READER)
+    entry_id, = _entries(user.id, ('Morning', 'A quiet walk by the river'))
+    assert [result['id'] for result in _search(client, 'river').get_json()['results']] == [entry_id]
+
+    # Rewriting the entry for the same day replaces its index row
+    _entries(user.id, ('Morning', 'Coffee on the balcony'))
+    assert _search(client, 'river').get_json()['total'] == 0
+    assert _search(client, 'balcony').get_json()['total'] == 1
+
+    DiaryService.update_diary_entry(entry_id, user.id, title='Rainy evening')
+    assert _search(client, 'rainy').get_json()['results'][0]['title'] == 'Rainy evening'
+    assert _search(client, 'morning').get_json()['total'] == 0
+
+    db.session.delete(db.session.get(Diary, entry_id))
+    db.session.commit()
+    assert _search(client, 'balcony').get_json() == {
+        'query': 'balcony', 'page': 1, 'per_page': 10, 'total': 0, 'results': []
+    }
+
+
+def test_results_are_ranked_highlighted_and_paged(client):
+    user = UserService.get_or_create_user_by_supabase_id(READER)
+    body_match, title_match, _ = _entries(
+        user.id,
+        ('Monday', 'Talked about the garden with an old friend'),
+        ('Garden day', 'Planted tomatoes'),
+        ('Work', 'Nothing to report'),
+    )
+    other = UserService.get_or_create_user_by_supabase_id('other@example.com')
+    _entries(other.id, ('Garden', 'Not your garden'))
+
+    response = _search(client, 'garden')
+    assert response.status_code == 200
+    data = response.get_json()
+    # Title matches weigh more; other users' entries are never returned
+    assert data['total'] == 2
+    assert [result['id'] for result in data['results']] == [title_match, body_match]
+    assert '<mark>garden</mark>' in data['results'][1]['snippet']
+    # Stemmed: "planting" finds "Planted"
+    assert _search(client, 'planting').get_json()['results'][0]['id'] == title_match
+
+    second_page = _search(client, 'garden', page=2, per_page=1).get_json()
+    assert second_page['total'] == 2 and [result['id'] for result in second_page['results']] == [body_match]
+    assert _search(client, 'garden', page=3, per_page=1).get_json()['results'] == []
+
+
+def test_search_validates_its_parameters(client):
+    UserService.get_or_create_user_by_supabase_id(READER)
+    assert _search(client, ' ').status_code == 400
+    assert _search(client, 'garden', page=0).status_code == 400
+    assert _search(client, 'garden', per_page=0).status_code == 400
+    assert _search(client, 'garden', per_page=500).get_json()['per_page'] == 50
+    # FTS5 syntax in user input is searched for literally
+    for query in ('"unbalanced', 'garden OR', 'NEAR(a b)', 'title:garden', '*'):
+        assert _search(client, query).status_code == 200
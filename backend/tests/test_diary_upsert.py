@@ -0,0 +1,62 @@
+import threading
+from datetime import date
+
+import pytest
+from sqlalchemy import func
+
+from app.models import db
+from app.models.diary import Diary
+from app.models.user import User
+from app.services.diary_service import DiaryService
+
+
+def test_second_submit_updates_the_entry(app):
+    user = User(username='writer', email='writer@example.com')
+    db.session.add(user)
+    db.session.commit()
+    today = date.today()
+
+    first = DiaryService.create_diary_entry(user.id, today, 'Draft', 'First words', 'happy')
+    first_id = first.id
+    second = DiaryService.create_diary_entry(user.id, today, 'Final', 'More words')
+
+    assert second.id == first_id
+    assert (second.title, second.content, second.mood) == ('Final', 'More words', 'happy')
+    assert Diary.query.filter_by(user_id=user.id).count() == 1
+
+
+@pytest.fixture
+def writer(file_app):
+    with file_app.app_context():
+        user = User(username='racer', email='racer@example.com')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def test_concurrent_submits_create_one_entry(file_app, writer):
+    user_id = writer
+    today = date.today()
+    writers = 8
+    barrier = threading.Barrier(writers)
+    entry_ids, errors = [], []
+
+    def submit(index):
+        with file_app.app_context():
+            try:
+                barrier.wait()
+                entry = DiaryService.create_diary_entry(user_id, today, f'Title {index}', 'Content', 'calm')
+                entry_ids.append(entry.id)
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(set(entry_ids)) == 1
+    with file_app.app_context():
+        assert db.session.query(func.count(Diary.id)).filter_by(user_id=user_id, date=today).scalar() == 1
@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('eventlet')
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter: the standard library has to be monkey-patched
+# before anything else is imported, as wsgi.py does
+SCRIPT = r'''
+import eventlet
+eventlet.monkey_patch()
+
+import json
+
+from eventlet.patcher import original
+from sqlalchemy import event
+
+from app.config import Config
+from app.db_pool import TimedQueuePool, pool_metrics
+
+# A pool smaller than the number of concurrent clients, so checkouts wait
+Config.SQLALCHEMY_ENGINE_OPTIONS = {'poolclass': TimedQueuePool, 'pool_size': 2, 'max_overflow': 0,
+                                    'pool_timeout': 5, 'connect_args': {'timeout': 30}}
+
+from app import socketio
+from app.factory import create_app
+from app.models import db
+from app.moderation_pipeline import moderation_pipeline
+
+app = create_app(async_mode='eventlet', features='chat')
+hub = original('_thread').get_ident()
+threads = set()
+with app.app_context():
+    db.create_all()
+    event.listen(db.engine, 'checkout', lambda *args: threads.add(original('_thread').get_ident()))
+
+client = app.test_client()
+users = [client.post('/api/chat/session').get_json()['user_session_id'] for _ in range(4)]
+for user_session_id in users:
+    client.post('/api/chat/group', json={'user_session_id': user_session_id})
+
+def send(index):
+    response = client.post('/api/chat/message', json={
+        'user_session_id': users[index % len(users)], 'content': f'hello {index}'
+    })
+    return response.status_code
+
+statuses = list(eventlet.GreenPool(50).imap(send, range(200)))
+
+# The socket path: moderation in the offload pool, storing and flagging on the hub
+socket = socketio.test_client(app, flask_test_client=client)
+socket.emit('join_chat', {'user_session_id': users[0]})
+socket.emit('send_message', {'user_session_id': users[0], 'content': 'what the hell'})
+moderation_pipeline.wait_idle()
+received = [packet['name'] for packet in socket.get_received()]
+
+print(json.dumps({
+    'statuses': sorted(set(statuses)),
+    'checkouts_off_hub': len(threads - {hub}),
+    'pool': pool_metrics.snapshot(),
+    'received': received,
+}))
+'''
+
+
+def test_database_work_stays_on_the_hub_under_eventlet(tmp_path):
+    env = {**os.environ, 'DATABASE_URL': f"sqlite:///{tmp_path / 'app.db'}", 'FEATURES': 'chat',
+           'CHAT_SNAPSHOT_ENABLED': 'false', 'RATE_LIMIT_ENABLED': 'false'}
+    result = subprocess.run([sys.executable, '-c', SCRIPT], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert report['statuses'] == [200]
+    # Moderation ran in native pool threads, but no connection was checked out there
+    assert report['checkouts_off_hub'] == 0
+    assert report['pool']['timeouts'] == 0 and report['pool']['checkouts'] > 200
+    assert 'new_message' in report['received'] and 'flagged' in report['received']
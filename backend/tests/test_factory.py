@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.factory import create_app, parse_features
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_unknown_features_are_rejected():
+    assert parse_features(' Chat, quotes,,') == {'chat', 'quotes'}
+    with pytest.raises(ValueError, match='Unknown features: video'):
+        parse_features('chat,video')
+    with pytest.raises(ValueError):
+        create_app(async_mode='threading', features=['diary', 'payments'])
+
+
+def test_disabled_features_register_no_blueprints():
+    app = create_app(async_mode='threading', features='quotes')
+    assert {'quote', 'main', 'auth'} <= set(app.blueprints)
+    assert not {'chat', 'therapy', 'diary', 'calendar'} & set(app.blueprints)
+    client = app.test_client()
+    assert client.get('/api/health').get_json()['features'] == ['quotes']
+    assert client.post('/api/chat/session').status_code == 404
+
+
+def test_workers_without_websockets_never_import_socketio():
+    # A fresh interpreter: this one has already imported Socket.IO for other tests
+    script = (
+        "import json, sys\n"
+        "from app.factory import create_app\n"
+        "create_app(features='quotes,diary')\n"
+        "print(json.dumps(sorted(name for name in ('flask_socketio', 'socketio', 'engineio') if name in sys.modules)))\n"
+    )
+    env = {**os.environ, 'DATABASE_URL': 'sqlite://'}
+    result = subprocess.run([sys.executable, '-c', script], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
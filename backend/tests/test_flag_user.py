@@ -0,0 +1,48 @@
+import threading
+
+from app.models import db
+from app.models.chat import BannedUser, UserFlag
+from app.services.chat_service import BAN_AFTER_FLAGS, chat_service
+
+
+def test_flags_count_up_to_a_ban(app):
+    chat_service.user_sessions['user-1'] = 1
+    chat_service.active_groups[1] = ['user-1']
+
+    counts = [chat_service.flag_user('user-1', 'profanity')['flag_count'] for _ in range(BAN_AFTER_FLAGS - 1)]
+    assert counts == list(range(1, BAN_AFTER_FLAGS))
+    assert not chat_service.is_user_banned('user-1')
+
+    banned = chat_service.flag_user('user-1', 'profanity')
+    assert banned['is_banned'] and banned['ban_reason'] == 'profanity'
+    assert chat_service.is_user_banned('user-1')
+    assert 'user-1' not in chat_service.user_sessions
+
+    # Further flags keep counting without a second ban record
+    assert chat_service.flag_user('user-1', 'spam')['flag_count'] == BAN_AFTER_FLAGS + 1
+    assert BannedUser.query.filter_by(user_session_id='user-1').count() == 1
+
+
+def test_concurrent_flags_are_all_counted(file_app):
+    flaggers = 8
+    barrier = threading.Barrier(flaggers)
+    errors = []
+
+    def flag():
+        with file_app.app_context():
+            try:
+                barrier.wait()
+                chat_service.flag_user('user-2')
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+    threads = [threading.Thread(target=flag) for _ in range(flaggers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with file_app.app_context():
+        assert db.session.query(UserFlag.flag_count).filter_by(user_session_id='user-2').scalar() == flaggers
+        assert BannedUser.query.filter_by(user_session_id='user-2').count() == 1
@@ -0,0 +1,62 @@
+from app.config import Config
+from app.factory import create_app
+from app.instrumentation import Histogram
+
+
+def _sample(metrics, name):
+    """The value of one exposition line, or 0 if it is not there yet"""
+    for line in metrics.splitlines():
+        if line.startswith(name + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+def test_metrics_count_requests_and_their_queries(client):
+    count = 'http_request_duration_seconds_count{method="GET",route="/api/quotes/random",status="404"}'
+    queries = 'http_request_db_queries_count{route="/api/quotes/random"}'
+    before = client.get('/metrics').get_data(as_text=True)
+
+    client.get('/api/quotes/random')
+    response = client.get('/metrics')
+
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    metrics = response.get_data(as_text=True)
+    assert _sample(metrics, count) == _sample(before, count) + 1
+    assert _sample(metrics, queries) == _sample(before, queries) + 1
+    # Pool metrics and the collectors registered by other modules
+    assert '# TYPE db_pool_checkout_wait_seconds histogram' in metrics
+    assert 'moderation_timeouts_total' in metrics and 'socketio_outbound_queued_packets' in metrics
+
+
+def test_metrics_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(Config, 'METRICS_ENABLED', False)
+    app = create_app(async_mode='threading', features='quotes')
+    assert app.test_client().get('/metrics').status_code == 404
+
+
+def test_profile_reports_replace_the_response_only_when_enabled(app, client):
+    assert client.get('/api/health?profile=1').get_json()['status'] == 'healthy'
+
+    app.config['PROFILING_ENABLED'] = True
+    response = client.get('/api/health?profile=1')
+    assert response.mimetype == 'text/plain'
+    report = response.get_data(as_text=True)
+    assert report.startswith('GET /api/health?profile=1 -> 200 in ')
+    assert 'SQL queries' in report
+    assert client.get('/api/health').get_json()['status'] == 'healthy'
+
+
+def test_histograms_expose_cumulative_buckets_and_escaped_labels():
+    histogram = Histogram('test_seconds', 'Test latency', ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, '/a"b')
+
+    assert histogram.expose() == [
+        '# HELP test_seconds Test latency',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'test_seconds_bucket{route="/a\\"b",le="1.0"} 2',
+        'test_seconds_bucket{route="/a\\"b",le="+Inf"} 3',
+        'test_seconds_sum{route="/a\\"b"} 5.55',
+        'test_seconds_count{route="/a\\"b"} 3',
+    ]
@@ -0,0 +1,80 @@
+import datetime
+import gzip
+import json
+
+from app.models import db
+from app.models.chat import ChatGroup, Message, TherapyMessage, TherapySession
+from app.services.message_archive_service import MessageArchiveService, next_month
+
+NOW = datetime.datetime(2026, 3, 15, 12, 0)
+OLD = NOW - datetime.timedelta(days=45)
+RECENT = NOW - datetime.timedelta(days=2)
+
+
+def _group(is_active):
+    group = ChatGroup()
+    group.is_active = is_active
+    db.session.add(group)
+    db.session.flush()
+    return group.id
+
+
+def _message(group_id, created_at, content):
+    db.session.add(Message(group_id=group_id, user_session_id='user', username='CalmOtter12',
+                           content=content, created_at=created_at))
+
+
+def _read_archive(path):
+    with gzip.open(path, 'rt') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_old_messages_of_inactive_groups_are_archived_in_batches(app, tmp_path):
+    inactive, active = _group(False), _group(True)
+    for index in range(5):
+        _message(inactive, OLD, f'old {index}')
+    _message(inactive, RECENT, 'recent')
+    _message(active, OLD, 'still chatting')
+    db.session.commit()
+
+    result = MessageArchiveService.archive('messages', 30, str(tmp_path), batch_size=2, now=NOW)
+
+    assert result['archived'] == 5
+    archived = _read_archive(result['path'])
+    assert [row['content'] for row in archived] == [f'old {index}' for index in range(5)]
+    assert archived[0]['group_id'] == inactive
+    assert archived[0]['created_at'] == OLD.isoformat()
+    assert sorted(content for content, in db.session.query(Message.content)) == ['recent', 'still chatting']
+
+    # Nothing left to archive: no file is written
+    assert MessageArchiveService.archive('messages', 30, str(tmp_path), now=NOW) == {
+        'table': 'messages', 'archived': 0, 'path': None
+    }
+
+
+def test_therapy_messages_of_finished_sessions_are_archived(app, tmp_path):
+    sessions = {}
+    for status in ('completed', 'in_progress'):
+        session = TherapySession(user_session_id='user', user_email='user@example.com', status=status)
+        db.session.add(session)
+        db.session.flush()
+        sessions[status] = session.id
+        db.session.add(TherapyMessage(session_id=session.id, sender_id='user', sender_type='user',
+                                      content=status, created_at=OLD))
+    db.session.commit()
+
+    result = MessageArchiveService.archive('therapy_messages', 30, str(tmp_path), now=NOW)
+
+    assert [row['session_id'] for row in _read_archive(result['path'])] == [sessions['completed']]
+    assert [content for content, in db.session.query(TherapyMessage.content)] == ['in_progress']
+
+
+def test_partition_maintenance_is_skipped_without_partitioning(app):
+    assert not MessageArchiveService.is_partitioned()
+    assert MessageArchiveService.ensure_partitions() == []
+    assert MessageArchiveService.drop_empty_partitions(NOW.date()) == []
+
+
+def test_next_month_rolls_over_the_year():
+    assert next_month(datetime.date(2026, 12, 1)) == datetime.date(2027, 1, 1)
+    assert next_month(datetime.date(2026, 1, 1)) == datetime.date(2026, 2, 1)
@@ -0,0 +1,102 @@
+from sqlalchemy import text
+
+from app.models import db
+from app.models.chat import ChatGroup, Message, TherapyMessage, TherapySession, UserFlag
+from app.moderation_pipeline import moderation_pipeline
+from app.serialization import MESSAGE_ROWS
+from app.services.chat_service import chat_service
+from app.services.message_dedup import RecentMessageIds, insert_once
+from app.services.therapy_service import recent_therapy_messages
+
+
+def test_retried_socket_messages_are_stored_and_broadcast_once(chat_group, events):
+    (sender, peer), (user_session_id, _), _ = chat_group
+    data = {'user_session_id': user_session_id, 'content': 'what the hell', 'client_message_id': 'm-1'}
+
+    # Acknowledged once handled, so the client stops resending it
+    assert sender.emit('send_message', data, callback=True) == []
+    assert moderation_pipeline.wait_idle()
+    original = events(sender, 'new_message')
+    assert [message['client_message_id'] for message in original] == ['m-1']
+
+    # Answered from the recent-ID window, then (once evicted) by the unique index
+    sender.emit('send_message', data)
+    chat_service.recent_messages.clear()
+    sender.emit('send_message', data)
+    assert moderation_pipeline.wait_idle()
+
+    assert events(sender, 'new_message') == original * 2
+    assert [message['content'] for message in events(peer, 'new_message')] == ['what the ****']
+    assert Message.query.count() == 1
+    # The user was flagged for the message, not for every retry
+    assert UserFlag.query.filter_by(user_session_id=user_session_id).one().flag_count == 1
+
+
+def test_retried_rest_messages_return_the_original(client, chat_group):
+    _, (user_session_id, _), _ = chat_group
+    data = {'user_session_id': user_session_id, 'content': 'hello', 'client_message_id': 'm-1'}
+
+    first = client.post('/api/chat/message', json=data).get_json()
+    retry = client.post('/api/chat/message', json={**data, 'content': 'hello again'}).get_json()
+    assert not first['duplicate'] and retry['duplicate']
+    assert retry['message'] == first['message']
+    assert client.post('/api/chat/message', json={**data, 'client_message_id': 'x' * 65}).status_code == 400
+
+    # Without an ID nothing is deduplicated
+    for _ in range(2):
+        client.post('/api/chat/message', json={'user_session_id': user_session_id, 'content': 'hello'})
+    assert Message.query.count() == 3
+
+
+def test_retried_therapy_messages_return_the_original(client):
+    session = TherapySession(user_session_id='user-1', user_email='user@example.com', status='in_progress')
+    db.session.add(session)
+    db.session.commit()
+    data = {'session_id': session.id, 'sender_id': 'user-1', 'sender_type': 'user',
+            'content': 'hello', 'client_message_id': 'm-1'}
+
+    created = client.post('/api/therapy/message', json=data)
+    retried = client.post('/api/therapy/message', json=data)
+    recent_therapy_messages.clear()
+    stored = client.post('/api/therapy/message', json=data)
+
+    assert [response.status_code for response in (created, retried, stored)] == [201, 200, 200]
+    assert retried.get_json()['message'] == stored.get_json()['message'] == created.get_json()['message']
+    assert TherapyMessage.query.count() == 1
+
+
+def test_recent_ids_are_bounded_per_sender_and_overall():
+    recent = RecentMessageIds(per_sender=2, max_senders=2)
+    for client_message_id in ('a', 'b', 'c'):
+        recent.remember('alice', client_message_id, {'id': client_message_id})
+    assert [recent.get('alice', client_message_id) for client_message_id in ('a', 'b', 'c')] == [
+        None, {'id': 'b'}, {'id': 'c'}
+    ]
+
+    recent.remember('bob', 'a', {'id': 'a'})
+    recent.remember('carol', 'a', {'id': 'a'})
+    assert recent.get('alice', 'c') is None
+    assert recent.get('carol', 'a') == {'id': 'a'}
+    assert recent.get('carol', None) is None
+
+
+def test_conflicts_with_several_stored_copies_return_the_first(app):
+    group = ChatGroup()
+    db.session.add(group)
+    db.session.commit()
+    # As when a retry landed in another month's partition
+    db.session.execute(text('DROP INDEX uq_messages_client_message_id'))
+    for content in ('original', 'copy'):
+        db.session.add(Message(group_id=group.id, user_session_id='user-1', username='CoolFox12',
+                               content=content, client_message_id='m-1'))
+    db.session.commit()
+    db.session.execute(text(
+        'CREATE UNIQUE INDEX uq_messages_retry ON messages (user_session_id, client_message_id, content)'
+    ))
+
+    message, duplicate = insert_once(MESSAGE_ROWS, Message, {
+        'group_id': group.id, 'user_session_id': 'user-1', 'username': 'CoolFox12',
+        'content': 'copy', 'client_message_id': 'm-1', 'flagged': False
+    }, Message.user_session_id == 'user-1', Message.client_message_id == 'm-1')
+
+    assert duplicate and message['content'] == 'original'
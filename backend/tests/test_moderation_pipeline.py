@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from app.moderation_pipeline import moderation_pipeline
+from app.services.chat_service import BAN_AFTER_FLAGS, chat_service
+
+
+@pytest.mark.file_database
+def test_violations_are_handled_after_the_broadcast(chat_group, events):
+    (sender, peer), (user_session_id, _), _ = chat_group
+
+    # A burst: flagging on the worker overlaps the next messages being saved
+    for _ in range(BAN_AFTER_FLAGS):
+        sender.emit('send_message', {'user_session_id': user_session_id, 'content': 'what the hell'})
+    assert moderation_pipeline.wait_idle()
+
+    assert [message['content'] for message in events(peer, 'new_message')] == ['what the ****'] * BAN_AFTER_FLAGS
+    received = sender.get_received()
+    flagged = [packet['args'][0] for packet in received if packet['name'] == 'flagged']
+    assert [event['flag_count'] for event in flagged] == list(range(1, BAN_AFTER_FLAGS))
+    assert flagged[0]['violations'] == ['profanity']
+    assert [packet['name'] for packet in received].count('banned') == 1
+    assert chat_service.is_user_banned(user_session_id)
+    assert user_session_id not in chat_service.user_sessions
+
+
+def test_messages_over_the_moderation_budget_are_rejected(chat_group, events, monkeypatch):
+    (sender, peer), (user_session_id, _), _ = chat_group
+    moderate = chat_service.moderate_message
+
+    def slow_moderation(content):
+        time.sleep(0.2)
+        return moderate(content)
+
+    monkeypatch.setattr(chat_service, 'moderate_message', slow_moderation)
+    monkeypatch.setattr(moderation_pipeline, 'timeout', 0.05)
+    sender.emit('send_message', {'user_session_id': user_session_id, 'content': 'hello'})
+
+    errors = events(sender, 'error')
+    assert errors and 'in time' in errors[0]['message']
+    assert events(peer, 'new_message') == []
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from app.models import db
+from app.models.diary import Diary
+from app.models.user import User
+from app.services.mood_stats_service import mood_stats_service
+
+
+def _entry(user_id, day, mood):
+    db.session.add(Diary(user_id=user_id, date=day, title='Title', content='Content', mood=mood, is_completed=True))
+    db.session.commit()
+
+
+def test_writes_from_other_workers_are_not_served_stale(app):
+    user = User(username='writer', email='writer@example.com')
+    db.session.add(user)
+    db.session.commit()
+    today = date.today()
+    _entry(user.id, today - timedelta(days=1), 'happy')
+    assert mood_stats_service.get_mood_stats(user.id)['distribution'] == {'happy': 1}
+
+    # Written without invalidating this process's cache, as another worker would
+    _entry(user.id, today, 'sad')
+    assert mood_stats_service.get_mood_stats(user.id)['distribution'] == {'happy': 1, 'sad': 1}
+
+    entry = Diary.query.filter_by(user_id=user.id, date=today).one()
+    entry.mood = 'happy'
+    db.session.commit()
+    assert mood_stats_service.get_mood_stats(user.id)['distribution'] == {'happy': 2}
+
+
+def test_cached_stats_are_pruned_per_user(app):
+    user = User(username='pruned', email='pruned@example.com')
+    db.session.add(user)
+    db.session.commit()
+    for day in range(3):
+        _entry(user.id, date.today() - timedelta(days=day), 'calm')
+        mood_stats_service.get_mood_stats(user.id)
+    # Only the entry for the current data version is kept
+    assert len(mood_stats_service._cache[user.id]) == 1
+
+    for window_days in range(1, mood_stats_service.max_cached_params + 5):
+        mood_stats_service.get_mood_stats(user.id, window_days=window_days)
+    assert len(mood_stats_service._cache[user.id]) == mood_stats_service.max_cached_params
@@ -0,0 +1,79 @@
+import queue
+
+from app import socketio
+from app.chat_socket_events import _emit_to_group
+from app.outbound import OutboundQueues, outbound_queues
+from app.services.chat_service import chat_service
+from app.wire_format import wire_formats
+
+
+class FakeSocket:
+    """An Engine.IO socket whose transport has stopped taking packets"""
+
+    def __init__(self, sid, depth=0):
+        self.sid = sid
+        self.queue = queue.Queue()
+        self.closed = None
+        for _ in range(depth):
+            self.queue.put('packet')
+
+    def close(self, wait=True, abort=False):
+        self.closed = (wait, abort)
+
+
+def _stall(monkeypatch, socket_client_, depth):
+    sid = socketio.server.manager.sid_from_eio_sid(socket_client_.eio_sid, '/')
+    fake = FakeSocket(sid, depth)
+    monkeypatch.setattr(outbound_queues, '_socket', lambda other, namespace='/': fake if other == sid else None)
+    monkeypatch.setattr(outbound_queues, '_running', True)  # deliver() is called by the test
+    return fake
+
+
+def test_typing_updates_are_held_for_backlogged_connections(chat_group, events, monkeypatch):
+    (sender, slow), (first, _), _ = chat_group
+    group_id = chat_service.user_sessions[first]
+    stalled = _stall(monkeypatch, slow, outbound_queues.ephemeral_depth)
+
+    for count in range(outbound_queues.held + 2):
+        _emit_to_group('typing_users', {'group_id': group_id, 'typing': [count]}, group_id,
+                       wire_formats.encode_typing, ephemeral=True)
+    assert len(events(sender, 'typing_users')) == outbound_queues.held + 2
+    assert events(slow, 'typing_users') == []
+    assert outbound_queues.deliver() == 0
+
+    # Once the backlog drains only the newest updates are sent
+    while not stalled.queue.empty():
+        stalled.queue.get()
+    assert outbound_queues.deliver() == outbound_queues.held
+    assert [update['typing'] for update in events(slow, 'typing_users')] == [
+        [count] for count in range(2, outbound_queues.held + 2)
+    ]
+    assert 'socketio_outbound_dropped_events_total 2' in outbound_queues.metrics_lines()
+
+
+def test_lagging_connections_are_disconnected_and_their_backlog_discarded(chat_group, events, monkeypatch):
+    (sender, slow), (first, _), _ = chat_group
+    stalled = _stall(monkeypatch, slow, outbound_queues.max_lag)
+    monkeypatch.setattr(outbound_queues, 'evicted', 0)
+
+    # A backlog of max_lag packets is tolerated
+    sender.emit('send_message', {'user_session_id': first, 'content': 'hello'})
+    assert stalled.closed is None
+
+    stalled.queue.put('packet')
+    sender.emit('send_message', {'user_session_id': first, 'content': 'hello again'})
+    assert stalled.closed == (False, True)
+    assert stalled.queue.empty()
+    assert outbound_queues.evicted == 1
+    # The sender's own connection is untouched
+    assert [message['content'] for message in events(sender, 'new_message')] == ['hello', 'hello again']
+
+
+def test_connections_without_a_backlog_are_left_alone(app):
+    queues = OutboundQueues(ephemeral_depth=2, max_lag=4)
+    sockets = {'quick': FakeSocket('quick', 1), 'slow': FakeSocket('slow', 5)}
+    queues._socket = lambda sid, namespace='/': sockets.get(sid)
+
+    assert queues.backlogged(['quick', 'slow', 'gone']) == {'slow'}
+    assert queues.evict_lagging(['quick', 'slow', 'gone']) == ['slow']
+    assert sockets['quick'].closed is None
@@ -0,0 +1,114 @@
+"""
+Query budgets for the hot paths. A failure lists every statement issued
+and which ones repeated, which usually points at a query inside a loop.
+"""
+
+from datetime import date, timedelta
+
+from app.models import db
+from app.models.chat import ChatGroup, TherapySession
+from app.models.quote import Quote
+from app.services.chat_service import chat_service
+from app.services.diary_service import DiaryService
+from app.services.quote_pool import quote_pool
+from app.services.therapy_service import therapy_service
+from app.services.user_service import UserService
+
+USER = 'budget@example.com'
+
+
+def _seed_quotes(count=20):
+    for index in range(count):
+        db.session.add(Quote(text=f'Quote number {index}', author='Author', category='motivation'))
+    db.session.commit()
+    quote_pool.load()
+
+
+def _seed_diary(days=60):
+    user = UserService.get_or_create_user_by_supabase_id(USER)
+    today = date.today()
+    for offset in range(days):
+        DiaryService.create_diary_entry(user.id, today - timedelta(days=offset), 'Title', 'Content', 'happy')
+    return user
+
+
+def test_random_quote_is_served_from_memory(client, query_budget):
+    _seed_quotes()
+    with query_budget(0):
+        assert client.get('/api/quotes/random').status_code == 200
+
+
+def test_calendar_view_budget(client, query_budget):
+    _seed_quotes()
+    _seed_diary()
+    today = date.today()
+    with query_budget(3):
+        response = client.get(f'/api/calendar/view/{USER}/{today.year}/{today.month}')
+    assert response.status_code == 200
+    assert response.get_json()['streak'] == 60
+
+
+def test_calendar_view_budget_other_month(client, query_budget):
+    _seed_quotes()
+    _seed_diary()
+    last_year = date.today().year - 1
+    with query_budget(4):
+        assert client.get(f'/api/calendar/view/{USER}/{last_year}/1').status_code == 200
+
+
+def test_calendar_date_budget(client, query_budget):
+    _seed_quotes()
+    _seed_diary(days=3)
+    with query_budget(2):
+        assert client.get(f'/api/calendar/date/{USER}/{date.today().isoformat()}').status_code == 200
+
+
+def test_streak_budget(client, query_budget):
+    _seed_diary()
+    with query_budget(2):
+        response = client.get(f'/api/diary/streak/{USER}')
+    assert response.get_json()['streak'] == 60
+
+
+def test_waiting_list_loads_groups_once(app, query_budget):
+    # Many part-filled groups used to cost one lookup each per waiting user
+    for index in range(10):
+        group = ChatGroup(max_members=5)
+        db.session.add(group)
+        db.session.commit()
+        chat_service.active_groups[group.id] = [f'member-{index}-{n}' for n in range(4)]
+    chat_service.waiting_users.extend(f'waiting-{n}' for n in range(8))
+
+    with query_budget(1):
+        chat_service._process_waiting_list()
+    assert chat_service.waiting_users == []
+
+
+def test_join_chat_event_budget(socket_client, query_budget):
+    first, second, third = socket_client(), socket_client(), socket_client()
+    first.emit('join_chat', {'user_session_id': 'user-1'})
+    second.emit('join_chat', {'user_session_id': 'user-2'})
+    with query_budget(3):
+        third.emit('join_chat', {'user_session_id': 'user-3'})
+    assert chat_service.user_sessions['user-3'] == chat_service.user_sessions['user-1']
+
+
+def test_send_message_event_budget(socket_client, query_budget):
+    first, second = socket_client(), socket_client()
+    first.emit('join_chat', {'user_session_id': 'user-1'})
+    second.emit('join_chat', {'user_session_id': 'user-2'})
+    with query_budget(4):
+        first.emit('send_message', {'user_session_id': 'user-1', 'content': 'hello there'})
+    assert any(packet['name'] == 'new_message' for packet in second.get_received())
+
+
+def test_therapy_messages_budget(client, query_budget):
+    session = TherapySession(user_session_id='user-1', user_email='user@example.com', status='in_progress')
+    db.session.add(session)
+    db.session.commit()
+    session_id = session.id
+    for index in range(20):
+        therapy_service.send_message(session_id, 'user-1', 'user', f'message {index}')
+    with query_budget(1):
+        response = client.get(f'/api/therapy/messages/{session_id}')
+    assert len(response.get_json()['messages']) == 20
@@ -0,0 +1,35 @@
+import json
+
+from app.models.quote import Quote
+
+
+def test_records_with_the_wrong_types_are_skipped(client):
+    records = [
+        {'text': 'Keep going'},
+        {'text': 5},
+        'a string',
+        ['a', 'list'],
+        {'text': 'Wrong author', 'author': {'name': 'x'}},
+        {'text': 'Wrong category', 'category': 3},
+        {'text': 'Still going', 'author': 'Someone', 'category': None},
+    ]
+    response = client.post('/api/quotes/bulk?batch_size=1', json=records)
+
+    assert response.status_code == 201
+    stats = response.get_json()
+    assert (stats['read'], stats['inserted'], stats['invalid']) == (7, 2, 5)
+    assert sorted(text for text, in Quote.query.with_entities(Quote.text)) == ['Keep going', 'Still going']
+
+
+def test_json_arrays_are_capped_but_ndjson_streams(app, client):
+    app.config['QUOTE_IMPORT_MAX_JSON_BYTES'] = 1024
+    records = [{'text': f'Quote number {index}'} for index in range(100)]
+
+    response = client.post('/api/quotes/bulk', json=records)
+    assert response.status_code == 413
+    assert Quote.query.count() == 0
+
+    ndjson = '\n'.join(json.dumps(record) for record in records)
+    response = client.post('/api/quotes/bulk', data=ndjson, content_type='application/x-ndjson')
+    assert response.status_code == 201
+    assert response.get_json()['inserted'] == 100
@@ -0,0 +1,41 @@
+import math
+
+from app.models import db
+from app.models.quote import Quote
+from app.services.quote_pool import QuotePool, quote_pool
+
+
+def _seed_quotes():
+    for index in range(10):
+        db.session.add(Quote(text=f'Quote number {index}', author='Author',
+                             category='hope' if index % 2 else 'growth'))
+    db.session.commit()
+    quote_pool.load()
+
+
+def test_weights_must_be_finite_and_not_negative(client):
+    _seed_quotes()
+    for weights in ('hope:inf', 'hope:nan', 'hope:-1', 'hope:x'):
+        assert client.get(f'/api/quotes/random?weights={weights}').status_code == 400
+    response = client.get('/api/quotes/random?weights=hope:3,growth:0')
+    assert response.status_code == 200 and response.get_json()['category'] == 'hope'
+
+
+def test_overflowing_weights_fall_back_to_uniform(client):
+    _seed_quotes()
+    for _ in range(20):
+        assert client.get('/api/quotes/random?weights=hope:1e308,growth:1e308').status_code == 200
+    for weights in ({'hope': math.inf}, {'hope': math.nan}):
+        assert quote_pool.get_random(weights=weights) is not None
+
+
+def test_weight_cache_is_bounded(client):
+    _seed_quotes()
+    for index in range(100):
+        quote_pool.get_random(weights={f'unknown-{index}': 2, 'hope': index + 1})
+    assert len(quote_pool._weight_cache) <= QuotePool.MAX_CACHED_WEIGHTS
+    # Unknown categories do not make new cache entries
+    quote_pool._weight_cache.clear()
+    for index in range(10):
+        quote_pool.get_random(weights={f'unknown-{index}': 2, 'hope': 2})
+    assert len(quote_pool._weight_cache) == 1
@@ -0,0 +1,90 @@
+from app.rate_limit import MemoryBackend, parse_limits, rate_limiter
+
+
+def test_bucket_allows_burst_then_refills(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('app.rate_limit.time.monotonic', lambda: clock[0])
+    backend = MemoryBackend()
+
+    assert [backend.consume('k', rate=2, burst=3)[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = backend.consume('k', rate=2, burst=3)
+    assert not allowed and retry_after == 0.5
+
+    clock[0] += 0.5
+    assert backend.consume('k', rate=2, burst=3) == (True, 0.0)
+
+
+def test_idle_buckets_are_swept(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('app.rate_limit.time.monotonic', lambda: clock[0])
+    backend = MemoryBackend(sweep_interval=10)
+    backend.consume('idle', rate=1, burst=5)
+    clock[0] += 2
+    backend.consume('busy', rate=1, burst=5)
+    assert len(backend) == 2
+
+    # Both buckets have refilled by the next sweep and are dropped
+    clock[0] += 10
+    backend.consume('new', rate=1, burst=5)
+    assert len(backend) == 1
+
+
+def test_parse_limits():
+    assert parse_limits(' send_message=2:5, typing=4 ,') == {'send_message': (2.0, 5.0), 'typing': (4.0, 4.0)}
+
+
+def test_moderate_route_returns_429(client):
+    rate_limiter.overrides['moderate'] = (0.001, 2)
+    payload = {'content': 'hello there', 'user_session_id': 'user-1'}
+
+    assert [client.post('/api/chat/moderate', json=payload).status_code for _ in range(2)] == [200, 200]
+    response = client.post('/api/chat/moderate', json=payload)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['success'] is False
+
+    # Another user has their own bucket
+    other = client.post('/api/chat/moderate', json={**payload, 'user_session_id': 'user-2'})
+    assert other.status_code == 200
+
+
+def test_socket_events_are_dropped_when_limited(client, socket_client):
+    rate_limiter.overrides['send_message'] = (0.001, 1)
+    user_session_id = client.post('/api/chat/session').get_json()['user_session_id']
+    socket = socket_client()
+    socket.emit('join_chat', {'user_session_id': user_session_id})
+    socket.get_received()
+
+    for text in ('first', 'second'):
+        socket.emit('send_message', {'user_session_id': user_session_id, 'content': text})
+    received = socket.get_received()
+    limited = [event for event in received if event['name'] == 'rate_limited']
+    assert len(limited) == 1
+    assert limited[0]['args'][0]['event'] == 'send_message'
+    assert 'rate_limit_rejections_total{scope="send_message"} 1' in '\n'.join(rate_limiter.metrics_lines())
+
+
+def test_tokens_are_only_taken_when_every_bucket_allows(monkeypatch):
+    monkeypatch.setattr('app.rate_limit.time.monotonic', lambda: 100.0)
+    backend = MemoryBackend()
+    backend.consume('ip', rate=1, burst=1)
+
+    # The IP bucket is empty, so the user's bucket keeps its token
+    assert backend.consume_all([('user', 1, 1), ('ip', 1, 1)]) == (False, 1.0)
+    assert backend.consume('user', rate=1, burst=1) == (True, 0.0)
+
+
+def test_client_ip_comes_from_trusted_proxies(client, monkeypatch):
+    rate_limiter.overrides['moderate'] = (0.001, 1)
+    monkeypatch.setattr(rate_limiter, 'ip_factor', 1)
+    monkeypatch.setattr(rate_limiter, 'trusted_proxies', 1)
+
+    def moderate(user_session_id, forwarded_for):
+        return client.post('/api/chat/moderate', json={'content': 'hello', 'user_session_id': user_session_id},
+                           headers={'X-Forwarded-For': forwarded_for}).status_code
+
+    # A spoofed left-most entry does not give the client a new IP bucket
+    assert moderate('user-1', '203.0.113.1') == 200
+    assert moderate('user-2', '198.51.100.7, 203.0.113.1') == 429
+    # Clients behind the proxy no longer share one bucket
+    assert moderate('user-3', '203.0.113.2') == 200
@@ -0,0 +1,44 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.models import db
+from app.models.chat import ChatGroup, Message, TherapyMessage, TherapySession, UserFlag
+from app.serialization import (MESSAGE_ROWS, THERAPY_MESSAGE_ROWS, USER_FLAG_ROWS, OrjsonProvider,
+                               orjson)
+
+
+def test_row_serializers_match_to_dict(app):
+    group = ChatGroup()
+    db.session.add(group)
+    db.session.commit()
+    session = TherapySession(user_session_id='user-1', user_email='user@example.com')
+    db.session.add(session)
+    db.session.commit()
+    db.session.add_all([
+        Message(group_id=group.id, user_session_id='user-1', username='CalmOtter1', content='hi'),
+        TherapyMessage(session_id=session.id, sender_id='user-1', sender_type='user', content='hello'),
+        UserFlag(user_session_id='user-1', flag_count=2, last_flagged_at=datetime(2024, 5, 1, 12, 30)),
+    ])
+    db.session.commit()
+
+    for serializer, model in ((MESSAGE_ROWS, Message), (THERAPY_MESSAGE_ROWS, TherapyMessage),
+                              (USER_FLAG_ROWS, UserFlag)):
+        assert serializer.serialize(serializer.query().all()) == [row.to_dict() for row in model.query.all()]
+
+
+@pytest.mark.skipif(orjson is None, reason='orjson is not installed')
+def test_orjson_provider_matches_default_provider(app):
+    assert isinstance(app.json, OrjsonProvider)
+    payloads = [
+        {'b': [1, 2.5, None, True], 'a': 'text', 'when': datetime(2024, 5, 1, 12, 30), 'amount': Decimal('1.10')},
+        # Beyond orjson's 64-bit integers, so encoded by the standard library
+        {'huge': 2 ** 70, 'a': 'text'},
+    ]
+    for payload in payloads:
+        expected = json.loads(json.dumps(payload, default=app.json.default))
+        assert json.loads(app.json.dumps(payload)) == expected
+        assert json.loads(app.json.response(payload).get_data()) == expected
+    assert app.json.loads(b'{"x": [1, 2]}') == {'x': [1, 2]}
@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+from app.services.content_moderation_service import content_moderation_service
+from app.services.toxicity_scorer import MicroBatcher, ToxicityScorer, extract_features
+
+
+class KeywordScorer(ToxicityScorer):
+    """Scores 0.9 for messages containing 'loser', recording each batch"""
+
+    def __init__(self):
+        self.batches = []
+
+    def score_batch(self, texts):
+        self.batches.append(list(texts))
+        return [0.9 if 'loser' in text else 0.1 for text in texts]
+
+
+def test_concurrent_requests_are_scored_in_batches():
+    scorer = KeywordScorer()
+    batcher = MicroBatcher(scorer, max_batch=8, max_wait=0.05)
+    texts = [f'message {index}' if index % 2 else f'you loser {index}' for index in range(24)]
+    results = {}
+    start = threading.Barrier(len(texts))
+
+    def score(text):
+        start.wait()
+        results[text] = batcher.score(text, timeout=5)
+
+    threads = [threading.Thread(target=score, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {text: 0.9 if 'loser' in text else 0.1 for text in texts}
+    assert batcher.scored == len(texts)
+    assert batcher.batches < len(texts)
+    assert max(len(batch) for batch in scorer.batches) <= 8
+
+
+def test_callers_that_time_out_are_not_scored():
+    scorer = KeywordScorer()
+    started, gate = threading.Event(), threading.Event()
+    score_batch = scorer.score_batch
+
+    def blocked(texts):
+        started.set()
+        gate.wait()
+        return score_batch(texts)
+
+    scorer.score_batch = blocked
+    batcher = MicroBatcher(scorer, max_batch=1, max_wait=0)
+
+    # The worker is stuck on the first batch, so the second caller gives up
+    first = threading.Thread(target=batcher.score, args=('first',), kwargs={'timeout': 5})
+    first.start()
+    assert started.wait(5)
+    assert batcher.score('second', timeout=0.05) is None
+    gate.set()
+    first.join()
+    assert batcher.score('third', timeout=5) == 0.1
+
+    assert scorer.batches == [['first'], ['third']]
+    assert batcher.abandoned == 1
+
+
+def test_word_list_hits_skip_the_model(monkeypatch):
+    scorer = KeywordScorer()
+    monkeypatch.setattr(content_moderation_service, 'toxicity', MicroBatcher(scorer, max_wait=0))
+
+    result = content_moderation_service.moderate_content('what the hell, loser')
+    assert result['violations'] == ['profanity']
+    assert scorer.batches == []
+
+    result = content_moderation_service.moderate_content('you are such a loser')
+    assert result == {'is_appropriate': False, 'violations': ['toxicity'], 'toxicity': 0.9}
+    assert content_moderation_service.moderate_content('have a nice day')['is_appropriate']
+
+
+def test_hashed_ngram_model_round_trip(tmp_path):
+    pytest.importorskip('numpy')
+    from app.services.toxicity_scorer import HashedNgramScorer, train
+
+    toxic = ['you are an idiot', 'shut up loser', 'nobody likes you, idiot', 'you stupid loser',
+             'go away you moron', 'what a pathetic loser']
+    clean = ['thanks for listening', 'i had a good day', 'that really helped me', 'see you tomorrow',
+             'i feel a bit better now', 'have a nice evening']
+    scorer = train(toxic + clean, [1] * len(toxic) + [0] * len(clean), n_features=2 ** 12,
+                   epochs=200, learning_rate=2.0, batch_size=4)
+    scorer.threshold = 0.6
+    scorer.save(tmp_path / 'model.npz')
+
+    loaded = HashedNgramScorer.load(tmp_path / 'model.npz')
+    assert loaded.threshold == 0.6
+    assert loaded.score_batch(toxic + clean) == pytest.approx(scorer.score_batch(toxic + clean), abs=1e-6)
+    # Character n-grams carry over to obfuscated spellings
+    toxic_score, clean_score = loaded.score_batch(['y0u 1d10t l.o.s.e.r', 'have a good day'])
+    assert toxic_score > 0.5 > clean_score
+
+
+def test_features_survive_obfuscation():
+    # The 12 letter-only 3-5 grams of " loser " are shared despite the dots and digits
+    assert len(set(extract_features('loser')) & set(extract_features('L.0.S.E.R'))) >= 12
+    assert extract_features('looooooser') == extract_features('looser')
+
+
+def test_scorers_must_implement_score_batch():
+    class Incomplete(ToxicityScorer):
+        pass
+
+    with pytest.raises(TypeError, match='score_batch'):
+        Incomplete()
@@ -0,0 +1,59 @@
+import time
+
+from app.typing_indicator import TypingIndicators, typing_indicators
+
+
+def test_changes_are_coalesced_per_group():
+    indicators = TypingIndicators(timeout=5)
+    assert indicators.update(1, 'user-1', 'CoolFox12', True, now=0) is True
+    for now in range(1, 4):
+        # Repeated keystrokes only refresh the flag; the loop is already running
+        assert indicators.update(1, 'user-1', 'CoolFox12', True, now=now) is False
+    indicators.update(1, 'user-2', 'BoldBear34', True, now=3)
+
+    assert indicators.flush(now=3) == [(1, [
+        {'user_session_id': 'user-1', 'username': 'CoolFox12'},
+        {'user_session_id': 'user-2', 'username': 'BoldBear34'},
+    ])]
+    assert indicators.flush(now=3.5) == []
+
+    # Stopping and starting again between flushes is not a change
+    indicators.update(1, 'user-2', 'BoldBear34', False, now=4)
+    indicators.update(1, 'user-2', 'BoldBear34', True, now=4)
+    assert indicators.flush(now=4) == []
+
+
+def test_stale_flags_expire():
+    indicators = TypingIndicators(timeout=5)
+    indicators.update(1, 'user-1', 'CoolFox12', True, now=0)
+    indicators.update(1, 'user-2', 'BoldBear34', True, now=4)
+    indicators.flush(now=4)
+
+    assert indicators.flush(now=5) == [(1, [{'user_session_id': 'user-2', 'username': 'BoldBear34'}])]
+    assert indicators.flush(now=9) == [(1, [])]
+    assert indicators.stop_if_idle() is True
+    assert indicators.update(1, 'user-1', 'CoolFox12', True, now=10) is True
+
+
+def _typing_updates(socket, events, until, timeout=5):
+    """The typing_users updates a socket receives until `until(updates)` holds"""
+    updates, deadline = [], time.monotonic() + timeout
+    while not until(updates) and time.monotonic() < deadline:
+        updates += events(socket, 'typing_users')
+        time.sleep(0.01)
+    return updates
+
+
+def test_room_gets_one_update_per_interval(chat_group, events, monkeypatch):
+    monkeypatch.setattr(typing_indicators, 'interval', 0.05)
+    (typist, peer), (first, _), _ = chat_group
+
+    for _ in range(3):
+        typist.emit('typing', {'user_session_id': first, 'is_typing': True})
+    updates = _typing_updates(peer, events, lambda updates: updates)
+
+    typist.emit('typing', {'user_session_id': first, 'is_typing': False})
+    # The flush loop stops once nobody is typing, so nothing can follow
+    updates += _typing_updates(peer, events, lambda _: not typing_indicators._running)
+    updates += events(peer, 'typing_users')
+    assert [[user['user_session_id'] for user in update['typing']] for update in updates] == [[first], []]
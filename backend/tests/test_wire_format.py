@@ -0,0 +1,59 @@
+from app.wire_format import COMPACT, WireFormats
+
+
+def _join(socket_client, user_session_id, wire=None):
+    socket = socket_client()
+    payload = {'user_session_id': user_session_id}
+    if wire:
+        payload['wire'] = wire
+    socket.emit('join_chat', payload)
+    return socket
+
+
+def test_compact_clients_get_short_keys_and_interned_senders(socket_client, events):
+    verbose = _join(socket_client, 'user-1')
+    compact = _join(socket_client, 'user-2', wire='compact')
+    assert events(compact, 'joined_group')[0]['wire'] == 'compact'
+    # The first user was put on the waiting list; joining again enters the group's room
+    verbose.emit('join_chat', {'user_session_id': 'user-1'})
+    verbose.get_received()
+    compact.get_received()
+
+    verbose.emit('send_message', {'user_session_id': 'user-1', 'content': 'first'})
+    verbose.emit('send_message', {'user_session_id': 'user-1', 'content': 'second'})
+    compact.emit('send_message', {'user_session_id': 'user-2', 'content': 'mine'})
+
+    verbose_messages = events(verbose, 'new_message')
+    assert [message['content'] for message in verbose_messages] == ['first', 'second', 'mine']
+    assert verbose_messages[0]['user_session_id'] == 'user-1'
+
+    first, second, mine = events(compact, 'new_message')
+    assert set(first) == {'i', 'u', 'c', 't', 'd'}
+    assert first['d'] == [[first['u'], verbose_messages[0]['username']]]
+    assert first['c'] == 'first' and 's' not in first
+    assert mine['s'] == 1
+    # A sender already defined on this connection is referenced without its name
+    assert verbose_messages[1]['username'] == verbose_messages[0]['username']
+    assert second['u'] == first['u'] and 'd' not in second
+
+
+def test_references_are_never_reused_within_a_payload():
+    formats = WireFormats(max_refs=2)
+    formats.negotiate('sid', COMPACT, 'user-0')
+
+    def message(index, sender):
+        return {'id': index, 'user_session_id': f'user-{sender}', 'username': f'name-{sender}',
+                'content': 'hi', 'created_at': None}
+
+    assert formats.encode_message('sid', message(1, 1))['d'] == [[1, 'name-1']]
+    # Three senders overflow the table: it is reset before the batch, not partway through
+    batch = formats.encode_messages('sid', [message(index, sender) for index, sender in enumerate((2, 3, 1, 2))])
+    assert batch['d'] == [[1, 'name-2'], [2, 'name-3'], [3, 'name-1']]
+    assert [compact['u'] for compact in batch['m']] == [1, 2, 3, 1]
+
+    # The next payload with a new sender starts over
+    typing = formats.encode_typing('sid', {'group_id': 1, 'typing': [
+        {'user_session_id': 'user-4', 'username': 'name-4'}
+    ]})
+    assert typing == {'g': 1, 'y': [1], 'd': [[1, 'name-4']]}
+    assert formats.encode_message('sid', message(5, 4))['u'] == 1
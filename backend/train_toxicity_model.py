@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Script to train the hashed n-gram toxicity model used by
+ContentModerationService when TOXICITY_SCORER=hashed_ngram
+
+Usage:
+    python train_toxicity_model.py <labeled.csv> [--output data/toxicity_model.npz]
+
+The CSV needs a text column and a 0/1 label column; by default "text" and
+"label", or "comment_text" and "toxic" (the Jigsaw toxic comment dataset)
+are picked up automatically. A share of the rows is held out to report
+precision/recall and to choose the decision threshold.
+
+Requires: numpy
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.services.toxicity_scorer import DEFAULT_FEATURES, train
+
+TEXT_COLUMNS = ('text', 'comment_text', 'message', 'content')
+LABEL_COLUMNS = ('label', 'toxic', 'is_toxic')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Train the hashed n-gram toxicity model')
+    parser.add_argument('csv', help='Labeled messages')
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(__file__), 'data', 'toxicity_model.npz'))
+    parser.add_argument('--text-column', help='Column holding the message text')
+    parser.add_argument('--label-column', help='Column holding the 0/1 label')
+    parser.add_argument('--features', type=int, default=DEFAULT_FEATURES, help='Hash space size')
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--learning-rate', type=float, default=0.5)
+    parser.add_argument('--l2', type=float, default=1e-6)
+    parser.add_argument('--holdout', type=float, default=0.1, help='Share of rows held out for evaluation')
+    parser.add_argument('--min-precision', type=float, default=0.9,
+                        help='Pick the lowest threshold reaching this precision on the holdout')
+    return parser.parse_args()
+
+
+def read_rows(path, text_column=None, label_column=None):
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        text_column = text_column or next((name for name in TEXT_COLUMNS if name in fields), None)
+        label_column = label_column or next((name for name in LABEL_COLUMNS if name in fields), None)
+        if text_column is None or label_column is None:
+            raise ValueError(f"Could not find text and label columns in {fields}")
+        return [(row[text_column], 1 if float(row[label_column]) >= 0.5 else 0) for row in reader]
+
+
+def evaluate(scores, labels, threshold):
+    predicted = [score >= threshold for score in scores]
+    true_positives = sum(1 for hit, label in zip(predicted, labels) if hit and label)
+    precision = true_positives / max(1, sum(predicted))
+    recall = true_positives / max(1, sum(labels))
+    return precision, recall
+
+
+def choose_threshold(scores, labels, min_precision):
+    """The lowest threshold (highest recall) whose holdout precision is at least min_precision"""
+    for threshold in [step / 100 for step in range(5, 100)]:
+        precision, _ = evaluate(scores, labels, threshold)
+        if precision >= min_precision:
+            return threshold
+    return 0.5
+
+
+def main():
+    args = parse_args()
+    rows = read_rows(args.csv, args.text_column, args.label_column)
+    random.Random(0).shuffle(rows)
+    split = int(len(rows) * (1 - args.holdout))
+    training, holdout = rows[:split], rows[split:]
+    print(f"Training on {len(training)} messages ({sum(label for _, label in training)} toxic), "
+          f"holding out {len(holdout)}")
+
+    scorer = train(
+        [text for text, _ in training], [label for _, label in training],
+        n_features=args.features, epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2
+    )
+
+    if holdout:
+        labels = [label for _, label in holdout]
+        scores = scorer.score_batch([text for text, _ in holdout])
+        scorer.threshold = choose_threshold(scores, labels, args.min_precision)
+        precision, recall = evaluate(scores, labels, scorer.threshold)
+        print(f"Holdout at threshold {scorer.threshold:.2f}: precision {precision:.3f}, recall {recall:.3f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    scorer.save(args.output)
+    print(f"Saved model to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
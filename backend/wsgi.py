@@ -0,0 +1,85 @@
+"""
+Production entry point for the Flask + Socket.IO server
+
+The async mode is taken from SOCKETIO_ASYNC_MODE (or --mode) and the
+standard library is monkey-patched before the application is imported.
+
+Usage:
+    python wsgi.py --mode eventlet --host 0.0.0.0 --port 3000
+    gunicorn --worker-class eventlet -w 1 --bind 0.0.0.0:3000 wsgi:app
+    gunicorn --worker-class gevent -w 1 --bind 0.0.0.0:3000 wsgi:app
+
+Socket.IO keeps room membership in process memory, so run a single worker
+per process (scale out with sticky sessions and a message queue).
+"""
+
+import argparse
+import os
+import sys
+
+ASYNC_MODES = ('eventlet', 'gevent', 'threading')
+
+
+def _mode_from_argv(argv):
+    # Parsed by hand so monkey-patching can happen before any other import
+    for index, arg in enumerate(argv):
+        if arg == '--mode' and index + 1 < len(argv):
+            return argv[index + 1]
+        if arg.startswith('--mode='):
+            return arg.split('=', 1)[1]
+    return None
+
+
+ASYNC_MODE = _mode_from_argv(sys.argv[1:]) or os.getenv('SOCKETIO_ASYNC_MODE', 'eventlet')
+if ASYNC_MODE not in ASYNC_MODES:
+    sys.exit(f"Unknown async mode '{ASYNC_MODE}'. Expected one of: {', '.join(ASYNC_MODES)}")
+
+
+def monkey_patch(async_mode):
+    """
+    Monkey-patch the standard library for a cooperative async mode.
+    Must run before anything else imports socket/threading.
+    """
+    if async_mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif async_mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    else:
+        return
+
+    # psycopg2 is a C extension and ignores monkey-patching; psycogreen makes
+    # it yield to the hub while waiting on the network, when installed
+    try:
+        if async_mode == 'eventlet':
+            from psycogreen.eventlet import patch_psycopg
+        else:
+            from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+
+
+monkey_patch(ASYNC_MODE)
+
+from app import socketio  # noqa: E402
+from app.factory import create_app  # noqa: E402
+
+app = create_app(async_mode=ASYNC_MODE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the Flask + Socket.IO server')
+    parser.add_argument('--mode', choices=ASYNC_MODES, default=ASYNC_MODE, help='Socket.IO async mode')
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '3000')))
+    args = parser.parse_args()
+
+    print(f"Starting server in {socketio.async_mode} mode on {args.host}:{args.port}")
+    socketio.run(app, host=args.host, port=args.port, debug=False, use_reloader=False,
+                 allow_unsafe_werkzeug=socketio.async_mode == 'threading')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import io from 'socket.io-client';
+import PendingMessages from '../services/pendingMessages';
 
 const ChatPage = () => {
   const [userSessionId, setUserSessionId] = useState(null);
@@ -18,7 +19,12 @@ const ChatPage = () => {
   const navigate = useNavigate();
   const messagesEndRef = useRef(null);
   const typingTimeoutRef = useRef(null);
+  const typingSentAtRef = useRef(0);
   const socketRef = useRef(null);
+  const resumeTokenRef = useRef(null);
+  const lastMessageIdRef = useRef(0);
+  const resumeRefreshRef = useRef(null);
+  const pendingMessagesRef = useRef(new PendingMessages('send_message'));
 
   // Initialize chat session
   useEffect(() => {
@@ -29,6 +35,9 @@ const ChatPage = () => {
       if (typingTimeoutRef.current) {
         clearTimeout(typingTimeoutRef.current);
       }
+      if (resumeRefreshRef.current) {
+        clearInterval(resumeRefreshRef.current);
+      }
       
       // Disconnect socket
       if (socketRef.current) {
@@ -74,8 +83,29 @@ const ChatPage = () => {
       console.log('Connected to WebSocket server');
       setIsConnected(true);
       
-      // Join chat with user session ID
-      socket.emit('join_chat', { user_session_id: sessionId });
+      // After a dropped connection, resume the group instead of matchmaking again
+      if (resumeTokenRef.current) {
+        socket.emit('resume_chat', {
+          resume_token: resumeTokenRef.current,
+          last_message_id: lastMessageIdRef.current
+        });
+      } else {
+        socket.emit('join_chat', { user_session_id: sessionId });
+      }
+    });
+    
+    // Keep the resume token fresh while connected (it expires after a few minutes)
+    resumeRefreshRef.current = setInterval(() => {
+      if (socket.connected && resumeTokenRef.current) {
+        socket.emit('refresh_resume_token', {
+          resume_token: resumeTokenRef.current,
+          last_message_id: lastMessageIdRef.current
+        });
+      }
+    }, 60000);
+    
+    socket.on('resume_token', (data) => {
+      resumeTokenRef.current = data.resume_token;
     });
     
     // Handle connection error
@@ -101,6 +131,34 @@ const ChatPage = () => {
       setGroupId(data.group.id);
       setUsername(data.username);
       setIsWaiting(false);
+      resumeTokenRef.current = data.resume_token;
+      pendingMessagesRef.current.resendAll(socket);
+    });
+    
+    // Handle a resumed session (only the messages missed while disconnected are sent)
+    socket.on('chat_resumed', (data) => {
+      setGroupId(data.group_id);
+      setUsername(data.username);
+      setIsWaiting(false);
+      resumeTokenRef.current = data.resume_token;
+      // Messages sent before the drop that the server never acknowledged
+      pendingMessagesRef.current.resendAll(socket);
+    });
+    
+    socket.on('missed_messages', (data) => {
+      setMessages(prev => {
+        const known = new Set(prev.map(msg => msg.id));
+        return [...prev, ...data.messages.filter(msg => !known.has(msg.id))];
+      });
+      data.messages.forEach(msg => {
+        lastMessageIdRef.current = Math.max(lastMessageIdRef.current, msg.id);
+      });
+    });
+    
+    // The token expired or the group is gone: join from scratch
+    socket.on('resume_failed', () => {
+      resumeTokenRef.current = null;
+      socket.emit('join_chat', { user_session_id: sessionId });
     });
     
     // Handle previous messages
@@ -109,6 +167,7 @@ const ChatPage = () => {
       if (data.messages.length > 0) {
         const maxId = Math.max(...data.messages.map(msg => msg.id));
         setLastMessageId(maxId);
+        lastMessageIdRef.current = maxId;
       }
     });
     
@@ -122,8 +181,9 @@ const ChatPage = () => {
         }
         return prev;
       });
-      if (message.id > lastMessageId) {
+      if (message.id > lastMessageIdRef.current) {
         setLastMessageId(message.id);
+        lastMessageIdRef.current = message.id;
       }
     });
     
@@ -133,10 +193,11 @@ const ChatPage = () => {
       console.log(data.message);
     });
     
-    // Handle user typing
-    socket.on('user_typing', (data) => {
+    // Handle typing indicators (everyone in the group currently typing)
+    socket.on('typing_users', (data) => {
       // Could show typing indicators
-      console.log(`${data.username} is typing: ${data.is_typing}`);
+      const others = data.typing.filter((user) => user.user_session_id !== sessionId);
+      console.log(`Typing: ${others.map((user) => user.username).join(', ')}`);
     });
     
     // Handle banned user
@@ -181,7 +242,8 @@ const ChatPage = () => {
     
     // Send message via WebSocket
     if (socketRef.current) {
-      socketRef.current.emit('send_message', {
+      // Resent with the same client_message_id until acknowledged, so the server stores it once
+      pendingMessagesRef.current.send(socketRef.current, {
         user_session_id: userSessionId,
         content: newMessage
       });
@@ -192,8 +254,10 @@ const ChatPage = () => {
   };
 
   const handleTyping = () => {
-    if (!isTyping) {
+    // The server expires typing flags after a few seconds, so refresh while typing
+    if (!isTyping || Date.now() - typingSentAtRef.current > 3000) {
       setIsTyping(true);
+      typingSentAtRef.current = Date.now();
       
       // Notify server that user is typing
       if (socketRef.current && userSessionId) {
@@ -239,6 +303,7 @@ const ChatPage = () => {
     }
     
     // Reset state
+    resumeTokenRef.current = null;
     setGroupId(null);
     setMessages([]);
     setIsWaiting(false);
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react'
 import { useNavigate, useParams } from 'react-router-dom'
 import io from 'socket.io-client'
+import PendingMessages from '../services/pendingMessages'
 import { useAuth } from '../hooks/useAuth'
 
 const TherapyChatPage = () => {
@@ -17,6 +18,7 @@ const TherapyChatPage = () => {
     const { user } = useAuth()
     const isTherapist = localStorage.getItem('isTherapist') === 'true'
     const socketRef = useRef(null)
+    const pendingMessagesRef = useRef(new PendingMessages('send_therapy_message'))
     
     console.log('TherapyChatPage rendered with sessionId:', sessionId);
     console.log('Is therapist:', isTherapist);
@@ -121,6 +123,8 @@ const TherapyChatPage = () => {
         session_id: sessionId,
         user_id: isTherapist ? 'therapist' : (user?.id || 'user') // Use actual user ID
       })
+      // Messages sent before a drop that the server never acknowledged
+      pendingMessagesRef.current.resendAll(socket)
     })
     
     // Handle connection error
@@ -137,7 +141,8 @@ const TherapyChatPage = () => {
     
     // Handle new therapy messages
     socket.on('new_therapy_message', (message) => {
-      setMessages(prev => [...prev, message])
+      // A retried send is answered with the original message again
+      setMessages(prev => prev.some(msg => msg.id === message.id) ? prev : [...prev, message])
     })
     
     // Handle user joined notification
@@ -189,8 +194,8 @@ const TherapyChatPage = () => {
   const sendMessage = () => {
     if (!newMessage.trim() || !socketRef.current) return
     
-    // Send message via WebSocket
-    socketRef.current.emit('send_therapy_message', {
+    // Resent with the same client_message_id until acknowledged, so the server stores it once
+    pendingMessagesRef.current.send(socketRef.current, {
       session_id: sessionId,
       sender_id: isTherapist ? 'therapist' : (user?.id || 'user'), // Use actual user ID
       sender_type: isTherapist ? 'therapist' : 'user',
@@ -0,0 +1,49 @@
+// Messages sent over Socket.IO that the server has not acknowledged yet.
+// Each keeps the client_message_id it was first sent with, so a resend
+// (after an ack timeout or a reconnect) is stored by the server only once.
+const ACK_TIMEOUT_MS = 10000
+const MAX_ATTEMPTS = 5
+
+class PendingMessages {
+  constructor(event) {
+    this.event = event
+    this.pending = new Map() // client_message_id -> { message, attempts }
+  }
+
+  send(socket, payload) {
+    const message = { ...payload, client_message_id: crypto.randomUUID() }
+    this.pending.set(message.client_message_id, { message, attempts: 0 })
+    this.emit(socket, message.client_message_id)
+  }
+
+  // Call once the connection is back in its group or session
+  resendAll(socket) {
+    for (const id of this.pending.keys()) {
+      this.emit(socket, id)
+    }
+  }
+
+  emit(socket, id) {
+    const entry = this.pending.get(id)
+    // While disconnected the message waits for resendAll()
+    if (!entry || !socket.connected) return
+
+    const attempt = ++entry.attempts
+    socket.timeout(ACK_TIMEOUT_MS).emit(this.event, entry.message, (error) => {
+      if (!error) {
+        // The server handled it (stored it, or answered with an error event)
+        this.pending.delete(id)
+        return
+      }
+      if (entry.attempts !== attempt) return // already sent again
+      if (attempt >= MAX_ATTEMPTS) {
+        console.error(`Giving up on ${this.event} after ${attempt} attempts`)
+        this.pending.delete(id)
+        return
+      }
+      this.emit(socket, id)
+    })
+  }
+}
+
+export default PendingMessages